@@ -2,19 +2,29 @@ import uuid
 import json
 import logging
 import re
+from dataclasses import dataclass, field
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from models import ChatSession, ChatMessage, Brand
-from ingestion.embedder import search_brand, _extract_search_keywords
-from ingestion.gemini_vision import rerank_chunks
+from ingestion.embedder import search_brand, search_brand_many, _extract_search_keywords
+from ingestion.reranker import rerank
+from ingestion.fault_codes import find_query_fault_codes, fault_code_chunks
+from ingestion.llm_usage import llm_usage, summarize_llm_calls
+from config import get_settings
 from agent.clarifier import (
     MAX_CLARIFICATION_ROUNDS,
     needs_clarification,
     should_require_model_clarification,
     get_clarification_question,
     generate_answer,
+    generate_grounded_answer,
+    SINGLE_PASS_MAX_PASSAGES,
+    stream_answer,
+    finalize_answer,
+    answer_sources,
+    ANSWER_ERROR_TEXT,
     analyze_search_confidence,
     generate_smart_clarification,
     build_enriched_query_from_history,
@@ -27,6 +37,7 @@ from agent.clarifier import (
 )
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 def _is_greeting_only(query: str) -> bool:
@@ -260,6 +271,24 @@ async def get_session_history(db: AsyncSession, session_id: str) -> list[dict]:
     return [{"role": m.role, "content": m.content} for m in messages]
 
 
+@dataclass
+class ChatTurn:
+    """
+    Outcome of a turn before answer generation: either a direct reply
+    (greeting, clarification, disambiguation) or the grounding the answer is
+    generated from (enriched query, reranked chunks, alternative docs).
+    """
+    session: ChatSession
+    history: list[dict]
+    reply: str | None = None
+    needs_clarification: bool = False
+    query: str = ""
+    chunks: list[dict] = field(default_factory=list)
+    alternative_docs: list[str] | None = None
+    # chunks are search candidates not yet reranked (single-pass answer mode)
+    deferred_rerank: bool = False
+
+
 async def chat(
     db: AsyncSession,
     user_id: int,
@@ -270,8 +299,109 @@ async def chat(
     session_id: str | None = None,
     external_history: list[dict] | None = None,
 ) -> dict:
+    """Answer a chat turn in one response (see prepare_turn for the pipeline)."""
+    turn = await prepare_turn(db, user_id, brand_id, brand_slug, brand_name, query, session_id, external_history)
+    if turn.reply is not None:
+        return await _save_and_return(db, turn.session, turn.reply, [], turn.needs_clarification)
+
+    with llm_usage() as calls:
+        answer, sources = await _answer_turn(turn, brand_name)
+    logger.info(f"Answer path: {summarize_llm_calls(calls)} | query='{turn.query[:80]}'")
+    return await _save_and_return(db, turn.session, answer, sources, False)
+
+
+async def _rerank_if_deferred(turn: ChatTurn):
+    if turn.deferred_rerank:
+        turn.chunks = (await rerank(turn.query, turn.chunks))[:7]
+        turn.deferred_rerank = False
+
+
+async def _answer_turn(turn: ChatTurn, brand_name: str) -> tuple[str, list[dict]]:
+    """Single-pass answer when enabled; rerank + answer (+ rewrite) otherwise or as its fallback."""
+    if settings.answer_single_pass and turn.chunks:
+        grounded = await generate_grounded_answer(
+            turn.query, brand_name, turn.chunks, turn.history, turn.alternative_docs
+        )
+        if grounded is not None:
+            return grounded
+        logger.info("Single-pass answer unusable, falling back to rerank + answer")
+
+    await _rerank_if_deferred(turn)
+    return await generate_answer(
+        turn.query, brand_name, turn.chunks, turn.history, turn.alternative_docs
+    )
+
+
+async def chat_stream(
+    db: AsyncSession,
+    user_id: int,
+    brand_id: int,
+    brand_slug: str,
+    brand_name: str,
+    query: str,
+    session_id: str | None = None,
+    external_history: list[dict] | None = None,
+):
+    """
+    Streaming variant of chat(), yielding events:
+      {"type": "meta", "session_id", "needs_clarification", "sources"} — as soon
+        as retrieval is done, before any text;
+      {"type": "token", "text"} — answer deltas as Gemini writes them;
+      {"type": "done", "session_id", "answer", "sources", "needs_clarification"}
+        — after the message is saved. "answer" is the final text (normalized,
+        possibly rewritten to PT-BR), which replaces the streamed deltas.
+    Exceptions propagate; the routes turn them into an {"type": "error"} event.
+    """
+    turn = await prepare_turn(db, user_id, brand_id, brand_slug, brand_name, query, session_id, external_history)
+    if turn.reply is not None:
+        yield {
+            "type": "meta",
+            "session_id": turn.session.session_id,
+            "needs_clarification": turn.needs_clarification,
+            "sources": [],
+        }
+        yield {"type": "token", "text": turn.reply}
+        result = await _save_and_return(db, turn.session, turn.reply, [], turn.needs_clarification)
+        yield {"type": "done", **result}
+        return
+
+    # Sources go out before the first token, so streaming keeps the rerank pass
+    with llm_usage() as calls:
+        await _rerank_if_deferred(turn)
+        sources = answer_sources(turn.chunks)
+        yield {"type": "meta", "session_id": turn.session.session_id, "needs_clarification": False, "sources": sources}
+
+        parts: list[str] = []
+        try:
+            async for delta in stream_answer(turn.query, brand_name, turn.chunks, turn.history, turn.alternative_docs):
+                parts.append(delta)
+                yield {"type": "token", "text": delta}
+        except Exception as e:
+            # A stream cut mid-answer keeps what was written
+            logger.error(f"Answer streaming error after {len(parts)} deltas: {e}")
+
+        if parts:
+            answer = await finalize_answer("".join(parts), turn.query, brand_name)
+        else:
+            answer, sources = ANSWER_ERROR_TEXT, []
+            yield {"type": "token", "text": answer}
+    logger.info(f"Answer path (stream): {summarize_llm_calls(calls)} | query='{turn.query[:80]}'")
+    result = await _save_and_return(db, turn.session, answer, sources, False)
+    yield {"type": "done", **result}
+
+
+async def prepare_turn(
+    db: AsyncSession,
+    user_id: int,
+    brand_id: int,
+    brand_slug: str,
+    brand_name: str,
+    query: str,
+    session_id: str | None = None,
+    external_history: list[dict] | None = None,
+) -> ChatTurn:
     """
-    Main chat function — progressive intelligence approach:
+    Main chat pipeline — progressive intelligence approach:
     1. Get/create session + history
     2. Greeting check
     3. Extract accumulated context (model/board/drive/symptom from all turns)
@@ -305,7 +435,7 @@ async def chat(
             f"Olá! 👋 Bom te ver por aqui. Sou seu assistente técnico da **{brand_name}**.\n\n"
             "Qual é o **modelo/geração**, a **placa/controlador** e o **código de erro** (se houver)?"
         )
-        return await _save_and_return(db, session, greeting_answer, [], True)
+        return ChatTurn(session, history, reply=greeting_answer, needs_clarification=True)
 
     if _is_cross_brand_query(query, brand_name):
         cross_brand_answer = (
@@ -313,7 +443,7 @@ async def chat(
             "Se o equipamento for de outra marca, posso te orientar melhor se você confirmar "
             f"o modelo equivalente em **{brand_name}** ou abrir no agente da marca correta."
         )
-        return await _save_and_return(db, session, cross_brand_answer, [], False)
+        return ChatTurn(session, history, reply=cross_brand_answer, needs_clarification=False)
 
     # ── Phase 2: Extract accumulated context from entire conversation ───
     known_context = extract_known_context(query, history)
@@ -352,7 +482,7 @@ async def chat(
                         "(como aparece na etiqueta) e, se tiver, a **placa/controlador** "
                         "e o **código de falha** exibido."
                     )
-                return await _save_and_return(db, session, clarification, [], True)
+                return ChatTurn(session, history, reply=clarification, needs_clarification=True)
 
     # ── Phase 3.5: Quick heuristic check (very short first queries) ─────
     # If user gave a specific equipment identifier, trust them and skip Phase 3.5.
@@ -372,12 +502,12 @@ async def chat(
     ):
         clarification = await get_clarification_question(query, brand_name)
         if clarification:
-            return await _save_and_return(db, session, clarification, [], True)
+            return ChatTurn(session, history, reply=clarification, needs_clarification=True)
 
     # ── Phase 4: Build enriched query from conversation history ─────────
     if history and len(history) >= 2:
         enriched_query = await build_enriched_query_from_history(
-            query, brand_name, history
+            query, brand_name, history, known_context
         )
     else:
         enriched_query = query
@@ -385,6 +515,21 @@ async def chat(
     enriched_query = _expand_brand_query_terms(enriched_query, brand_name)
     logger.info(f"Query: '{query}' | Enriched: '{enriched_query}'")
 
+    # ── Phase 4.5: Exact fault-code lookup ──────────────────────────────
+    # "erro UV1 OVF20": when the code resolves to a single document's table row
+    # (matching the equipment, if given), answer from it without vector search.
+    fault_lookup = None
+    if settings.fault_code_fast_path:
+        fault_lookup = find_query_fault_codes(brand_slug, enriched_query)
+        if fault_lookup and fault_lookup.exact:
+            logger.info(
+                f"Fault-code fast path: codes={fault_lookup.codes} models={fault_lookup.models} "
+                f"rows={len(fault_lookup.rows)}"
+            )
+            chunks = fault_code_chunks(fault_lookup, brand_slug)
+            alternative_docs = get_alternative_docs_for_context(known_context, chunks)
+            return ChatTurn(session, history, query=enriched_query, chunks=chunks, alternative_docs=alternative_docs)
+
     # ── Phase 5: Search Qdrant (multi-strategy) ─────────────────────────
     chunks = search_brand(brand_slug, enriched_query, top_k=20)
     chunks = _prioritize_symptom_chunks(chunks, enriched_query, brand_name)
@@ -392,13 +537,22 @@ async def chat(
     # Fallback search strategies
     confidence = analyze_search_confidence(chunks, enriched_query)
 
+    # Keyword terms and the original query (when enrichment changed it a lot) are
+    # searched together in one batched retrieval round.
     if not confidence["confident"] or confidence["top_score"] < 0.70:
+        fallback_queries = []
         keywords = _extract_search_keywords(enriched_query)
         if keywords:
             logger.info(f"Low confidence ({confidence['reason']}), trying keyword fallback: {keywords}")
+            fallback_queries.extend(keywords[:3])
+        if enriched_query != query and len(enriched_query) > len(query) * 1.5:
+            fallback_query = _expand_brand_query_terms(query, brand_name)
+            logger.info(f"Trying original query as fallback: '{fallback_query}'")
+            fallback_queries.append(fallback_query)
+
+        if fallback_queries:
             existing_keys = {(c["doc_id"], c["page"]) for c in chunks}
-            for term in keywords[:3]:
-                extra_chunks = search_brand(brand_slug, term, top_k=10)
+            for extra_chunks in search_brand_many(brand_slug, fallback_queries, top_k=10).values():
                 for ec in extra_chunks:
                     key = (ec["doc_id"], ec["page"])
                     if key not in existing_keys:
@@ -411,23 +565,6 @@ async def chat(
             confidence = analyze_search_confidence(chunks, enriched_query)
             logger.info(f"After fallback: confidence={confidence['reason']}, top={confidence['top_score']:.3f}")
 
-    # Also try the original query separately if enriched query is very different
-    if (enriched_query != query and len(enriched_query) > len(query) * 1.5
-            and (not confidence["confident"] or confidence["top_score"] < 0.70)):
-        fallback_query = _expand_brand_query_terms(query, brand_name)
-        logger.info(f"Trying original query as fallback: '{fallback_query}'")
-        original_chunks = search_brand(brand_slug, fallback_query, top_k=10)
-        existing_keys = {(c["doc_id"], c["page"]) for c in chunks}
-        for oc in original_chunks:
-            key = (oc["doc_id"], oc["page"])
-            if key not in existing_keys:
-                chunks.append(oc)
-                existing_keys.add(key)
-        chunks.sort(key=lambda x: x["score"], reverse=True)
-        chunks = _prioritize_symptom_chunks(chunks, enriched_query, brand_name)
-        chunks = chunks[:25]
-        confidence = analyze_search_confidence(chunks, enriched_query)
-
     logger.info(
         f"Search confidence: {confidence['reason']} "
         f"(top={confidence['top_score']:.3f}, "
@@ -457,7 +594,7 @@ async def chat(
                 )
                 if disambig:
                     logger.info(f"Disambiguation question: '{disambig}'")
-                    return await _save_and_return(db, session, disambig, [], True)
+                    return ChatTurn(session, history, reply=disambig, needs_clarification=True)
 
                 # Fallback: generic model question
                 model_guard = (
@@ -465,7 +602,7 @@ async def chat(
                     "(ex.: Gen2 com GECB, ADV-210 com LCB1, MRL, OVF10). "
                     "Sem isso eu posso cruzar versões diferentes e te passar um procedimento errado."
                 )
-                return await _save_and_return(db, session, model_guard, [], True)
+                return ChatTurn(session, history, reply=model_guard, needs_clarification=True)
 
         # 6b. If NO specific equipment/model was identified AND results are NOT confident,
         #     ask for more specific info (board, error, symptom).
@@ -480,7 +617,7 @@ async def chat(
                 )
                 if progressive_q:
                     logger.info(f"Progressive question (round {clarification_rounds + 1}): '{progressive_q}'")
-                    return await _save_and_return(db, session, progressive_q, [], True)
+                    return ChatTurn(session, history, reply=progressive_q, needs_clarification=True)
 
         # 6c. Variant disambiguation for queries that return many similar-scoring docs.
         #     Two-tier: stricter when user gave a specific identifier (we don't want to
@@ -507,13 +644,13 @@ async def chat(
                 enriched_query, brand_name, chunks
             )
             if disambig:
-                return await _save_and_return(db, session, disambig, [], True)
+                return ChatTurn(session, history, reply=disambig, needs_clarification=True)
             if len(unique_docs_6c) >= 2:
                 fallback_disambig = (
                     "Encontrei mais de uma versão de manual/diagrama para esse tema. "
                     "Qual versão exata você quer (modelo, revisão/arquivo ou código completo)?"
                 )
-                return await _save_and_return(db, session, fallback_disambig, [], True)
+                return ChatTurn(session, history, reply=fallback_disambig, needs_clarification=True)
 
     # ── Phase 7: We're answering now ────────────────────────────────────
     # Either we have enough confidence, or we've exhausted our question budget
@@ -524,21 +661,33 @@ async def chat(
             f"answering with best available (confidence: {confidence['reason']})"
         )
 
-    # Rerank with Gemini
+    # Ground on the fault-code rows found for the query (ambiguous equipment
+    # kept them off the fast path) — the reranker sees them with the search hits
+    if fault_lookup and fault_lookup.rows:
+        top_score = chunks[0]["score"] if chunks else 1.0
+        row_chunks = fault_code_chunks(fault_lookup, brand_slug, score=top_score)
+        row_keys = {(c["doc_id"], c["page"]) for c in row_chunks}
+        chunks = row_chunks + [c for c in chunks if (c["doc_id"], c["page"]) not in row_keys]
+
+    # Rerank with Gemini — in single-pass mode the answer call selects the
+    # passages itself, and the rerank only runs if it falls back
+    deferred_rerank = False
     if chunks:
-        chunks = await rerank_chunks(enriched_query, chunks)
-        chunks = chunks[:7]  # top 7 after rerank
+        if settings.answer_single_pass:
+            chunks = chunks[:SINGLE_PASS_MAX_PASSAGES]
+            deferred_rerank = True
+        else:
+            chunks = await rerank(enriched_query, chunks)
+            chunks = chunks[:7]  # top 7 after rerank
 
     # Find alternative docs that might be useful
     alternative_docs = get_alternative_docs_for_context(known_context, chunks)
 
-    # Generate answer
-    answer, sources = await generate_answer(
-        enriched_query, brand_name, chunks, history, alternative_docs
+    return ChatTurn(
+        session, history, query=enriched_query, chunks=chunks,
+        alternative_docs=alternative_docs, deferred_rerank=deferred_rerank,
     )
 
-    return await _save_and_return(db, session, answer, sources, False)
-
 
 async def _save_and_return(
     db: AsyncSession,
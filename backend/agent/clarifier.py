@@ -1,8 +1,15 @@
 import re
+import time
 import logging
+import threading
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
 from config import get_settings
+from ingestion.embedder import _normalize_for_matching
+from ingestion.llm_usage import record_llm_call
+from ingestion.sparse import STOPWORDS
+from ingestion.reranker import log_rerank_labels
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -442,6 +449,7 @@ async def _ensure_portuguese_technical_quality(answer: str, query: str, brand_na
             query=query,
             answer=normalized,
         )
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=CHAT_MODEL,
             contents=prompt,
@@ -450,6 +458,7 @@ async def _ensure_portuguese_technical_quality(answer: str, query: str, brand_na
                 max_output_tokens=4096,
             ),
         )
+        record_llm_call("rewrite", started, response)
 
         rewritten = _normalize_assistant_text(response.text or "")
         return rewritten or normalized
@@ -746,19 +755,189 @@ async def generate_smart_clarification(
         return _default_clarification_question(brand_name)
 
 
+# ---------------------------------------------------------------------------
+# Multi-turn search query: rules first, Gemini only when the rules are unsure
+# ---------------------------------------------------------------------------
+ACKNOWLEDGEMENT_PATTERN = r"^\s*(sim|s|ok|okay|certo|isso|exato|exatamente|claro|beleza|blz|pode ser|correto)\s*[.!]*\s*$"
+# References that only the conversation (often the assistant's last answer) resolves
+ANAPHORA_PATTERN = r"\b(isso|isto|disso|nisso|esse|essa|desse|dessa|nesse|nessa|este|esta|ele|ela|dele|dela|aquilo|aquele|aquela|mesmo|mesma)\b"
+# Question scaffolding: not worth searching for
+FILLER_WORDS = {
+    "como", "qual", "quais", "onde", "quando", "porque", "quanto", "quanta", "pode", "posso",
+    "devo", "fazer", "faço", "faco", "tenho", "preciso", "está", "esta", "estou", "você",
+    "voce", "sobre", "favor", "obrigado", "obrigada", "agora", "também", "tambem", "então",
+    "entao", "ainda", "tudo", "algum", "alguma", "aqui", "isso", "esse", "essa", "seria",
+    "sabe", "quero", "queria", "gostaria", "saber", "ajuda", "ajudar", "elevador",
+}
+CONTEXT_KEYS = ("model", "board", "drive", "error_code", "symptom")
+
+_enrichment_lock = threading.Lock()
+_enrichment_stats = {path: {"count": 0, "ms": 0.0} for path in ("rules", "llm")}
+_enrichment_reasons: dict[str, int] = {}
+
+
+def _turn_terms(text: str) -> list[str]:
+    """Words of a user turn worth searching for (original casing, edge punctuation stripped)."""
+    if re.match(ACKNOWLEDGEMENT_PATTERN, text or "", re.IGNORECASE):
+        return []
+    terms = []
+    for word in (text or "").split():
+        clean = word.strip("()[].,;:!?\"'")
+        folded = _normalize_for_matching(clean)
+        if not folded or folded in STOPWORDS or clean.lower() in FILLER_WORDS:
+            continue
+        if len(folded) >= 3 or re.search(r"\d", folded) or clean.isupper():
+            terms.append(clean)
+    return terms
+
+
+def _is_topic_word(term: str) -> bool:
+    """A plain word (procedure, symptom, component) rather than a code."""
+    return term.isalpha() and len(term) >= 4 and not term.isupper()
+
+
+def _topic_stems(terms: list[str]) -> set[str]:
+    """Folded 5-letter stems of the topic words ("calibrar" ~ "calibração")."""
+    return {_normalize_for_matching(t)[:5] for t in terms if _is_topic_word(t)}
+
+
+def build_rule_based_query(query: str, history: list[dict], known_context: dict) -> tuple[str, str | None]:
+    """
+    Search query from the current turn plus what the conversation already settled.
+    A short answer ("OVF10") gets the last user question that had a topic and the
+    whole known context; a turn with its own topic on the same subject only gets
+    the equipment (model/board/drive) it does not name itself.
+    Returns (query, reason) where reason is None when the rules are confident,
+    otherwise why Gemini should build the query instead.
+    """
+    history = history or []
+    if re.match(ACKNOWLEDGEMENT_PATTERN, query or "", re.IGNORECASE):
+        # "sim" means whatever the assistant just asked ("É o modelo Gen2?")
+        if history and history[-1].get("role") == "assistant" and "?" in history[-1].get("content", ""):
+            return query, "acknowledgement"
+    elif re.search(ANAPHORA_PATTERN, query or "", re.IGNORECASE):
+        return query, "anaphora"
+
+    terms = _turn_terms(query)
+    anchor_terms = next(
+        (
+            turn_terms for turn_terms in (
+                _turn_terms(m.get("content", "")) for m in reversed(history) if m.get("role") == "user"
+            )
+            if len(_topic_stems(turn_terms)) >= 2
+        ),
+        None,
+    )
+    current_topic = _topic_stems(terms)
+
+    if len(current_topic) < 2:
+        # Short answer to a clarification: the topic is in an earlier question
+        if anchor_terms is None:
+            return query, "no_topic"
+        terms = terms + anchor_terms
+        context_keys = CONTEXT_KEYS
+    else:
+        if anchor_terms is not None and not current_topic & _topic_stems(anchor_terms):
+            # New subject: which earlier details still apply is a judgement call
+            return query, "topic_shift"
+        # Same subject: add the equipment the turn does not name; earlier error
+        # codes and symptoms may belong to a different step of the diagnosis
+        own = extract_known_context(query, [])
+        context_keys = [key for key in ("model", "board", "drive") if not own.get(key)]
+
+    for key in context_keys:
+        if known_context.get(key):
+            terms.append(known_context[key])
+
+    # Dedupe on the folded form: "OVF 10" == "ovf10", "porta abre e fecha" after "porta abre fecha"
+    seen: set[str] = set()
+    parts = []
+    for term in terms:
+        words = [w for w in _normalize_for_matching(term).split() if w not in STOPWORDS]
+        key = "".join(words)
+        if not key or key in seen or all(w in seen for w in words):
+            continue
+        seen.add(key)
+        seen.update(words)
+        parts.append(term)
+    enriched = " ".join(parts)[:300].strip()
+    if not enriched:
+        return query, "no_topic"
+    return enriched, None
+
+
+def _record_enrichment(path: str, started: float, reason: str | None = None):
+    with _enrichment_lock:
+        _enrichment_stats[path]["count"] += 1
+        _enrichment_stats[path]["ms"] += (time.perf_counter() - started) * 1000
+        if reason:
+            _enrichment_reasons[reason] = _enrichment_reasons.get(reason, 0) + 1
+
+
+def query_enrichment_stats() -> dict:
+    """How many multi-turn queries each path built and its average latency (this worker)."""
+    with _enrichment_lock:
+        total = sum(stats["count"] for stats in _enrichment_stats.values())
+        return {
+            "mode": settings.query_enrichment,
+            "total": total,
+            "paths": {
+                path: {
+                    "count": stats["count"],
+                    "share": round(stats["count"] / total, 3) if total else 0.0,
+                    "avg_ms": round(stats["ms"] / stats["count"], 2) if stats["count"] else 0.0,
+                }
+                for path, stats in _enrichment_stats.items()
+            },
+            "llm_reasons": dict(_enrichment_reasons),
+        }
+
+
+def reset_query_enrichment_stats():
+    with _enrichment_lock:
+        for stats in _enrichment_stats.values():
+            stats["count"] = 0
+            stats["ms"] = 0.0
+        _enrichment_reasons.clear()
+
+
 async def build_enriched_query_from_history(
     query: str,
     brand_name: str,
     history: list[dict],
+    known_context: dict | None = None,
 ) -> str:
     """
     Build an optimized search query from the conversation history.
-    Combines model info, symptoms, codes from the whole conversation.
-    Uses both a fast heuristic and Gemini for enrichment.
+    In "rules" mode (QUERY_ENRICHMENT) the query comes from build_rule_based_query
+    and Gemini is only asked when the rules are unsure; "llm" always asks Gemini.
     """
     if not history or len(history) < 2:
         return query
 
+    started = time.perf_counter()
+    reason = "always"
+    if settings.query_enrichment == "rules":
+        if known_context is None:
+            known_context = extract_known_context(query, history)
+        enriched, reason = build_rule_based_query(query, history, known_context)
+        if reason is None:
+            _record_enrichment("rules", started)
+            logger.info(f"Enriched query (rules): '{query}' -> '{enriched}'")
+            return enriched
+
+    enriched = await _build_enriched_query_with_llm(query, brand_name, history)
+    _record_enrichment("llm", started, reason)
+    logger.info(f"Query enrichment used Gemini ({reason}), {(time.perf_counter() - started) * 1000:.0f}ms")
+    return enriched
+
+
+async def _build_enriched_query_with_llm(
+    query: str,
+    brand_name: str,
+    history: list[dict],
+) -> str:
+    """Gemini enrichment over the last messages; falls back to the joined user messages."""
     # --- Fast heuristic: combine all user messages ---
     user_messages = [m["content"] for m in history if m["role"] == "user"]
     # Add current query
@@ -800,6 +979,7 @@ async def build_enriched_query_from_history(
             query=query,
         )
 
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=CHAT_MODEL,
             contents=prompt,
@@ -808,6 +988,7 @@ async def build_enriched_query_from_history(
                 max_output_tokens=200,
             ),
         )
+        record_llm_call("enrich", started, response)
 
         enriched = (response.text or "").strip()
         # Sanity: single line, not too short, not too long
@@ -906,6 +1087,95 @@ async def get_clarification_question(query: str, brand_name: str) -> str:
         return _default_clarification_question(brand_name)
 
 
+# Candidates the single-pass answer chooses from (the rerank window)
+SINGLE_PASS_MAX_PASSAGES = 10
+
+SINGLE_PASS_INSTRUCTION = """
+
+MODO DE RESPOSTA ESTRUTURADA:
+Os trechos do contexto vêm de uma busca e podem incluir trechos irrelevantes para a pergunta atual.
+1. Em "relevant_passages", liste os números [Trecho N] que realmente ajudam a responder, do mais para o menos relevante.
+2. Em "answer", escreva a resposta usando SOMENTE esses trechos, seguindo todas as regras acima, em português do Brasil.
+3. Em "cited_passages", liste os números dos trechos que a resposta efetivamente usou.
+"""
+
+NO_ANSWER_TEXT = "Não encontrei informação suficiente nos documentos desta marca para responder com segurança."
+ANSWER_ERROR_TEXT = "Desculpe, ocorreu um erro ao gerar a resposta. Tente novamente."
+
+
+def _build_answer_prompt(
+    query: str,
+    brand_name: str,
+    chunks: list[dict],
+    chat_history: list[dict],
+    alternative_docs: list[str] | None = None,
+) -> str:
+    # Build context from chunks
+    context_parts = []
+    for i, chunk in enumerate(chunks, 1):
+        source = chunk["source"]
+        display = source.split("/")[-1] if "/" in source else source
+        context_parts.append(
+            f"[Trecho {i}]\n"
+            f"Arquivo: {display}\n"
+            f"Página: {chunk['page']}\n"
+            f"Conteúdo: {chunk['text']}\n"
+        )
+    context = "\n---\n".join(context_parts) if context_parts else "Nenhum documento relevante encontrado."
+
+    # Build history text
+    history_parts = []
+    for msg in chat_history[-6:]:  # last 3 turns
+        role = "Técnico" if msg["role"] == "user" else "Assistente"
+        history_parts.append(f"{role}: {msg['content']}")
+    history = "\n".join(history_parts) if history_parts else "Início da conversa."
+
+    system = SYSTEM_PROMPT.format(
+        brand_name=brand_name,
+        context=context,
+        history=history,
+    )
+
+    # Add instruction about alternative docs if available
+    alt_instruction = ""
+    if alternative_docs:
+        alt_list = ", ".join(alternative_docs[:5])
+        alt_instruction = (
+            f"\n\nINSTRUÇÃO ADICIONAL: Ao final da resposta, mencione que também existem "
+            f"documentos relacionados disponíveis: {alt_list}. "
+            f"Pergunte se o técnico quer consultar algum deles."
+        )
+
+    return f"{system}{alt_instruction}\n\nPergunta atual: {query}"
+
+
+def answer_sources(chunks: list[dict]) -> list[dict]:
+    """Sources list of an answer grounded on chunks (clean display names, one per page)."""
+    sources = []
+    seen_sources = set()
+    for c in chunks:
+        source = c["source"]
+        display = source.split("/")[-1] if "/" in source else source
+        key = f"{display}-{c['page']}"
+        if key not in seen_sources:
+            seen_sources.add(key)
+            sources.append({
+                "filename": display,
+                "page": c["page"],
+                "doc_id": c.get("doc_id"),
+                "score": round(c.get("rerank_score", c.get("score", 0)), 3),
+            })
+    return sources
+
+
+async def finalize_answer(text: str, query: str, brand_name: str) -> str:
+    """Normalized answer text, rewritten to PT-BR when needed."""
+    answer = _normalize_assistant_text(text or "")
+    if not answer:
+        return NO_ANSWER_TEXT
+    return await _ensure_portuguese_technical_quality(answer, query, brand_name)
+
+
 async def generate_answer(
     query: str,
     brand_name: str,
@@ -919,44 +1189,9 @@ async def generate_answer(
     If alternative_docs is provided, mention them at the end.
     """
     try:
-        # Build context from chunks
-        context_parts = []
-        for i, chunk in enumerate(chunks, 1):
-            source = chunk["source"]
-            display = source.split("/")[-1] if "/" in source else source
-            context_parts.append(
-                f"[Trecho {i}]\n"
-                f"Arquivo: {display}\n"
-                f"Página: {chunk['page']}\n"
-                f"Conteúdo: {chunk['text']}\n"
-            )
-        context = "\n---\n".join(context_parts) if context_parts else "Nenhum documento relevante encontrado."
-
-        # Build history text
-        history_parts = []
-        for msg in chat_history[-6:]:  # last 3 turns
-            role = "Técnico" if msg["role"] == "user" else "Assistente"
-            history_parts.append(f"{role}: {msg['content']}")
-        history = "\n".join(history_parts) if history_parts else "Início da conversa."
-
-        system = SYSTEM_PROMPT.format(
-            brand_name=brand_name,
-            context=context,
-            history=history,
-        )
-
-        # Add instruction about alternative docs if available
-        alt_instruction = ""
-        if alternative_docs:
-            alt_list = ", ".join(alternative_docs[:5])
-            alt_instruction = (
-                f"\n\nINSTRUÇÃO ADICIONAL: Ao final da resposta, mencione que também existem "
-                f"documentos relacionados disponíveis: {alt_list}. "
-                f"Pergunte se o técnico quer consultar algum deles."
-            )
-
-        full_prompt = f"{system}{alt_instruction}\n\nPergunta atual: {query}"
+        full_prompt = _build_answer_prompt(query, brand_name, chunks, chat_history, alternative_docs)
 
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=CHAT_MODEL,
             contents=full_prompt,
@@ -965,36 +1200,110 @@ async def generate_answer(
                 max_output_tokens=4096,
             ),
         )
+        record_llm_call("answer", started, response)
 
-        answer = _normalize_assistant_text(response.text or "")
-        if not answer:
-            answer = "Não encontrei informação suficiente nos documentos desta marca para responder com segurança."
-        answer = await _ensure_portuguese_technical_quality(answer, query, brand_name)
-
-        # Extract sources from chunks used (clean display names)
-        sources = []
-        seen_sources = set()
-        for c in chunks:
-            source = c["source"]
-            display = source.split("/")[-1] if "/" in source else source
-            key = f"{display}-{c['page']}"
-            if key not in seen_sources:
-                seen_sources.add(key)
-                sources.append({
-                    "filename": display,
-                    "page": c["page"],
-                    "doc_id": c.get("doc_id"),
-                    "score": round(c.get("rerank_score", c.get("score", 0)), 3),
-                })
-
-        return answer, sources
+        answer = await finalize_answer(response.text or "", query, brand_name)
+        return answer, answer_sources(chunks)
 
     except Exception as e:
         logger.error(f"Answer generation error: {e}")
-        return (
-            "Desculpe, ocorreu um erro ao gerar a resposta. Tente novamente.",
-            [],
+        return (ANSWER_ERROR_TEXT, [])
+
+
+async def stream_answer(
+    query: str,
+    brand_name: str,
+    chunks: list[dict],
+    chat_history: list[dict],
+    alternative_docs: list[str] | None = None,
+):
+    """
+    Same answer as generate_answer, yielded as text deltas while Gemini writes
+    it. The caller joins the deltas and passes them through finalize_answer.
+    Errors propagate (the caller decides what the user sees).
+    """
+    full_prompt = _build_answer_prompt(query, brand_name, chunks, chat_history, alternative_docs)
+    started = time.perf_counter()
+    stream = await client.aio.models.generate_content_stream(
+        model=CHAT_MODEL,
+        contents=full_prompt,
+        config=types.GenerateContentConfig(
+            temperature=0.1,
+            max_output_tokens=4096,
+        ),
+    )
+    last = None
+    async for part in stream:
+        last = part
+        if part.text:
+            yield part.text
+    # The last streamed chunk carries the usage totals
+    record_llm_call("answer_stream", started, last)
+
+
+class GroundedAnswer(BaseModel):
+    relevant_passages: list[int]
+    answer: str
+    cited_passages: list[int]
+
+
+async def generate_grounded_answer(
+    query: str,
+    brand_name: str,
+    chunks: list[dict],
+    chat_history: list[dict],
+    alternative_docs: list[str] | None = None,
+) -> tuple[str, list[dict]] | None:
+    """
+    Single-pass answer: one structured-output call picks the relevant passages
+    among the search candidates (by [Trecho N] number), answers in PT-BR and
+    lists the passages it cited — instead of rerank + answer + rewrite.
+    Returns (answer_text, sources_list) or None when the output is unusable
+    (the caller falls back to the rerank path). The PT-BR rewrite still runs
+    if the answer trips _needs_portuguese_rewrite.
+    """
+    candidates = chunks[:SINGLE_PASS_MAX_PASSAGES]
+    try:
+        prompt = _build_answer_prompt(query, brand_name, candidates, chat_history, alternative_docs)
+        started = time.perf_counter()
+        response = await client.aio.models.generate_content(
+            model=CHAT_MODEL,
+            contents=f"{prompt}{SINGLE_PASS_INSTRUCTION}",
+            config=types.GenerateContentConfig(
+                temperature=0.1,
+                max_output_tokens=4096,
+                response_mime_type="application/json",
+                response_schema=GroundedAnswer,
+            ),
         )
+        record_llm_call("single_pass", started, response)
+        result = response.parsed
+        if not isinstance(result, GroundedAnswer):
+            result = GroundedAnswer.model_validate_json(response.text or "")
+    except Exception as e:
+        logger.warning(f"Single-pass answer failed: {e}")
+        return None
+
+    answer = _normalize_assistant_text(result.answer)
+    if not answer:
+        logger.warning("Single-pass answer: empty answer")
+        return None
+
+    def valid(ids: list[int]) -> list[int]:
+        return [i for i in dict.fromkeys(ids) if 1 <= i <= len(candidates)]
+
+    relevant = valid(result.relevant_passages)
+    cited = valid(result.cited_passages) or relevant
+    # The passage selection doubles as rerank labels (relevant = 10, others = 0)
+    log_rerank_labels(
+        query, candidates, [10.0 if i in relevant else 0.0 for i in range(1, len(candidates) + 1)], "single_pass"
+    )
+    logger.info(
+        f"Single-pass answer: {len(relevant)}/{len(candidates)} passages relevant, "
+        f"cited {cited}"
+    )
+    answer = await _ensure_portuguese_technical_quality(answer, query, brand_name)
+    return answer, answer_sources([candidates[i - 1] for i in cited])
 
 
 # ---------------------------------------------------------------------------
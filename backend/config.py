@@ -14,22 +14,69 @@ class Settings(BaseSettings):
     # Qdrant
     qdrant_host: str = "localhost"
     qdrant_port: int = 6333
+    qdrant_grpc_port: int = 6334
+    qdrant_prefer_grpc: bool = False
+    qdrant_timeout_seconds: int = 30
+    # ":memory:" or a directory: embedded Qdrant instead of the server (offline benchmarks)
+    qdrant_local_path: str = ""
+    # Storage/HNSW profile for brand collections: default | balanced | compact | high_recall
+    qdrant_collection_profile: str = "default"
+
+    # Group Phase 1 search results by document in Qdrant (diversity in one round trip)
+    search_group_by_doc: bool = True
+    # Skip search phases 2-4 when Phase 1 results are already confident
+    search_adaptive_planner: bool = True
+    # Restrict Phase 1 to the documents the query's identifiers (GECB, LCB2...) point to
+    search_routing: bool = True
+    # On large brands, pick Phase 1 documents from document/page summary vectors first
+    search_coarse_to_fine: bool = True
+    # Answer exact fault-code lookups from the fault_codes table (no vector search)
+    fault_code_fast_path: bool = True
+    # One structured Gemini call selects passages, answers in PT-BR and cites them;
+    # the separate rerank and rewrite calls only run as fallbacks
+    answer_single_pass: bool = True
+    # Answer-candidate rerank: gemini | local (learned model, CPU) | hybrid (local, Gemini on low margin)
+    reranker: str = "hybrid"
+    reranker_model_path: str = "/app/data/reranker_model.json"
+    # hybrid asks Gemini when a local pass/fail decision is this close to p=0.5
+    reranker_min_margin: float = 0.1
+    # Gemini rerank scores logged as training labels for scripts/train_reranker.py ("" = off)
+    rerank_labels_path: str = "/app/data/rerank_labels.jsonl"
+    rerank_cache_max_entries: int = 1024
+    rerank_cache_ttl_seconds: int = 3600
+    # Multi-turn search query: rules (known context + current turn, Gemini only when unsure) | llm (always Gemini)
+    query_enrichment: str = "rules"
+
+    # Search result cache (per process; 0 entries disables it)
+    search_cache_max_entries: int = 512
+    search_cache_ttl_seconds: int = 900
 
     # Database
     database_url: str = "sqlite:////app/data/andreja.db"
 
     # Storage
     upload_dir: str = "/app/data/uploads"
+    # Chunk text side store (SQLite); when enabled, Qdrant payloads carry no chunk text
+    chunk_store_path: str = "/app/data/chunks.db"
+    chunk_text_in_store: bool = True
     images_dir: str = "/app/data/images"
 
     # Ingestion performance (safe defaults)
     ingestion_concurrency: int = 2
     ingestion_provider: str = "gemini"  # gemini | open_source
     ingestion_page_delay_seconds: float = 0.0
+    # Page chunking: contextual (overlapping windows) | token_budget (scripts/compare_chunkers.py)
+    chunking_strategy: str = "contextual"
+    chunk_target_tokens: int = 400
+    chunk_overlap_tokens: int = 40
 
     # Embeddings provider (gemini | open_source)
     embedding_provider: str = "gemini"
     embedding_vector_size: int = 768
+    # Matryoshka prefix stored as a second "mini" vector for the wide first pass (0 = off).
+    # Unset: 256 for gemini (Matryoshka-trained), off for other providers until
+    # scripts/mini_vector_recall.py shows their prefixes keep recall
+    embedding_mini_vector_size: int | None = None
 
     # Open-source vision (Ollama)
     ollama_base_url: str = "http://host.docker.internal:11434"
@@ -3,8 +3,12 @@ from sqlalchemy import event, select
 from models import Base, User, Brand, Document
 from config import get_settings
 from security import get_password_hash
+from ingestion.page_index import create_page_fts
+from ingestion.doc_catalog import load_doc_catalog
 import os
+import logging
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
 # Convert sqlite:/// to sqlite+aiosqlite:///
@@ -30,6 +34,11 @@ async def init_db():
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        try:
+            await conn.run_sync(create_page_fts)
+        except Exception as e:
+            logger.warning(f"Could not create pages_fts index (FTS5 unavailable?): {e}")
+        await conn.run_sync(load_doc_catalog)
 
     async with AsyncSessionLocal() as session:
         # Recover orphaned processing docs after crash/restart
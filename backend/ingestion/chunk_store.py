@@ -0,0 +1,125 @@
+import os
+import sqlite3
+import logging
+import threading
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Side store for chunk text, keyed by Qdrant point id. Lives in its own SQLite
+# file so ingestion writes never contend with the app database. Qdrant keeps
+# only the small fields used for filtering/scoring; search_brand reads text
+# (and the precomputed scoring forms) from here for the candidates it scores.
+CHUNK_STORE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS chunks (
+        point_id TEXT PRIMARY KEY,
+        collection TEXT NOT NULL,
+        doc_id INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        words TEXT NOT NULL DEFAULT '',
+        compact TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_chunks_collection_doc ON chunks(collection, doc_id)",
+]
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_MAX_PARAMS = 900
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.Lock()
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        path = settings.chunk_store_path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        for statement in CHUNK_STORE_DDL:
+            conn.execute(statement)
+        conn.commit()
+        _conn = conn
+    return _conn
+
+
+def put_chunks(collection_name: str, rows: list[tuple[str, int, str, dict]]):
+    """Store (point_id, doc_id, text, features) rows; features as built by _chunk_scoring_features."""
+    if not rows:
+        return
+    records = [
+        (
+            str(point_id),
+            collection_name,
+            doc_id,
+            text or "",
+            " ".join((features or {}).get("words") or []),
+            (features or {}).get("compact", ""),
+        )
+        for point_id, doc_id, text, features in rows
+    ]
+    with _lock:
+        conn = _connection()
+        conn.executemany(
+            "INSERT OR REPLACE INTO chunks(point_id, collection, doc_id, text, words, compact) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            records,
+        )
+        conn.commit()
+
+
+def get_chunks(point_ids: list) -> dict[str, dict]:
+    """point_id → {"text", "features"} for the ids present in the store."""
+    ids = list(dict.fromkeys(str(pid) for pid in point_ids))
+    found: dict[str, dict] = {}
+    if not ids:
+        return found
+
+    with _lock:
+        conn = _connection()
+        for start in range(0, len(ids), _MAX_PARAMS):
+            batch = ids[start:start + _MAX_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            for point_id, text, words, compact in conn.execute(
+                f"SELECT point_id, text, words, compact FROM chunks WHERE point_id IN ({placeholders})",
+                batch,
+            ):
+                found[point_id] = {
+                    "text": text,
+                    "features": {"words": words.split(), "compact": compact},
+                }
+    return found
+
+
+def delete_document_chunks(collection_name: str, doc_id: int):
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM chunks WHERE collection = ? AND doc_id = ?", (collection_name, doc_id))
+        conn.commit()
+
+
+def delete_collection_chunks(collection_name: str):
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM chunks WHERE collection = ?", (collection_name,))
+        conn.commit()
+
+
+def delete_point_chunks(point_ids: list[str]):
+    if not point_ids:
+        return
+    with _lock:
+        conn = _connection()
+        conn.executemany("DELETE FROM chunks WHERE point_id = ?", [(str(pid),) for pid in point_ids])
+        conn.commit()
+
+
+def chunk_store_stats() -> dict:
+    with _lock:
+        conn = _connection()
+        count, text_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0) FROM chunks").fetchone()
+    return {"chunks": count, "text_bytes": text_bytes}
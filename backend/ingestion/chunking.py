@@ -0,0 +1,218 @@
+import re
+import logging
+from dataclasses import dataclass
+from typing import Callable
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Page → chunk strategies, selected by CHUNKING_STRATEGY:
+#   contextual:   table rows + fault-code windows + sliding line windows, capped
+#                 at 8 per page (embedder._build_contextual_chunks)
+#   token_budget: the page cut into units (table rows, fault-code blocks,
+#                 paragraphs) packed into chunks of ~CHUNK_TARGET_TOKENS, with at
+#                 most CHUNK_OVERLAP_TOKENS of paragraph text carried over. Table
+#                 rows and fault-code blocks are never split or repeated.
+CHUNKER_CONTEXTUAL = "contextual"
+CHUNKER_TOKEN_BUDGET = "token_budget"
+
+SEPARATOR_ROW = re.compile(r"^\|?\s*[:\-]{2,}(\s*\|\s*[:\-]{2,})+\|?$")
+# A line that starts with a fault code ("UV1 -", "E10:", "100 Falha...") or names one
+FAULT_LINE = re.compile(
+    r"^\W*(?:[A-Z]{1,5}[\-.]?\d{1,4}[A-Z]?\b|\d{2,4}\s*[\-–:])"
+    r"|(?i:\b(?:erro|falha|c[oó]digo|alarme)\s*[:#nº°]*\s*[A-Z]{0,5}\d{1,4}\b)"
+)
+# Lines kept with a fault-code line (its description, cause and action)
+FAULT_BLOCK_MAX_LINES = 6
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Subword token estimate: one per word or symbol, plus one per 6 chars of long words."""
+    return sum(1 + (len(piece) - 1) // 6 for piece in _TOKEN_PATTERN.findall(text or ""))
+
+
+@dataclass
+class ChunkUnit:
+    text: str
+    tokens: int
+    atomic: bool  # table rows and fault-code blocks: never split across chunks
+    header: str = ""  # table header repeated at the top of each chunk holding its rows
+
+
+def _unit(lines: list[str], atomic: bool, header: str = "") -> ChunkUnit:
+    text = "\n".join(lines)
+    return ChunkUnit(text=text, tokens=estimate_tokens(text), atomic=atomic, header=header)
+
+
+def _table_units(table_lines: list[str], target_tokens: int) -> list[ChunkUnit]:
+    """A table that fits the budget is one unit; otherwise one unit per logical row."""
+    whole = _unit(table_lines, atomic=True)
+    if whole.tokens <= target_tokens:
+        return [whole]
+
+    header_lines: list[str] = []
+    body = table_lines
+    separator = next((i for i, line in enumerate(table_lines[:4]) if SEPARATOR_ROW.match(line)), None)
+    if separator is not None:
+        header_lines, body = table_lines[:separator + 1], table_lines[separator + 1:]
+    header = "\n".join(header_lines)
+
+    units: list[ChunkUnit] = []
+    row: list[str] = []
+    for line in body:
+        first_cell = line.strip().strip("|").split("|")[0].strip()
+        # An empty first cell continues the row above (multi-line cells)
+        if row and first_cell:
+            units.append(_unit(row, atomic=True, header=header))
+            row = []
+        row.append(line)
+    if row:
+        units.append(_unit(row, atomic=True, header=header))
+    return units
+
+
+def page_units(text: str, target_tokens: int) -> list[ChunkUnit]:
+    lines = [line.rstrip() for line in (text or "").strip().splitlines()]
+    units: list[ChunkUnit] = []
+    paragraph: list[str] = []
+
+    def flush_paragraph():
+        if paragraph:
+            units.append(_unit(list(paragraph), atomic=False))
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not line.strip():
+            flush_paragraph()
+            i += 1
+        elif "|" in line:
+            flush_paragraph()
+            table: list[str] = []
+            while i < len(lines) and "|" in lines[i]:
+                table.append(lines[i].strip())
+                i += 1
+            units.extend(_table_units(table, target_tokens))
+        elif FAULT_LINE.search(line):
+            flush_paragraph()
+            block = [line]
+            i += 1
+            while (
+                i < len(lines) and len(block) < FAULT_BLOCK_MAX_LINES and lines[i].strip()
+                and "|" not in lines[i] and not FAULT_LINE.search(lines[i])
+            ):
+                block.append(lines[i])
+                i += 1
+            units.append(_unit(block, atomic=True))
+        else:
+            if line.lstrip().startswith("#"):
+                flush_paragraph()
+            paragraph.append(line)
+            i += 1
+    flush_paragraph()
+    return units
+
+
+def _split_oversized(unit: ChunkUnit, target_tokens: int) -> list[ChunkUnit]:
+    """Cut a unit larger than the budget at line (or, for one huge line, word) boundaries."""
+    if unit.tokens <= target_tokens:
+        return [unit]
+    pieces: list[ChunkUnit] = []
+    current: list[str] = []
+    current_tokens = 0
+    for line in unit.text.splitlines():
+        parts = [line]
+        if estimate_tokens(line) > target_tokens:
+            words = line.split()
+            step = max(1, len(words) * target_tokens // estimate_tokens(line))
+            parts = [" ".join(words[j:j + step]) for j in range(0, len(words), step)]
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if current and current_tokens + tokens > target_tokens:
+                pieces.append(_unit(current, unit.atomic, unit.header))
+                current, current_tokens = [], 0
+            current.append(part)
+            current_tokens += tokens
+    if current:
+        pieces.append(_unit(current, unit.atomic, unit.header))
+    return pieces
+
+
+def _overlap_tail(unit: ChunkUnit, overlap_tokens: int) -> list[str]:
+    """Trailing lines of a paragraph unit, at most overlap_tokens, to open the next chunk."""
+    if unit.atomic or overlap_tokens <= 0:
+        return []
+    tail: list[str] = []
+    tokens = 0
+    for line in reversed(unit.text.splitlines()):
+        line_tokens = estimate_tokens(line)
+        if tokens + line_tokens > overlap_tokens:
+            break
+        tail.insert(0, line)
+        tokens += line_tokens
+    return tail
+
+
+def token_budget_chunks(text: str, target_tokens: int | None = None, overlap_tokens: int | None = None) -> list[str]:
+    normalized = (text or "").strip()
+    if not normalized:
+        return []
+    target_tokens = target_tokens or settings.chunk_target_tokens
+    overlap_tokens = settings.chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+    if estimate_tokens(normalized) <= target_tokens:
+        return [normalized]
+
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    current_header = ""
+    last_unit: ChunkUnit | None = None
+
+    for unit in (piece for u in page_units(normalized, target_tokens) for piece in _split_oversized(u, target_tokens)):
+        header = unit.header if unit.header and unit.header != current_header else ""
+        needed = unit.tokens + (estimate_tokens(header) if header else 0)
+        if current and current_tokens + needed > target_tokens:
+            chunks.append("\n".join(current))
+            current = _overlap_tail(last_unit, overlap_tokens) if last_unit else []
+            current_tokens = estimate_tokens("\n".join(current)) if current else 0
+            current_header = ""
+            header = unit.header
+            needed = unit.tokens + (estimate_tokens(header) if header else 0)
+        if header:
+            current.append(header)
+            current_header = header
+        current.append(unit.text)
+        current_tokens += needed
+        last_unit = unit
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def contextual_chunks(text: str) -> list[str]:
+    from ingestion.embedder import _build_contextual_chunks
+
+    return _build_contextual_chunks(text)
+
+
+CHUNKERS: dict[str, Callable[[str], list[str]]] = {
+    CHUNKER_CONTEXTUAL: contextual_chunks,
+    CHUNKER_TOKEN_BUDGET: token_budget_chunks,
+}
+
+
+def get_chunker(name: str | None = None) -> Callable[[str], list[str]]:
+    name = (name or settings.chunking_strategy or CHUNKER_CONTEXTUAL).strip().lower()
+    chunker = CHUNKERS.get(name)
+    if chunker is None:
+        raise RuntimeError(f"CHUNKING_STRATEGY inválido: {name}. Use {' ou '.join(CHUNKERS)}")
+    return chunker
+
+
+def build_chunks(text: str, strategy: str | None = None) -> list[str]:
+    """Split one page's text into the chunks that get embedded."""
+    return get_chunker(strategy)(text)
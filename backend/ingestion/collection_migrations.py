@@ -0,0 +1,166 @@
+import sys
+import time
+import logging
+from typing import Callable
+from qdrant_client.models import (
+    PointStruct,
+    CreateAlias,
+    CreateAliasOperation,
+    DeleteAlias,
+    DeleteAliasOperation,
+    HnswConfigDiff,
+)
+from ingestion.qdrant_pool import (
+    get_qdrant_client,
+    refresh_collection_registry,
+    resolve_collection_name,
+    invalidate_collection_meta,
+)
+from ingestion.search_cache import bump_collection_version
+from ingestion.chunk_store import delete_point_chunks
+
+logger = logging.getLogger(__name__)
+
+# transform(point_id, vectors, payload) -> (vectors, payload) or None to drop the point.
+# `vectors` is always a dict; the unnamed dense vector is under "".
+PointTransform = Callable[[object, dict, dict], tuple[dict, dict] | None]
+
+# Scripts that call rebuild_collection refuse to run without it (see its docstring)
+MAINTENANCE_FLAG = "--maintenance"
+# ...and only rebuild brands that are still real collections (not aliases) with it
+FIRST_REBUILD_FLAG = "--first-rebuild"
+
+
+def require_maintenance(args: list[str]) -> tuple[list[str], bool]:
+    """
+    Script guard for rebuild_collection: exits unless MAINTENANCE_FLAG is given.
+    Returns the remaining args and whether FIRST_REBUILD_FLAG was given.
+    """
+    if MAINTENANCE_FLAG not in args:
+        print(
+            "Esta migração recria as coleções: uploads feitos durante a cópia são perdidos.\n"
+            f"Pare os uploads, rode em janela de manutenção e passe {MAINTENANCE_FLAG} para confirmar.\n"
+            f"Marcas ainda sem alias só são recriadas com {FIRST_REBUILD_FLAG}: as buscas dessa marca "
+            "falham entre a remoção da coleção e a criação do alias."
+        )
+        sys.exit(1)
+    rest = [arg for arg in args if arg not in (MAINTENANCE_FLAG, FIRST_REBUILD_FLAG)]
+    return rest, FIRST_REBUILD_FLAG in args
+
+
+def _as_vector_dict(vector) -> dict:
+    if vector is None:
+        return {}
+    if isinstance(vector, dict):
+        return dict(vector)
+    return {"": vector}
+
+
+def iter_points(collection_name: str, batch_size: int = 256, with_vectors=True, with_payload=True):
+    """Scroll every point of a collection in batches."""
+    client = get_qdrant_client()
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=next_offset,
+            with_payload=with_payload,
+            with_vectors=with_vectors,
+        )
+        if points:
+            yield points
+        if not next_offset or not points:
+            break
+
+
+def rebuild_collection(
+    collection_name: str,
+    transform: PointTransform,
+    batch_size: int = 256,
+    after_create: Callable[[str], None] | None = None,
+    allow_first_rebuild: bool = False,
+    **create_kwargs,
+) -> str:
+    """
+    Copy every point of `collection_name` into a new physical collection created
+    with `create_kwargs` (vectors_config, sparse_vectors_config, ...), applying
+    `transform` to each point, then point the `collection_name` alias at it and
+    drop the old physical collection. Searches keep using the same name.
+
+    Maintenance only (scripts require MAINTENANCE_FLAG):
+    - points written to the old collection after it was scrolled are not copied,
+      so uploads for the brand must be stopped while this runs;
+    - on the first rebuild of a brand the real collection must be deleted before
+      an alias can take its name (Qdrant rejects an alias named like a collection),
+      so the brand's searches fail until the alias exists (and until other workers
+      refresh their collection registry). Refused unless `allow_first_rebuild`.
+    Returns the new physical collection name.
+    """
+    client = get_qdrant_client()
+    refresh_collection_registry()
+    old_physical = resolve_collection_name(collection_name)
+    if old_physical == collection_name and not allow_first_rebuild:
+        raise RuntimeError(
+            f"{collection_name} ainda não é um alias: a primeira recriação deixa a marca sem busca "
+            f"até o alias existir ({FIRST_REBUILD_FLAG})"
+        )
+    new_physical = f"{collection_name}__r{int(time.time())}"
+
+    client.create_collection(collection_name=new_physical, **create_kwargs)
+    if after_create:
+        after_create(new_physical)
+    logger.info(f"Rebuilding {collection_name}: {old_physical} → {new_physical}")
+
+    copied = 0
+    dropped_ids = []
+    for points in iter_points(old_physical, batch_size=batch_size):
+        batch: list[PointStruct] = []
+        for point in points:
+            result = transform(point.id, _as_vector_dict(point.vector), dict(point.payload or {}))
+            if result is None:
+                dropped_ids.append(point.id)
+                continue
+            vectors, payload = result
+            batch.append(PointStruct(id=point.id, vector=vectors, payload=payload))
+        if batch:
+            client.upsert(collection_name=new_physical, points=batch, wait=True)
+            copied += len(batch)
+        logger.info(f"{collection_name}: {copied} points copied")
+
+    if old_physical == collection_name:
+        # First rebuild: the brand name is a real collection; it must go before the alias can exist
+        # (searches on the brand fail in between).
+        client.delete_collection(collection_name=old_physical)
+        client.update_collection_aliases(change_aliases_operations=[
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=new_physical, alias_name=collection_name)),
+        ])
+    else:
+        client.update_collection_aliases(change_aliases_operations=[
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=collection_name)),
+            CreateAliasOperation(create_alias=CreateAlias(collection_name=new_physical, alias_name=collection_name)),
+        ])
+        client.delete_collection(collection_name=old_physical)
+
+    # Copied points keep their ids, so their chunk store rows stay valid
+    delete_point_chunks(dropped_ids)
+    refresh_collection_registry()
+    invalidate_collection_meta(collection_name)
+    bump_collection_version(collection_name)
+    logger.info(f"Rebuilt {collection_name}: {copied} points copied, {len(dropped_ids)} dropped")
+    return new_physical
+
+
+def current_create_kwargs(collection_name: str) -> dict:
+    """create_collection() kwargs reproducing a collection's current schema."""
+    info = get_qdrant_client().get_collection(collection_name=resolve_collection_name(collection_name))
+    params = info.config.params
+    kwargs = {
+        "vectors_config": params.vectors,
+        "sparse_vectors_config": params.sparse_vectors,
+        "on_disk_payload": params.on_disk_payload,
+        # get_collection returns HnswConfig; create_collection takes HnswConfigDiff
+        "hnsw_config": HnswConfigDiff(**info.config.hnsw_config.model_dump()) if info.config.hnsw_config else None,
+        "quantization_config": info.config.quantization_config,
+    }
+    return {k: v for k, v in kwargs.items() if v is not None}
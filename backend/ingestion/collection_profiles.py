@@ -0,0 +1,141 @@
+import logging
+from dataclasses import dataclass
+from qdrant_client.models import (
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    QuantizationSearchParams,
+    SearchParams,
+    CollectionParamsDiff,
+    VectorParamsDiff,
+    Disabled,
+)
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """Storage/index layout of a brand collection plus the search params that go with it."""
+    name: str
+    quantization: str = "none"  # none | int8 | binary
+    quantization_always_ram: bool = True
+    on_disk_vectors: bool = False  # originals on disk; only used for rescoring when quantized
+    on_disk_payload: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+    # Per-query params
+    hnsw_ef: int | None = None
+    rescore: bool = True
+    oversampling: float | None = None
+    # Doc/page-scoped searches touch few points: exact scan is cheaper and lossless
+    exact_filtered: bool = True
+
+
+PROFILES: dict[str, CollectionProfile] = {
+    # Qdrant defaults: float32 in RAM, payload in RAM
+    "default": CollectionProfile(name="default"),
+    # int8 vectors in RAM (4x smaller), float32 originals and payload on disk
+    "balanced": CollectionProfile(
+        name="balanced",
+        quantization="int8",
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        hnsw_ef_construct=128,
+        hnsw_ef=128,
+        oversampling=2.0,
+    ),
+    # 1-bit vectors in RAM (32x smaller), heavy oversampling + rescoring
+    "compact": CollectionProfile(
+        name="compact",
+        quantization="binary",
+        on_disk_vectors=True,
+        on_disk_payload=True,
+        hnsw_ef=128,
+        oversampling=3.0,
+    ),
+    # Denser graph for brands where recall matters more than RAM
+    "high_recall": CollectionProfile(
+        name="high_recall",
+        quantization="int8",
+        on_disk_payload=True,
+        hnsw_m=32,
+        hnsw_ef_construct=256,
+        hnsw_ef=256,
+        oversampling=1.5,
+    ),
+}
+
+
+def get_profile(name: str | None = None) -> CollectionProfile:
+    name = (name or settings.qdrant_collection_profile or "default").strip().lower()
+    profile = PROFILES.get(name)
+    if profile is None:
+        logger.warning(f"Unknown collection profile '{name}', using default")
+        return PROFILES["default"]
+    return profile
+
+
+def quantization_config(profile: CollectionProfile):
+    if profile.quantization == "int8":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(
+                type=ScalarType.INT8,
+                quantile=0.99,
+                always_ram=profile.quantization_always_ram,
+            )
+        )
+    if profile.quantization == "binary":
+        return BinaryQuantization(
+            binary=BinaryQuantizationConfig(always_ram=profile.quantization_always_ram)
+        )
+    return None
+
+
+def create_collection_kwargs(profile: CollectionProfile) -> dict:
+    """Extra create_collection() kwargs for a profile (vector on_disk goes in VectorParams)."""
+    kwargs = {
+        "on_disk_payload": profile.on_disk_payload,
+        "hnsw_config": HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct),
+    }
+    quantization = quantization_config(profile)
+    if quantization is not None:
+        kwargs["quantization_config"] = quantization
+    return kwargs
+
+
+def update_collection_kwargs(profile: CollectionProfile, dense_vector_names: set[str]) -> dict:
+    """update_collection() kwargs that move an existing collection to a profile (no reindex of points)."""
+    return {
+        "collection_params": CollectionParamsDiff(on_disk_payload=profile.on_disk_payload),
+        "vectors_config": {
+            name: VectorParamsDiff(on_disk=profile.on_disk_vectors) for name in dense_vector_names
+        },
+        "hnsw_config": HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct),
+        "quantization_config": quantization_config(profile) or Disabled.DISABLED,
+    }
+
+
+def search_params(profile: CollectionProfile | None = None, filtered: bool = False) -> SearchParams | None:
+    """
+    Per-query params for a profile. `filtered=True` marks small doc/page-scoped
+    searches, which run exact when the profile allows it.
+    """
+    profile = profile or get_profile()
+    if filtered and profile.exact_filtered:
+        return SearchParams(exact=True)
+
+    quantization = None
+    if profile.quantization != "none":
+        quantization = QuantizationSearchParams(
+            rescore=profile.rescore,
+            oversampling=profile.oversampling,
+        )
+    if profile.hnsw_ef is None and quantization is None:
+        return None
+    return SearchParams(hnsw_ef=profile.hnsw_ef, quantization=quantization)
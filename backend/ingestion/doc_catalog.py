@@ -0,0 +1,103 @@
+import logging
+import threading
+from sqlalchemy import event, select
+from models import Brand, Document
+from ingestion.page_index import pooled_connection
+
+logger = logging.getLogger(__name__)
+
+# In-memory catalog: brand_slug → {doc_id: original_filename}.
+# Loaded once from SQLite (init_db, or lazily on first use in scripts) and kept
+# current by ORM events on Document, so searches never scroll Qdrant for it.
+_catalog: dict[str, dict[int, str]] | None = None
+_brand_slugs: dict[int, str] = {}  # brand_id → slug
+# Bumped whenever a brand's documents change (derived indexes rebuild on change)
+_versions: dict[str, int] = {}
+_lock = threading.Lock()
+
+CATALOG_QUERY = """
+    SELECT d.id, d.original_filename, b.id, b.slug
+    FROM documents d
+    JOIN brands b ON b.id = d.brand_id
+"""
+
+
+def _replace_catalog(rows) -> int:
+    global _catalog
+    catalog: dict[str, dict[int, str]] = {}
+    brand_slugs: dict[int, str] = {}
+    for doc_id, filename, brand_id, slug in rows:
+        catalog.setdefault(slug, {})[doc_id] = filename or ""
+        brand_slugs[brand_id] = slug
+    with _lock:
+        _catalog = catalog
+        _brand_slugs.update(brand_slugs)
+        for slug in set(catalog) | set(_versions):
+            _versions[slug] = _versions.get(slug, 0) + 1
+    return sum(len(docs) for docs in catalog.values())
+
+
+def load_doc_catalog(sync_conn) -> None:
+    """Load the catalog from the app database. Run from init_db via conn.run_sync()."""
+    rows = sync_conn.exec_driver_sql(CATALOG_QUERY).fetchall()
+    count = _replace_catalog(rows)
+    logger.info(f"Document catalog loaded: {count} documents")
+
+
+def _ensure_loaded():
+    # Scripts import search_brand without running init_db
+    if _catalog is None:
+        with pooled_connection() as conn:
+            _replace_catalog(conn.execute(CATALOG_QUERY).fetchall())
+
+
+def get_brand_documents(brand_slug: str) -> dict[int, str]:
+    """doc_id → original filename for every document of a brand (do not mutate)."""
+    _ensure_loaded()
+    return _catalog.get(brand_slug, {})
+
+
+def catalog_version(brand_slug: str) -> int:
+    _ensure_loaded()
+    return _versions.get(brand_slug, 0)
+
+
+def _brand_slug_for(connection, brand_id: int) -> str | None:
+    slug = _brand_slugs.get(brand_id)
+    if slug is None:
+        slug = connection.execute(select(Brand.slug).where(Brand.id == brand_id)).scalar()
+        if slug:
+            _brand_slugs[brand_id] = slug
+    return slug
+
+
+def _set_document(brand_slug: str, doc_id: int, filename: str | None):
+    with _lock:
+        if _catalog is None:
+            return  # not loaded yet; the first load will read it from the database
+        docs = dict(_catalog.get(brand_slug, {}))
+        if filename is None:
+            if docs.pop(doc_id, None) is None:
+                return
+        else:
+            if docs.get(doc_id) == filename:
+                return
+            docs[doc_id] = filename
+        # Copy-on-write: searches may be iterating the previous dict
+        _catalog[brand_slug] = docs
+        _versions[brand_slug] = _versions.get(brand_slug, 0) + 1
+
+
+@event.listens_for(Document, "after_insert")
+@event.listens_for(Document, "after_update")
+def _on_document_saved(mapper, connection, target):
+    slug = _brand_slug_for(connection, target.brand_id)
+    if slug:
+        _set_document(slug, target.id, target.original_filename or "")
+
+
+@event.listens_for(Document, "after_delete")
+def _on_document_deleted(mapper, connection, target):
+    slug = _brand_slug_for(connection, target.brand_id)
+    if slug:
+        _set_document(slug, target.id, None)
@@ -1,11 +1,13 @@
 import uuid
+import time
 import logging
 import re
-import sqlite3
 import httpx
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
 from google import genai
 from google.genai import types
-from qdrant_client import QdrantClient
 from qdrant_client.models import (
     Distance,
     VectorParams,
@@ -13,8 +15,46 @@ from qdrant_client.models import (
     Filter,
     FieldCondition,
     MatchValue,
+    MatchAny,
+    PayloadSchemaType,
+    SparseVectorParams,
+    Modifier,
+    Prefetch,
+    FusionQuery,
+    Fusion,
+    QueryRequest,
 )
 from config import get_settings
+from ingestion.qdrant_pool import (
+    get_qdrant_client,
+    collection_exists,
+    register_collection,
+    resolve_collection_name,
+    get_collection_meta,
+)
+from ingestion.sparse import (
+    SPARSE_VECTOR_NAME,
+    document_sparse_vector,
+    query_sparse_vector,
+    is_empty as sparse_is_empty,
+)
+from ingestion.page_index import search_pages, search_filenames
+from ingestion.filename_index import get_filename_index
+from ingestion.routing_index import route_documents
+from ingestion.doc_catalog import get_brand_documents
+from ingestion.summary_index import upsert_page_summary, delete_document_summaries, coarse_documents
+from ingestion.near_duplicates import signature, content_hash, parse_signature, is_near_duplicate
+from ingestion.chunking import build_chunks
+from ingestion.search_trace import current_trace, search_trace, traced, submit_traced
+from ingestion.collection_profiles import get_profile, create_collection_kwargs, search_params
+from ingestion.chunk_store import put_chunks, get_chunks, delete_document_chunks
+from ingestion.search_stats import record_search
+from ingestion.search_cache import (
+    get_cached,
+    put_cached,
+    collection_version,
+    bump_collection_version,
+)
 
 # Conditional import for text search support
 try:
@@ -30,6 +70,19 @@ EMBEDDING_MODEL = "gemini-embedding-001"
 VECTOR_SIZE = settings.embedding_vector_size
 PROVIDER_GEMINI = "gemini"
 PROVIDER_OPEN_SOURCE = "open_source"
+# gemini-embedding-001 is Matryoshka-trained: a normalized prefix of the vector is
+# itself a usable embedding. The "mini" named vector holds that prefix; other
+# providers only get it when EMBEDDING_MINI_VECTOR_SIZE is set explicitly.
+MINI_VECTOR_NAME = "mini"
+DEFAULT_MINI_VECTOR_SIZE = 256
+if settings.embedding_mini_vector_size is not None:
+    MINI_VECTOR_SIZE = settings.embedding_mini_vector_size
+elif (settings.embedding_provider or PROVIDER_GEMINI).strip().lower() == PROVIDER_GEMINI:
+    MINI_VECTOR_SIZE = DEFAULT_MINI_VECTOR_SIZE
+else:
+    MINI_VECTOR_SIZE = 0
+# First pass on the mini vector fetches this many times the final dense limit
+MINI_CANDIDATE_FACTOR = 4
 
 client = genai.Client(api_key=settings.gemini_api_key)
 
@@ -224,13 +277,16 @@ def _extract_domain_signals(text: str) -> dict:
 
 
 def _signal_match_bonus(signals: dict, query: str) -> float:
-    if not signals or not query:
+    if not query:
         return 0.0
+    return _signal_bonus(signals, _normalize_for_matching(query), query.upper())
 
-    bonus = 0.0
-    q_norm = _normalize_for_matching(query)
-    q_upper = query.upper()
 
+def _signal_bonus(signals: dict, q_norm: str, q_upper: str) -> float:
+    if not signals:
+        return 0.0
+
+    bonus = 0.0
     for topic in signals.get("topics", []) or []:
         if topic and topic in q_norm:
             bonus += 0.04
@@ -281,13 +337,14 @@ def _identifier_focus_score(payload: dict, query_identifiers: list[str]) -> tupl
     """
     if not query_identifiers:
         return 0.0, False
+    return _identifier_focus(_payload_features(payload), payload.get("signals") or {}, query_identifiers)
 
-    text = str(payload.get("text", "") or "")
-    source = str(payload.get("doc_filename", "") or "")
-    combined = f"{text} {source}".upper()
-    compact_combined = re.sub(r"[^A-Z0-9]", "", combined)
 
-    signals = payload.get("signals") or {}
+def _identifier_focus(features: dict, signals: dict, query_identifiers: list[str]) -> tuple[float, bool]:
+    if not query_identifiers:
+        return 0.0, False
+
+    compact_combined = features.get("compact", "")
     signal_tokens = []
     for key in ("controller_tokens", "fault_tokens", "model_version_tokens"):
         vals = signals.get(key) or []
@@ -310,13 +367,26 @@ def _identifier_focus_score(payload: dict, query_identifiers: list[str]) -> tupl
 def _lexical_fault_bonus(text: str, tokens: list[str]) -> float:
     if not text or not tokens:
         return 0.0
+    return _lexical_fault(text, set(_chunk_scoring_features(text, "")["words"]), tokens)
 
-    text_upper = text.upper()
+
+def _lexical_fault(text: str, words: set[str], tokens: list[str]) -> float:
+    """
+    Fault tokens are all word characters, so a whole-word match (the old
+    rf"\b{token}\b" search) is membership in the chunk's uppercase word set.
+    """
+    if not text or not tokens:
+        return 0.0
+
+    text_upper = None
     bonus = 0.0
     for token in tokens:
-        if re.search(rf"\b{re.escape(token)}\b", text_upper):
+        if token in words:
             bonus += 0.08
-        elif token in text_upper:
+            continue
+        if text_upper is None:
+            text_upper = text.upper()
+        if token in text_upper:
             bonus += 0.04
     return min(bonus, 0.24)
 
@@ -443,45 +513,31 @@ def _extract_search_keywords(query: str) -> list[str]:
     return unique
 
 
-def _db_keyword_search(keywords: list[str], brand_slug: str) -> set[int]:
+def _db_keyword_search(keywords: list[str], brand_slug: str) -> dict[int, list[int]]:
     """
-    Search the SQLite database (pages.gemini_text) for exact keyword matches.
-    Returns doc_ids that contain any of the keywords in their content.
+    Search page content (FTS5 index over pages.gemini_text) and document
+    filenames for exact keyword matches, all keywords in a single query.
+    Returns doc_id → matching page numbers (best first; empty for filename-only hits).
     This is critical for finding documents where the filename doesn't match
     but the content mentions the queried model/code.
     """
     if not keywords:
-        return set()
+        return {}
 
-    db_path = "/app/data/andreja.db"
     try:
-        conn = sqlite3.connect(db_path, timeout=5)
-        cursor = conn.cursor()
-
-        matching_doc_ids = set()
-        for kw in keywords:
-            # Search case-insensitive in page content
-            # Also join with documents table to filter by brand
-            cursor.execute("""
-                SELECT DISTINCT p.document_id
-                FROM pages p
-                JOIN documents d ON p.document_id = d.id
-                JOIN brands b ON d.brand_id = b.id
-                WHERE b.slug = ?
-                AND (p.gemini_text LIKE ? COLLATE NOCASE
-                     OR d.original_filename LIKE ? COLLATE NOCASE)
-            """, (brand_slug, f"%{kw}%", f"%{kw}%"))
-            for row in cursor.fetchall():
-                matching_doc_ids.add(row[0])
-
-        conn.close()
-        if matching_doc_ids:
-            logger.info(f"DB keyword search for {keywords}: found doc_ids {matching_doc_ids}")
-        return matching_doc_ids
+        matches: dict[int, list[int]] = {}
+        for doc_id, page_number, _score in search_pages(keywords, brand_slug):
+            matches.setdefault(doc_id, []).append(page_number)
+        for doc_id in search_filenames(keywords, brand_slug):
+            matches.setdefault(doc_id, [])
+
+        if matches:
+            logger.info(f"DB keyword search for {keywords}: found doc_ids {set(matches)}")
+        return matches
 
     except Exception as e:
         logger.warning(f"DB keyword search failed: {e}")
-        return set()
+        return {}
 
 
 def _content_keyword_bonus(text: str, keywords: list[str]) -> float:
@@ -491,17 +547,35 @@ def _content_keyword_bonus(text: str, keywords: list[str]) -> float:
     """
     if not text or not keywords:
         return 0.0
+    return _content_keyword(text, _keyword_forms(keywords))
 
-    text_lower = text.lower()
-    bonus = 0.0
+
+def _keyword_forms(keywords: list[str]) -> list[tuple[str, str]]:
+    """(lowercase, compact) form of each keyword; compact drops dots/spaces/dashes."""
+    forms = []
     for kw in keywords:
         kw_lower = kw.lower()
+        forms.append((kw_lower, re.sub(r'[.\s\-]', '', kw_lower)))
+    return forms
+
+
+def _content_keyword(text: str, keyword_forms: list[tuple[str, str]]) -> float:
+    if not text or not keyword_forms:
+        return 0.0
+
+    text_lower = text.lower()
+    text_compact = None
+    bonus = 0.0
+    for kw_lower, kw_compact in keyword_forms:
         if kw_lower in text_lower:
             bonus += 0.10  # Strong bonus for exact content match
+            continue
         # Also check without spaces/dots (e.g., "C0710" matches "C.07.10")
-        kw_compact = re.sub(r'[.\s\-]', '', kw_lower)
-        text_compact = re.sub(r'[.\s\-]', '', text_lower)
-        if len(kw_compact) >= 3 and kw_compact in text_compact and kw_lower not in text_lower:
+        if len(kw_compact) < 3:
+            continue
+        if text_compact is None:
+            text_compact = re.sub(r'[.\s\-]', '', text_lower)
+        if kw_compact in text_compact:
             bonus += 0.06
 
     return min(bonus, 0.25)
@@ -518,21 +592,26 @@ def _filename_match_bonus(filename: str, query: str) -> float:
     """
     if not filename or not query:
         return 0.0
+    return _filename_bonus(filename, _extract_key_tokens(query))
+
 
-    # Normalize both for comparison
+@lru_cache(maxsize=4096)
+def _filename_forms(filename: str) -> tuple[str, str]:
+    """
+    Normalized filename and its "squished" version (no spaces), for matching
+    things like "c0710" in "c 07 10" or "ovf10" in "ovf 10". Filenames repeat
+    across hits and searches, so this is memoized.
+    """
     fn_normalized = _normalize_for_matching(filename)
-    query_normalized = _normalize_for_matching(query)
+    return fn_normalized, fn_normalized.replace(" ", "")
 
-    # Also create "squished" versions (no spaces) for matching things like
-    # "c0710" in "c 07 10" or "ovf10" in "ovf 10"
-    fn_squished = fn_normalized.replace(" ", "")
-    query_squished = query_normalized.replace(" ", "")
 
-    # Extract meaningful tokens from query
-    query_tokens = _extract_key_tokens(query)
-    if not query_tokens:
+def _filename_bonus(filename: str, query_tokens: list[str]) -> float:
+    if not filename or not query_tokens:
         return 0.0
 
+    fn_normalized, fn_squished = _filename_forms(filename)
+
     bonus = 0.0
     matched_tokens = 0
 
@@ -557,22 +636,200 @@ def _filename_match_bonus(filename: str, query: str) -> float:
     return min(bonus, 0.25)
 
 
-def get_qdrant_client() -> QdrantClient:
-    return QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
+def _chunk_scoring_features(text: str, doc_filename: str) -> dict:
+    """
+    Text-derived values used by Phase 5 scoring, stored in the payload at ingest
+    so searches don't re-normalize every candidate:
+      words   – distinct uppercase word tokens (whole-word fault-code matches)
+      compact – text + filename, uppercase, only A-Z0-9 (identifier matches)
+    """
+    text_upper = (text or "").upper()
+    return {
+        "words": sorted(set(re.findall(r"\w+", text_upper))),
+        "compact": re.sub(r"[^A-Z0-9]", "", f"{text_upper} {(doc_filename or '').upper()}"),
+    }
+
+
+def _payload_features(payload: dict) -> dict:
+    """Stored scoring features, or computed on the fly for points ingested before they existed."""
+    features = payload.get("features")
+    if features:
+        return features
+    return _chunk_scoring_features(
+        str(payload.get("text", "") or ""),
+        str(payload.get("doc_filename", "") or ""),
+    )
+
+
+@dataclass
+class QueryFeatures:
+    """Everything Phase 5 needs from the query, computed once per search."""
+    query: str
+    normalized: str
+    upper: str
+    key_tokens: list[str]
+    fault_tokens: list[str]
+    search_keywords: list[str]
+    identifiers: list[str]
+    keyword_forms: list[tuple[str, str]] = field(default_factory=list)
+
+
+def build_query_features(query: str) -> QueryFeatures:
+    search_keywords = _extract_search_keywords(query)
+    return QueryFeatures(
+        query=query,
+        normalized=_normalize_for_matching(query),
+        upper=query.upper(),
+        key_tokens=_extract_key_tokens(query),
+        fault_tokens=_extract_query_fault_tokens(query),
+        search_keywords=search_keywords,
+        identifiers=_extract_query_identifiers(query),
+        keyword_forms=_keyword_forms(search_keywords),
+    )
+
+
+def score_components(payload: dict, qf: QueryFeatures) -> tuple[dict[str, float], bool]:
+    """Phase 5 bonus of one candidate by component, and has_identifier_hit."""
+    text = str(payload.get("text", "") or "")
+    features = _payload_features(payload)
+    signals = payload.get("signals") or {}
+
+    components = {
+        "lexical_fault": _lexical_fault(text, set(features.get("words") or ()), qf.fault_tokens) if qf.fault_tokens else 0.0,
+        "filename": _filename_bonus(str(payload.get("doc_filename", "") or ""), qf.key_tokens),
+        "content_keyword": _content_keyword(text, qf.keyword_forms),
+        "signal": _signal_bonus(signals, qf.normalized, qf.upper) if qf.query else 0.0,
+    }
+    components["identifier"], has_identifier_hit = _identifier_focus(features, signals, qf.identifiers)
+    return components, has_identifier_hit
+
+
+def score_candidate(payload: dict, qf: QueryFeatures) -> tuple[float, bool]:
+    """
+    Phase 5 bonus for one candidate: (total bonus, has_identifier_hit).
+    Same result as summing the individual *_bonus functions, using
+    precomputed query and payload features.
+    """
+    components, has_identifier_hit = score_components(payload, qf)
+    return sum(components.values()), has_identifier_hit
+
+
+# Document diversity: max chunks per document in search results
+MAX_PER_DOC = 3
+# Candidate pool (per prefetch) that grouped Phase 1 search groups by doc_id
+GROUP_CANDIDATE_POOL = 400
+
+# Routed Phase 1 is trusted alone when it fills top_k and its best hit reaches this
+ROUTED_MIN_TOP_SCORE = 0.5
+# Coarse-to-fine: brands with at least COARSE_MIN_BRAND_DOCS documents search the
+# document/page summary vectors first and run Phase 1 inside the COARSE_TOP_DOCS best
+COARSE_MIN_BRAND_DOCS = 30
+COARSE_TOP_DOCS = 8
+
+# Adaptive planner: Phases 2-4 are skipped when the Phase 1 top-k is confident and
+#   top score >= PLANNER_SKIP_MIN_SCORE,
+#   >= PLANNER_MIN_IDENTIFIER_HITS chunks contain the query identifiers (if any),
+#   and results span >= PLANNER_MIN_DOCS documents.
+# Tune from the per-phase contribution stats (GET /admin/search-stats).
+PLANNER_SKIP_MIN_SCORE = 0.75
+PLANNER_MIN_IDENTIFIER_HITS = 3
+PLANNER_MIN_DOCS = 2
+
+# Explain mode reports at most this many scored candidates per query
+EXPLAIN_MAX_CANDIDATES = 100
+
+# Phase 1 of multi-query searches runs concurrently on this pool (Qdrant I/O)
+_phase_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="search-phase")
+
+# Payload fields fetched for search candidates. "text"/"features" are only present
+# on points ingested before the chunk store; newer points keep them in chunk_store.
+SEARCH_PAYLOAD_FIELDS = ["doc_id", "doc_filename", "page_number", "brand_slug", "signals", "text", "features", "simhash"]
+
+# Payload fields used in filters (doc-scoped searches, deletes, page scrolls, signal pre-filter)
+PAYLOAD_INDEXES: dict[str, PayloadSchemaType] = {
+    "doc_id": PayloadSchemaType.INTEGER,
+    "page_number": PayloadSchemaType.INTEGER,
+    "brand_slug": PayloadSchemaType.KEYWORD,
+    "signals.controller_tokens": PayloadSchemaType.KEYWORD,
+    "signals.fault_tokens": PayloadSchemaType.KEYWORD,
+}
+
+# Collections whose payload indexes were verified by this process
+_indexed_collections: set[str] = set()
+
+
+def ensure_payload_indexes(collection_name: str) -> list[str]:
+    """
+    Create any missing payload index on a collection (idempotent).
+    Returns the list of fields that were created.
+    """
+    client = get_qdrant_client()
+    physical_name = resolve_collection_name(collection_name)
+    info = client.get_collection(collection_name=physical_name)
+    existing = set((info.payload_schema or {}).keys())
+
+    created: list[str] = []
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        if field_name in existing:
+            continue
+        client.create_payload_index(
+            collection_name=physical_name,
+            field_name=field_name,
+            field_schema=schema,
+            wait=True,
+        )
+        created.append(field_name)
+
+    if created:
+        logger.info(f"Created payload indexes on {collection_name}: {created}")
+    _indexed_collections.add(collection_name)
+    return created
+
+
+def sparse_vectors_config() -> dict[str, SparseVectorParams]:
+    """Sparse lexical vector; Qdrant keeps the IDF statistics per collection."""
+    return {SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)}
+
+
+def mini_vector(vector: list[float], size: int | None = None) -> list[float]:
+    """Matryoshka prefix of a full embedding, L2-normalized."""
+    prefix = list(vector[:size or MINI_VECTOR_SIZE])
+    norm = sum(x * x for x in prefix) ** 0.5 or 1.0
+    return [x / norm for x in prefix]
+
+
+def dense_vectors_config(on_disk: bool = False) -> dict[str, VectorParams]:
+    """Full vector (unnamed) plus the mini prefix vector when enabled."""
+    config = {"": VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=on_disk)}
+    if MINI_VECTOR_SIZE:
+        # Small enough to always stay in RAM
+        config[MINI_VECTOR_NAME] = VectorParams(size=MINI_VECTOR_SIZE, distance=Distance.COSINE)
+    return config
+
+
+def sparse_text(doc_filename: str, chunk_text: str) -> str:
+    """Text indexed in the sparse vector: the filename counts as content for lexical matching."""
+    return f"{doc_filename}\n{chunk_text}"
 
 
 def ensure_collection(brand_slug: str):
     """Create Qdrant collection for a brand if it doesn't exist."""
-    client = get_qdrant_client()
     collection_name = f"brand_{brand_slug}"
 
-    existing = [c.name for c in client.get_collections().collections]
-    if collection_name not in existing:
+    if not collection_exists(collection_name):
+        client = get_qdrant_client()
+        profile = get_profile()
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
+            vectors_config=dense_vectors_config(on_disk=profile.on_disk_vectors),
+            sparse_vectors_config=sparse_vectors_config(),
+            **create_collection_kwargs(profile),
         )
-        logger.info(f"Created Qdrant collection: {collection_name}")
+        register_collection(collection_name)
+        logger.info(f"Created Qdrant collection: {collection_name} (profile {profile.name})")
+
+    if collection_name not in _indexed_collections:
+        ensure_payload_indexes(collection_name)
 
     return collection_name
 
@@ -634,6 +891,27 @@ def get_query_embedding(text: str) -> list[float]:
     return result.embeddings[0].values
 
 
+def get_query_embeddings_batch(texts: list[str]) -> list[list[float]]:
+    """Query embeddings for several texts in a single API call (search_brand_many)."""
+    if not texts:
+        return []
+
+    provider = (settings.embedding_provider or PROVIDER_GEMINI).strip().lower()
+
+    if provider == PROVIDER_OPEN_SOURCE:
+        return [_get_ollama_embedding(t) for t in texts]
+
+    result = client.models.embed_content(
+        model=EMBEDDING_MODEL,
+        contents=texts,
+        config=types.EmbedContentConfig(
+            task_type="RETRIEVAL_QUERY",
+            output_dimensionality=VECTOR_SIZE,
+        ),
+    )
+    return [e.values for e in result.embeddings]
+
+
 def _get_ollama_embedding(text: str) -> list[float]:
     payload = {
         "model": settings.ollama_embedding_model,
@@ -663,264 +941,388 @@ def upsert_page(
     doc_filename: str,
     page_number: int,
     text: str,
+    doc_content_hashes: set[str] | None = None,
 ) -> str:
     """
     Embed text and store in Qdrant.
     Returns the point ID (UUID string).
+
+    doc_content_hashes: content hashes of the document's chunks stored so far
+    (extended in place once this page is stored); exact repeats of them are
+    not embedded again.
     """
     collection_name = ensure_collection(brand_slug)
     client = get_qdrant_client()
 
-    chunks = _build_contextual_chunks(text)
+    chunks = build_chunks(text)
     if not chunks:
         chunks = [text]
+    chunks, hashes = _drop_repeated_chunks(chunks, doc_content_hashes or set())
 
     # Batch embed all chunks in a single API call (much faster)
     embeddings = get_embeddings_batch(chunks)
 
+    # Collections created before hybrid search / mini vectors lack them until backfilled
+    meta = get_collection_meta(collection_name)
+    with_sparse = SPARSE_VECTOR_NAME in meta["sparse"]
+    mini_size = meta.get("sizes", {}).get(MINI_VECTOR_NAME)
+
     points: list[PointStruct] = []
     point_ids: list[str] = []
+    stored_chunks: list[tuple[str, int, str, dict]] = []
     chunk_total = len(chunks)
+    text_in_store = settings.chunk_text_in_store
 
-    for index, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
+    for index, (chunk_text, embedding, chunk_hash) in enumerate(zip(chunks, embeddings, hashes)):
         point_id = str(uuid.uuid4())
         signals = _extract_domain_signals(chunk_text)
-        points.append(
-            PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload={
-                    "brand_slug": brand_slug,
-                    "doc_id": doc_id,
-                    "doc_filename": doc_filename,
-                    "page_number": page_number,
-                    "text": chunk_text,
-                    "signals": signals,
-                    "chunk_index": index,
-                    "chunk_total": chunk_total,
-                },
-            )
-        )
+        vector = embedding
+        if with_sparse or mini_size:
+            vector = {"": embedding}
+            if with_sparse:
+                vector[SPARSE_VECTOR_NAME] = document_sparse_vector(sparse_text(doc_filename, chunk_text))
+            if mini_size:
+                vector[MINI_VECTOR_NAME] = mini_vector(embedding, mini_size)
+        features = _chunk_scoring_features(chunk_text, doc_filename)
+        payload = {
+            "brand_slug": brand_slug,
+            "doc_id": doc_id,
+            "doc_filename": doc_filename,
+            "page_number": page_number,
+            "signals": signals,
+            "chunk_index": index,
+            "chunk_total": chunk_total,
+            "simhash": signature(chunk_text),
+            "content_hash": chunk_hash,
+        }
+        if text_in_store:
+            stored_chunks.append((point_id, doc_id, chunk_text, features))
+        else:
+            payload["text"] = chunk_text
+            payload["features"] = features
+        points.append(PointStruct(id=point_id, vector=vector, payload=payload))
         point_ids.append(point_id)
 
+    # Text first, so a point is never searchable without it
+    put_chunks(collection_name, stored_chunks)
     client.upsert(collection_name=collection_name, points=points)
-    invalidate_filename_cache(collection_name)
+    bump_collection_version(collection_name)
+    if doc_content_hashes is not None:
+        doc_content_hashes.update(hashes)
+    try:
+        # Page-level summary vector for coarse-to-fine retrieval (no extra embedding call)
+        upsert_page_summary(brand_slug, doc_id, doc_filename, page_number, embeddings)
+    except Exception as e:
+        logger.warning(f"Page summary vector not stored for doc {doc_id} p{page_number}: {e}")
     return point_ids[0]
 
 
-# Cache: collection_name → {doc_id: doc_filename}
-_doc_filename_cache: dict[str, dict[int, str]] = {}
-
-
-def _get_doc_filename_map(collection_name: str, client) -> dict[int, str]:
+def _drop_repeated_chunks(chunks: list[str], doc_content_hashes: set[str]) -> tuple[list[str], list[str]]:
     """
-    Build a mapping of doc_id → doc_filename for all documents in a collection.
-    Uses an in-memory cache that survives across queries (invalidated on upsert).
-    For 24k+ vectors, scrolling with payload-only (no vectors) takes ~200ms total.
+    Skip chunks whose text repeats one already stored for the document (or kept
+    earlier on this page). Near-duplicates are kept and only collapse at query
+    time. A page always keeps its first chunk, so it stays addressable.
+    Returns the kept chunks and their content hashes.
     """
-    if collection_name in _doc_filename_cache:
-        return _doc_filename_cache[collection_name]
+    seen = set(doc_content_hashes)
+    kept: list[str] = []
+    hashes: list[str] = []
+    for chunk in chunks:
+        chunk_hash = content_hash(chunk)
+        if kept and chunk_hash in seen:
+            continue
+        kept.append(chunk)
+        hashes.append(chunk_hash)
+        seen.add(chunk_hash)
+    if len(kept) < len(chunks):
+        logger.info(f"Skipped {len(chunks) - len(kept)} repeated chunks")
+    return kept, hashes
 
-    seen_docs: dict[int, str] = {}
-    next_offset = None
 
-    for _ in range(100):  # Safety limit (~50k vectors)
-        resp = client.scroll(
+def document_content_hashes(brand_slug: str, doc_id: int) -> set[str]:
+    """Content hashes of a document's stored chunks (resumed ingestion)."""
+    collection_name = f"brand_{brand_slug}"
+    if not collection_exists(collection_name):
+        return set()
+    client = get_qdrant_client()
+    doc_filter = Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))])
+    values: set[str] = set()
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
             collection_name=collection_name,
-            limit=500,
+            scroll_filter=doc_filter,
+            limit=256,
             offset=next_offset,
-            with_payload=["doc_id", "doc_filename"],  # Only fetch these fields
+            with_payload=["content_hash"],
+            with_vectors=False,
         )
-        points, next_offset = resp
-        for pt in points:
-            payload = pt.payload or {}
-            did = payload.get("doc_id", 0)
-            if did and did not in seen_docs:
-                seen_docs[did] = payload.get("doc_filename", "")
+        for point in points:
+            value = (point.payload or {}).get("content_hash")
+            if value:
+                values.add(value)
         if not next_offset or not points:
             break
-
-    _doc_filename_cache[collection_name] = seen_docs
-    logger.info(f"Built filename cache for {collection_name}: {len(seen_docs)} docs")
-    return seen_docs
-
-
-def invalidate_filename_cache(collection_name: str):
-    """Call after upsert/delete to refresh the cache on next search."""
-    _doc_filename_cache.pop(collection_name, None)
+    return values
 
 
-def _find_filename_matching_doc_ids(collection_name: str, query: str, client) -> set[int]:
+def _find_filename_matching_doc_ids(brand_slug: str, query: str, query_tokens: list[str] | None = None) -> set[int]:
     """
     Find doc_ids whose filename closely matches the query.
     This ensures documents named after the queried topic are always
     included as candidates, even if their *content* embeddings rank lower
     than other docs in a large collection.
     """
-    query_tokens = _extract_key_tokens(query)
+    if query_tokens is None:
+        query_tokens = _extract_key_tokens(query)
     if not query_tokens:
         return set()
 
-    doc_map = _get_doc_filename_map(collection_name, client)
+    # Same test as _filename_bonus(fname, query_tokens) >= 0.15, i.e. ≥2 query
+    # tokens found in the squished filename, answered by the n-gram index.
+    counts = get_filename_index(brand_slug).match_counts(query_tokens)
+    return {doc_id for doc_id, matched in counts.items() if matched >= 2}
 
-    matching_ids: set[int] = set()
-    for did, fname in doc_map.items():
-        bonus = _filename_match_bonus(fname, query)
-        if bonus >= 0.15:  # Strong filename match (≥2 tokens)
-            matching_ids.add(did)
 
-    return matching_ids
+def _build_signal_filter(query_identifiers: list[str], fault_tokens: list[str]) -> Filter | None:
+    """Qdrant filter matching chunks whose indexed signals contain a query identifier."""
+    controller_ids = [i for i in query_identifiers if any(ch.isdigit() for ch in i)]
+    fault_ids = list(dict.fromkeys(fault_tokens + controller_ids))
+    conditions = []
+    if controller_ids:
+        conditions.append(
+            FieldCondition(key="signals.controller_tokens", match=MatchAny(any=controller_ids))
+        )
+    if fault_ids:
+        conditions.append(
+            FieldCondition(key="signals.fault_tokens", match=MatchAny(any=fault_ids))
+        )
+    if not conditions:
+        return None
+    return Filter(should=conditions)
 
 
-def search_brand(brand_slug: str, query: str, top_k: int = 7) -> list[dict]:
+def _dense_prefetch(query_vector: list[float], limit: int, mini_size: int | None, query_filter: Filter | None = None) -> Prefetch:
     """
-    Comprehensive hybrid search within a brand's collection.
+    Dense candidates. With a mini vector: a wide pass on the small vector, whose
+    shortlist is rescored with the full vector (both inside the same Qdrant query).
+    """
+    filtered = query_filter is not None
+    if not mini_size:
+        return Prefetch(query=query_vector, filter=query_filter, limit=limit, params=search_params(filtered=filtered))
+    return Prefetch(
+        prefetch=[
+            Prefetch(
+                query=mini_vector(query_vector, mini_size),
+                using=MINI_VECTOR_NAME,
+                filter=query_filter,
+                limit=limit * MINI_CANDIDATE_FACTOR,
+                params=search_params(filtered=filtered),
+            )
+        ],
+        query=query_vector,
+        filter=query_filter,
+        limit=limit,
+    )
 
-    5-phase approach to ensure maximum recall:
-      Phase 1: Semantic search (embedding similarity)
-      Phase 2: Filename-aware injection (doc names matching query)
-      Phase 3: DB content keyword search (exact terms in page text)
-      Phase 4: Multi-query injection (re-embed individual key terms)
-      Phase 5: Scoring with bonuses + diversity
 
-    This ensures that documents are found even when:
-    - Filename doesn't match the query (content search catches it)
-    - Content embeddings rank low (filename + keyword search catches it)
-    - Query terms appear literally but aren't semantically similar
-    """
-    collection_name = f"brand_{brand_slug}"
-    qdrant = get_qdrant_client()
+def _doc_ids_filter(doc_ids) -> Filter | None:
+    if not doc_ids:
+        return None
+    return Filter(must=[FieldCondition(key="doc_id", match=MatchAny(any=list(doc_ids)))])
 
-    # Check collection exists
-    existing = [c.name for c in qdrant.get_collections().collections]
-    if collection_name not in existing:
-        return []
 
-    query_vector = get_query_embedding(query)
-    fault_tokens = _extract_query_fault_tokens(query)
-    search_keywords = _extract_search_keywords(query)
-    query_identifiers = _extract_query_identifiers(query)
+class CandidatePool:
+    """Phase hits deduplicated by point id, remembering which phase found each first."""
 
-    logger.info(f"Search '{query}' | keywords={search_keywords} | fault_tokens={fault_tokens}")
+    def __init__(self):
+        self.hits: list = []
+        self.origin: dict = {}
 
-    # --- Phase 1: standard semantic search ---
-    results = qdrant.search(
-        collection_name=collection_name,
-        query_vector=query_vector,
-        limit=max(top_k * 10, 100),
-        with_payload=True,
-        score_threshold=0.3,
+    def add(self, hits: list, phase: str) -> int:
+        added = 0
+        for hit in hits:
+            if hit.id not in self.origin:
+                self.origin[hit.id] = phase
+                self.hits.append(hit)
+                added += 1
+        return added
+
+    def doc_ids(self) -> set:
+        return {(hit.payload or {}).get("doc_id") for hit in self.hits}
+
+    def origin_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for phase in self.origin.values():
+            counts[phase] = counts.get(phase, 0) + 1
+        return counts
+
+
+def _dense_request(query_vector: list[float], limit: int, score_threshold: float, query_filter: Filter | None = None, filtered: bool = False) -> QueryRequest:
+    """One plain dense search, to be sent with others in a single query_batch_points call."""
+    return QueryRequest(
+        query=query_vector,
+        filter=query_filter,
+        limit=limit,
+        with_payload=SEARCH_PAYLOAD_FIELDS,
+        score_threshold=score_threshold,
+        params=search_params(filtered=filtered),
     )
-    retrieved_ids = {hit.id for hit in results}
-
-    # --- Phase 2: filename-aware retrieval ---
-    filename_doc_ids = _find_filename_matching_doc_ids(collection_name, query, qdrant)
-    semantic_doc_ids = {(hit.payload or {}).get("doc_id") for hit in results}
-    missing_filename_docs = filename_doc_ids - semantic_doc_ids
-
-    if missing_filename_docs:
-        logger.info(f"Phase 2 filename inject: docs {missing_filename_docs}")
-        for doc_id in missing_filename_docs:
-            extra = qdrant.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                query_filter=Filter(
-                    must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
-                ),
-                limit=4,
-                with_payload=True,
-                score_threshold=0.1,
-            )
-            for hit in extra:
-                if hit.id not in retrieved_ids:
-                    results.append(hit)
-                    retrieved_ids.add(hit.id)
-
-    # --- Phase 3: DB content keyword search ---
-    # Search the SQLite pages table for exact keyword matches in content.
-    # This finds documents where the content mentions the queried model/code
-    # even when the filename is completely different.
-    if search_keywords:
-        content_doc_ids = _db_keyword_search(search_keywords, brand_slug)
-        current_doc_ids = {(hit.payload or {}).get("doc_id") for hit in results}
-        missing_content_docs = content_doc_ids - current_doc_ids
-
-        if missing_content_docs:
-            logger.info(f"Phase 3 content keyword inject: docs {missing_content_docs}")
-            for doc_id in missing_content_docs:
-                extra = qdrant.search(
-                    collection_name=collection_name,
-                    query_vector=query_vector,
-                    query_filter=Filter(
-                        must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
-                    ),
-                    limit=4,
-                    with_payload=True,
-                    score_threshold=0.1,
-                )
-                for hit in extra:
-                    if hit.id not in retrieved_ids:
-                        results.append(hit)
-                        retrieved_ids.add(hit.id)
-
-    # --- Phase 4: Multi-query injection ---
-    # Re-embed individual key terms and search separately.
-    # "Falhas no XO 508" as a single embedding might miss XO 508 content,
-    # but "XO 508" alone as an embedding is more focused.
-    if search_keywords:
-        for kw in search_keywords[:3]:  # Max 3 extra queries
-            if len(kw) < 2:
-                continue
-            try:
-                kw_vector = get_query_embedding(kw)
-                kw_results = qdrant.search(
+
+
+def _batch_search(qdrant, collection_name: str, requests: list[QueryRequest]) -> list[list]:
+    """Run dense searches in one round trip; per-request fallback if the batch call fails."""
+    if not requests:
+        return []
+    try:
+        with traced("qdrant", "query_batch_points", requests=len(requests)):
+            responses = qdrant.query_batch_points(collection_name=collection_name, requests=requests)
+        return [response.points for response in responses]
+    except Exception as e:
+        logger.warning(f"Batch search failed, running {len(requests)} searches one by one: {e}")
+
+    results = []
+    for request in requests:
+        try:
+            with traced("qdrant", "search"):
+                results.append(qdrant.search(
                     collection_name=collection_name,
-                    query_vector=kw_vector,
-                    limit=20,
-                    with_payload=True,
-                    score_threshold=0.4,
-                )
-                for hit in kw_results:
-                    if hit.id not in retrieved_ids:
-                        results.append(hit)
-                        retrieved_ids.add(hit.id)
-            except Exception as e:
-                logger.warning(f"Multi-query search for '{kw}' failed: {e}")
-
-    # --- Phase 5: scoring with bonuses ---
+                    query_vector=request.query,
+                    query_filter=request.filter,
+                    limit=request.limit,
+                    with_payload=SEARCH_PAYLOAD_FIELDS,
+                    score_threshold=request.score_threshold,
+                    search_params=request.params,
+                ))
+        except Exception as e:
+            logger.warning(f"Search failed: {e}")
+            results.append([])
+    return results
+
+
+def _signal_prefilter_request(query_vector: list[float], qf: QueryFeatures, top_k: int) -> QueryRequest | None:
+    """
+    Phase 1b: when the query carries identifiers (LCB2, OVF10, UV1...), search only
+    chunks whose indexed signals contain them, so exact-code chunks are candidates
+    even when they rank below the global semantic top-N.
+    """
+    signal_filter = _build_signal_filter(qf.identifiers, qf.fault_tokens)
+    if signal_filter is None:
+        return None
+    return _dense_request(query_vector, max(top_k * 2, 20), 0.1, signal_filter)
+
+
+def _doc_scoped_request(query_vector: list[float], doc_id: int, pages: list[int] | None = None) -> QueryRequest:
+    conditions = [FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
+    if pages:
+        conditions.append(FieldCondition(key="page_number", match=MatchAny(any=pages)))
+    return _dense_request(query_vector, 4, 0.1, Filter(must=conditions), filtered=True)
+
+
+def _multi_query_terms(qf: QueryFeatures) -> list[str]:
+    return [kw for kw in qf.search_keywords[:3] if len(kw) >= 2]  # Max 3 extra queries
+
+
+def _recall_requests(brand_slug: str, query_vector: list[float], qf: QueryFeatures, known_doc_ids: set, fts_cache: dict) -> list[tuple[str, QueryRequest]]:
+    """
+    Phases 2-3 as (phase, request) pairs, for documents no search returned yet:
+      Phase 2: documents whose filename matches the query.
+      Phase 3: documents whose page text literally contains the query keywords
+               (SQLite FTS), restricted to the matching pages. This finds documents
+               where the content mentions the queried model/code even when the
+               filename is completely different.
+    """
+    requests = []
+    with traced("sqlite", "filename_match"):
+        filename_doc_ids = _find_filename_matching_doc_ids(brand_slug, qf.query, qf.key_tokens)
+    missing = filename_doc_ids - known_doc_ids
+    if missing:
+        logger.info(f"Phase 2 filename inject: docs {missing}")
+    for doc_id in missing:
+        requests.append(("filename", _doc_scoped_request(query_vector, doc_id)))
+
+    if qf.search_keywords:
+        keywords = tuple(qf.search_keywords)
+        if keywords not in fts_cache:
+            with traced("sqlite", "keyword_fts"):
+                fts_cache[keywords] = _db_keyword_search(qf.search_keywords, brand_slug)
+        content_matches = fts_cache[keywords]
+        missing = set(content_matches) - known_doc_ids
+        if missing:
+            logger.info(f"Phase 3 content keyword inject: docs {missing}")
+        for doc_id in missing:
+            requests.append(("keyword_db", _doc_scoped_request(query_vector, doc_id, content_matches[doc_id][:8])))
+    return requests
+
+
+def _score_hits(hits: list, qf: QueryFeatures, origin: dict | None = None) -> list[dict]:
+    """
+    Phase 5 scoring. Lexical bonuses test the chunk text, so when the query has
+    terms to look for, candidates' text comes from the chunk store (one local
+    query); otherwise only the final results are hydrated (_finalize).
+    """
+    needs_text = bool(qf.fault_tokens or qf.keyword_forms or qf.identifiers)
+    stored = {}
+    if needs_text:
+        with traced("chunk_store", "get_chunks", chunks=len(hits)):
+            stored = get_chunks([hit.id for hit in hits if "text" not in (hit.payload or {})])
+    explain = current_trace() is not None
+
     chunks = []
-    for hit in results:
+    for hit in hits:
         payload = hit.payload or {}
-        payload_text = payload.get("text", "")
-        doc_filename = payload.get("doc_filename", "")
-        signal_bonus = _signal_match_bonus(payload.get("signals") or {}, query)
-        identifier_bonus, has_identifier_hit = _identifier_focus_score(payload, query_identifiers)
-        boosted_score = hit.score
-        boosted_score += _lexical_fault_bonus(payload_text, fault_tokens)
-        boosted_score += _filename_match_bonus(doc_filename, query)
-        boosted_score += _content_keyword_bonus(payload_text, search_keywords)
-        boosted_score += signal_bonus
-        boosted_score += identifier_bonus
+        if str(hit.id) in stored:
+            payload = {**payload, **stored[str(hit.id)]}
+        if explain:
+            components, has_identifier_hit = score_components(payload, qf)
+            bonus = sum(components.values())
+        else:
+            bonus, has_identifier_hit = score_candidate(payload, qf)
         chunks.append({
-            "text": payload_text,
-            "source": doc_filename,
+            "point_id": str(hit.id),
+            "text": payload.get("text", ""),
+            "source": payload.get("doc_filename", ""),
             "page": payload.get("page_number", 0),
             "doc_id": payload.get("doc_id", 0),
             "brand_slug": payload.get("brand_slug", ""),
-            "score": boosted_score,
+            "score": hit.score + bonus,
+            "vector_score": hit.score,
             "identifier_hit": has_identifier_hit,
+            "phase": (origin or {}).get(hit.id, ""),
+            "simhash": parse_signature(payload.get("simhash")),
         })
+        if explain:
+            chunks[-1]["explain"] = {"bonus": components}
+    return chunks
+
 
-    chunks.sort(key=lambda item: item["score"], reverse=True)
+def _select_top_k(chunks: list[dict], qf: QueryFeatures, top_k: int, brand_slug: str) -> list[dict]:
+    """Rank scored chunks: identifier preference, per-document diversity, brand safety."""
+    chunks = sorted(chunks, key=lambda item: item["score"], reverse=True)
 
     # If query contains explicit identifiers, prefer chunks that actually contain them.
-    if query_identifiers:
+    if qf.identifiers:
         id_matched = [c for c in chunks if c.get("identifier_hit")]
         if len(id_matched) >= max(2, top_k // 2):
             chunks = id_matched + [c for c in chunks if not c.get("identifier_hit")]
 
+    # Near-duplicates (overlapping windows, other revisions of the same manual)
+    # collapse into the best-ranked one
+    kept_signatures: list[int] = []
+    unique_chunks: list[dict] = []
+    for chunk in chunks:
+        if is_near_duplicate(chunk.get("simhash"), kept_signatures):
+            continue
+        unique_chunks.append(chunk)
+        if chunk.get("simhash") is not None:
+            kept_signatures.append(chunk["simhash"])
+        if len(unique_chunks) >= top_k * MAX_PER_DOC:
+            break
+    chunks = unique_chunks
+
     # Document diversity: ensure no single document dominates results.
-    MAX_PER_DOC = 3
+    # Phase 1 is already grouped by doc_id; this also caps the injected hits and
+    # covers the ungrouped fallback.
     doc_counts: dict[int, int] = {}
     diverse_chunks: list[dict] = []
     for chunk in chunks:
@@ -943,14 +1345,438 @@ def search_brand(brand_slug: str, query: str, top_k: int = 7) -> list[dict]:
 
     # Hard safety: never return chunks outside requested brand
     diverse_chunks = [c for c in diverse_chunks if c.get("brand_slug") == brand_slug]
-    for c in diverse_chunks:
-        c.pop("identifier_hit", None)
+    _hydrate_text(diverse_chunks)
     return diverse_chunks
 
 
+def _finalize(chunks: list[dict]) -> list[dict]:
+    """Strip internal fields from the returned chunks."""
+    result = []
+    for c in chunks:
+        c = dict(c)
+        for key in ("identifier_hit", "point_id", "phase", "simhash", "explain"):
+            c.pop(key, None)
+        result.append(c)
+    return result
+
+
+def _plan_recall_phases(chunks: list[dict], qf: QueryFeatures, query: str, top_k: int) -> tuple[bool, str]:
+    """
+    Decide whether Phases 2-4 are worth running, from the Phase 1 top-k.
+    Skips them when chat's own confidence check would already accept these
+    results with a high top score, and the query's identifiers/terms are present.
+    Returns (run_phases, reason).
+    """
+    from agent.clarifier import analyze_search_confidence
+
+    if not settings.search_adaptive_planner:
+        return True, "planner_off"
+    if not chunks:
+        return True, "no_results"
+
+    confidence = analyze_search_confidence(chunks, query)
+    if not confidence["confident"]:
+        return True, f"not_confident:{confidence['reason']}"
+    if confidence["top_score"] < PLANNER_SKIP_MIN_SCORE:
+        return True, "top_score_below_skip"
+    if qf.search_keywords and not confidence["terms_in_results"]:
+        return True, "terms_missing"
+    if qf.identifiers:
+        id_hits = sum(1 for c in chunks[:top_k] if c.get("identifier_hit"))
+        if id_hits < min(PLANNER_MIN_IDENTIFIER_HITS, top_k):
+            return True, "few_identifier_hits"
+    if len({c["doc_id"] for c in chunks}) < min(PLANNER_MIN_DOCS, top_k) and len(chunks) >= top_k:
+        return True, "single_doc_dominates"
+    return False, f"skip:{confidence['reason']}"
+
+
+def _hybrid_search(qdrant, collection_name: str, query: str, query_vector: list[float], top_k: int, doc_ids=None) -> list:
+    """
+    Phase 1 candidates: dense retrieval over a sparse-widened candidate pool.
+    Dense and sparse (BM25) hits are fused with RRF server-side only to choose which
+    candidates enter the pool; the pool is then ranked by plain cosine similarity,
+    and that cosine is the score (the 0.3 threshold and the confidence checks
+    downstream are tuned for it). BM25 does not affect ranking: a lexical-only hit
+    with low cosine can still fall under the threshold, and exact terms and codes
+    are rewarded by the Python bonuses (score_candidate) instead.
+    Falls back to dense-only when the collection has no sparse vector yet.
+    With a mini vector, the dense side is two-stage (see _dense_prefetch).
+
+    Results are grouped by doc_id server-side (at most MAX_PER_DOC per document),
+    so one large manual can't crowd out the rest; ungrouped search is the fallback.
+    With `doc_ids`, only chunks of those documents are searched (routing).
+    """
+    grouped = settings.search_group_by_doc
+    group_count = max(top_k * 2, 20)
+    # Grouping only sees the prefetched pool: make it wide (it never leaves the server)
+    dense_limit = GROUP_CANDIDATE_POOL if grouped else max(top_k * 10, 100)
+    sparse_query = query_sparse_vector(query)
+
+    try:
+        meta = get_collection_meta(collection_name)
+    except Exception as e:
+        logger.warning(f"Could not read vector layout of {collection_name}: {e}")
+        meta = {"dense": {""}, "sparse": set()}
+    has_sparse = SPARSE_VECTOR_NAME in meta["sparse"]
+    mini_size = meta.get("sizes", {}).get(MINI_VECTOR_NAME)
+    doc_filter = _doc_ids_filter(doc_ids)
+    dense_prefetch = _dense_prefetch(query_vector, dense_limit, mini_size, doc_filter)
+
+    if has_sparse and not sparse_is_empty(sparse_query):
+        sparse_limit = max(top_k * 4, 40)
+        # RRF picks the pool; the outer dense query ranks and scores it
+        request = {
+            "prefetch": [
+                Prefetch(
+                    prefetch=[
+                        dense_prefetch,
+                        Prefetch(query=sparse_query, using=SPARSE_VECTOR_NAME, filter=doc_filter, limit=sparse_limit),
+                    ],
+                    query=FusionQuery(fusion=Fusion.RRF),
+                    limit=dense_limit,
+                )
+            ],
+            "query": query_vector,
+        }
+    elif mini_size:
+        request = {"prefetch": dense_prefetch, "query": query_vector}
+    else:
+        # Plain dense: grouping runs over the whole index
+        request = {"query": query_vector, "search_params": search_params(filtered=doc_filter is not None)}
+    request["query_filter"] = doc_filter
+
+    if grouped:
+        try:
+            with traced("qdrant", "query_points_groups", scoped=doc_filter is not None):
+                groups = qdrant.query_points_groups(
+                    collection_name=collection_name,
+                    group_by="doc_id",
+                    limit=group_count,
+                    group_size=MAX_PER_DOC,
+                    with_payload=SEARCH_PAYLOAD_FIELDS,
+                    score_threshold=0.3,
+                    **request,
+                ).groups
+            return [hit for group in groups for hit in group.hits]
+        except Exception as e:
+            logger.warning(f"Grouped search failed, falling back to ungrouped: {e}")
+            dense_limit = max(top_k * 10, 100)
+
+    return _ungrouped_search(qdrant, collection_name, query_vector, dense_limit, request)
+
+
+def _phase1_scope(brand_slug: str, query_vector: list[float], qf: QueryFeatures) -> tuple[str, dict[int, float]]:
+    """Documents Phase 1 is restricted to: identifier routing first, then summary vectors."""
+    if settings.search_routing:
+        with traced("routing", "route_documents"):
+            routed = route_documents(brand_slug, [*qf.identifiers, *qf.fault_tokens])
+        if routed:
+            return "routed", routed
+    if settings.search_coarse_to_fine and len(get_brand_documents(brand_slug)) >= COARSE_MIN_BRAND_DOCS:
+        with traced("qdrant", "coarse_documents"):
+            coarse = coarse_documents(brand_slug, query_vector, COARSE_TOP_DOCS)
+        if coarse:
+            return "coarse", coarse
+    return "", {}
+
+
+def _phase1_search(qdrant, collection_name: str, brand_slug: str, query: str, query_vector: list[float], qf: QueryFeatures, top_k: int) -> list[tuple[str, list]]:
+    """
+    Phase 1 for one query as (phase, hits). When the query's identifiers route to a
+    few documents (routing_index), or on large brands the summary vectors pick them
+    (summary_index), the hybrid search runs only inside them; the brand-wide search
+    is added when the scoped one comes back thin.
+    """
+    phase, scope = _phase1_scope(brand_slug, query_vector, qf)
+    if not scope:
+        return [("dense", _hybrid_search(qdrant, collection_name, query, query_vector, top_k))]
+
+    hits = _hybrid_search(qdrant, collection_name, query, query_vector, top_k, doc_ids=list(scope))
+    logger.info(f"Phase 1 {phase} to docs {list(scope)}: {len(hits)} hits")
+    if len(hits) >= top_k and hits[0].score >= ROUTED_MIN_TOP_SCORE:
+        return [(phase, hits)]
+    return [(phase, hits), ("dense", _hybrid_search(qdrant, collection_name, query, query_vector, top_k))]
+
+
+def _ungrouped_search(qdrant, collection_name: str, query_vector: list[float], limit: int, request: dict) -> list:
+    if "prefetch" in request:
+        try:
+            with traced("qdrant", "query_points"):
+                return qdrant.query_points(
+                    collection_name=collection_name,
+                    limit=limit,
+                    with_payload=SEARCH_PAYLOAD_FIELDS,
+                    score_threshold=0.3,
+                    **request,
+                ).points
+        except Exception as e:
+            logger.warning(f"Hybrid search failed, falling back to dense: {e}")
+
+    with traced("qdrant", "search"):
+        return qdrant.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            query_filter=request.get("query_filter"),
+            limit=limit,
+            with_payload=SEARCH_PAYLOAD_FIELDS,
+            score_threshold=0.3,
+            search_params=search_params(filtered=request.get("query_filter") is not None),
+        )
+
+
+def search_brand(brand_slug: str, query: str, top_k: int = 7, explain: bool = False) -> list[dict] | dict:
+    """
+    Search a brand's collection, served from the search result cache when the
+    same (brand, query, top_k) was searched since the collection last changed.
+    See _search_brand_uncached for the retrieval pipeline.
+
+    explain=True bypasses the cache and returns a report instead of the chunk
+    list: the results plus the query plan, per-phase timings, every embedding /
+    Qdrant / SQLite call with its wall time, and each candidate's phase of
+    origin, vector score and bonus components.
+    """
+    if explain:
+        with search_trace() as trace:
+            chunks = _search_brand_uncached(brand_slug, query, top_k)
+        report = trace.report()
+        return {
+            "brand_slug": brand_slug,
+            "query": query,
+            "top_k": top_k,
+            "results": chunks,
+            **report["queries"].get(query, {}),
+            "calls": report["calls"],
+            "calls_by_kind": report["calls_by_kind"],
+        }
+
+    collection_name = f"brand_{brand_slug}"
+    cached = get_cached(collection_name, query, top_k)
+    if cached is not None:
+        logger.info(f"Search cache hit: '{query}' (top_k={top_k})")
+        return cached
+
+    version = collection_version(collection_name)
+    chunks = _search_brand_uncached(brand_slug, query, top_k)
+    if chunks:
+        put_cached(collection_name, version, query, top_k, chunks)
+    return chunks
+
+
+def _search_brand_uncached(brand_slug: str, query: str, top_k: int = 7) -> list[dict]:
+    return _search_brand_many_uncached(brand_slug, [query], top_k).get(query, [])
+
+
+def search_brand_many(brand_slug: str, queries: list[str], top_k: int = 7) -> dict[str, list[dict]]:
+    """
+    Search several queries against one brand in a single retrieval round: one
+    embedding call for all query strings (and their Phase 4 keyword terms), shared
+    keyword/filename lookups and batched Qdrant searches. Each query's results are
+    exactly what search_brand(brand_slug, query, top_k) returns, so scores are
+    comparable across queries and can be merged. Returns {query: chunks}.
+    """
+    queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+    collection_name = f"brand_{brand_slug}"
+    results: dict[str, list[dict]] = {}
+    pending = []
+    for query in queries:
+        cached = get_cached(collection_name, query, top_k)
+        if cached is not None:
+            logger.info(f"Search cache hit: '{query}' (top_k={top_k})")
+            results[query] = cached
+        else:
+            pending.append(query)
+
+    if pending:
+        version = collection_version(collection_name)
+        for query, chunks in _search_brand_many_uncached(brand_slug, pending, top_k).items():
+            if chunks:
+                put_cached(collection_name, version, query, top_k, chunks)
+            results[query] = chunks
+    return {query: results.get(query, []) for query in queries}
+
+
+def _search_brand_many_uncached(brand_slug: str, queries: list[str], top_k: int = 7) -> dict[str, list[dict]]:
+    """
+    Comprehensive hybrid search within a brand's collection.
+
+    5-phase approach to ensure maximum recall:
+      Phase 1: Dense search over a pool widened with sparse lexical (BM25)
+               candidates via RRF in one Qdrant query, ranked and scored by
+               embedding similarity only (dense only on collections without
+               the sparse vector), restricted
+               to the documents the query's identifiers route to when they are
+               selective — plus a signal pre-filtered search when the query
+               carries identifiers
+      Phase 2: Filename-aware injection (doc names matching query)
+      Phase 3: DB content keyword search (exact terms in page text)
+      Phase 4: Multi-query injection (re-embed individual key terms)
+      Phase 5: Scoring with bonuses + diversity
+
+    Phases 2-4 are planned after Phase 1 is scored: when those results are
+    already confident (see _plan_recall_phases) they are skipped.
+
+    Several queries are searched together: every query string and keyword term is
+    embedded in one call, Phase 1 runs concurrently per query (Qdrant has no
+    batched grouped search) and the other phases' searches go in one
+    query_batch_points call per round. A keyword term shared by several queries
+    is searched once.
+
+    This ensures that documents are found even when:
+    - Filename doesn't match the query (content search catches it)
+    - Content embeddings rank low (filename + keyword search catches it)
+    - Query terms appear literally but aren't semantically similar
+    """
+    collection_name = f"brand_{brand_slug}"
+    if not collection_exists(collection_name):
+        return {query: [] for query in queries}
+    qdrant = get_qdrant_client()
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+
+    features = {query: build_query_features(query) for query in queries}
+    terms = {query: _multi_query_terms(qf) for query, qf in features.items()}
+    texts = list(dict.fromkeys([*queries, *(t for query in queries for t in terms[query])]))
+    with traced("embedding", "query_batch", texts=len(texts)):
+        vectors = dict(zip(texts, get_query_embeddings_batch(texts)))
+    timings["embed"] = time.perf_counter() - started
+
+    for query, qf in features.items():
+        logger.info(f"Search '{query}' | keywords={qf.search_keywords} | fault_tokens={qf.fault_tokens}")
+
+    pools = {query: CandidatePool() for query in queries}
+
+    # --- Phase 1: hybrid (dense + sparse lexical) search + signal pre-filter ---
+    phase_start = time.perf_counter()
+    signal_requests = {}
+    for query, qf in features.items():
+        request = _signal_prefilter_request(vectors[query], qf, top_k)
+        if request is not None:
+            signal_requests[query] = request
+    signal_future = submit_traced(
+        _phase_executor, _batch_search, qdrant, collection_name, list(signal_requests.values())
+    )
+    if len(queries) == 1:
+        query = queries[0]
+        dense_hits = {query: _phase1_search(qdrant, collection_name, brand_slug, query, vectors[query], features[query], top_k)}
+    else:
+        futures = {
+            query: submit_traced(
+                _phase_executor, _phase1_search, qdrant, collection_name, brand_slug, query, vectors[query], features[query], top_k
+            )
+            for query in queries
+        }
+        dense_hits = {query: future.result() for query, future in futures.items()}
+    signal_hits = dict(zip(signal_requests, signal_future.result()))
+
+    for query in queries:
+        for phase, hits in dense_hits[query]:
+            pools[query].add(hits, phase)
+        added = pools[query].add(signal_hits.get(query, []), "signal")
+        if added:
+            logger.info(f"Phase 1b signal pre-filter inject: {added} chunks")
+    timings["phase1"] = time.perf_counter() - phase_start
+
+    chunks = {query: _score_hits(pools[query].hits, features[query], pools[query].origin) for query in queries}
+    top = {query: _select_top_k(chunks[query], features[query], top_k, brand_slug) for query in queries}
+
+    # --- Phases 2-4: only for queries whose Phase 1 isn't already conclusive ---
+    plans = {query: _plan_recall_phases(top[query], features[query], query, top_k) for query in queries}
+    recall_queries = [query for query in queries if plans[query][0]]
+    if recall_queries:
+        phase_start = time.perf_counter()
+        owners: list[tuple[str, str]] = []
+        requests: list[QueryRequest] = []
+        fts_cache: dict = {}
+        for query in recall_queries:
+            known_doc_ids = pools[query].doc_ids()
+            for phase, request in _recall_requests(brand_slug, vectors[query], features[query], known_doc_ids, fts_cache):
+                owners.append((query, phase))
+                requests.append(request)
+
+        # Phase 4: re-embed individual key terms and search separately.
+        # "Falhas no XO 508" as a single embedding might miss XO 508 content,
+        # but "XO 508" alone as an embedding is more focused.
+        term_list = list(dict.fromkeys(t for query in recall_queries for t in terms[query]))
+        term_offset = len(requests)
+        requests.extend(_dense_request(vectors[t], 20, 0.4) for t in term_list)
+
+        responses = _batch_search(qdrant, collection_name, requests)
+        term_hits = dict(zip(term_list, responses[term_offset:]))
+        for (query, phase), hits in zip(owners, responses[:term_offset]):
+            pools[query].add(hits, phase)
+        for query in recall_queries:
+            for term in terms[query]:
+                pools[query].add(term_hits.get(term, []), "multi_query")
+        timings["phases2_4"] = time.perf_counter() - phase_start
+
+        for query in recall_queries:
+            scored_ids = {c["point_id"] for c in chunks[query]}
+            new_hits = [hit for hit in pools[query].hits if str(hit.id) not in scored_ids]
+            if new_hits:
+                chunks[query] = chunks[query] + _score_hits(new_hits, features[query], pools[query].origin)
+                top[query] = _select_top_k(chunks[query], features[query], top_k, brand_slug)
+
+    timings["total"] = time.perf_counter() - started
+    trace = current_trace()
+    results = {}
+    for query in queries:
+        run_recall, plan_reason = plans[query]
+        record_search(plan_reason, run_recall, pools[query].origin_counts(), top[query], timings)
+        if trace is not None:
+            trace.queries[query] = _explain_query(features[query], plans[query], chunks[query], top[query], timings)
+        results[query] = _finalize(top[query])
+    return results
+
+
+def _explain_query(qf: QueryFeatures, plan: tuple[bool, str], chunks: list[dict], top: list[dict], timings: dict[str, float]) -> dict:
+    """Explain-mode report of one query: plan, phase timings and every scored candidate."""
+    ranks = {c["point_id"]: rank for rank, c in enumerate(top, 1)}
+    candidates = []
+    for c in sorted(chunks, key=lambda item: item["score"], reverse=True)[:EXPLAIN_MAX_CANDIDATES]:
+        details = c.get("explain") or {}
+        candidates.append({
+            "point_id": c["point_id"],
+            "rank": ranks.get(c["point_id"]),
+            "source": c["source"],
+            "page": c["page"],
+            "doc_id": c["doc_id"],
+            "phase": c["phase"],
+            "score": round(c["score"], 4),
+            "vector_score": round(c["vector_score"], 4),
+            "bonus": {name: round(value, 4) for name, value in (details.get("bonus") or {}).items() if value},
+            "identifier_hit": c["identifier_hit"],
+        })
+    return {
+        "features": {
+            "keywords": qf.search_keywords,
+            "fault_tokens": qf.fault_tokens,
+            "identifiers": qf.identifiers,
+            "multi_query_terms": _multi_query_terms(qf),
+        },
+        "plan": {"ran_recall_phases": plan[0], "reason": plan[1]},
+        "timings_ms": {step: round(seconds * 1000, 1) for step, seconds in timings.items()},
+        "candidate_total": len(chunks),
+        "candidates": candidates,
+    }
+
+
+def _hydrate_text(chunks: list[dict]):
+    """Fill in text from the chunk store for results that weren't scored with it."""
+    missing = [c["point_id"] for c in chunks if not c.get("text")]
+    if not missing:
+        return
+    with traced("chunk_store", "get_chunks", chunks=len(missing)):
+        stored = get_chunks(missing)
+    for c in chunks:
+        if not c.get("text") and c["point_id"] in stored:
+            c["text"] = stored[c["point_id"]]["text"]
+
+
 def delete_document_vectors(brand_slug: str, doc_id: int):
     """Remove all vectors for a specific document."""
     collection_name = f"brand_{brand_slug}"
+    if not collection_exists(collection_name):
+        return
     client = get_qdrant_client()
 
     client.delete(
@@ -959,4 +1785,6 @@ def delete_document_vectors(brand_slug: str, doc_id: int):
             must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]
         ),
     )
-    invalidate_filename_cache(collection_name)
+    delete_document_chunks(collection_name, doc_id)
+    delete_document_summaries(brand_slug, doc_id)
+    bump_collection_version(collection_name)
@@ -0,0 +1,358 @@
+import re
+import sqlite3
+import logging
+from dataclasses import dataclass, field
+from sqlalchemy import delete
+from models import FaultCode
+from ingestion.page_index import pooled_connection
+from ingestion.embedder import (
+    FAULT_CODE_HINTS,
+    CONTROLLER_CODE_PATTERN,
+    MODEL_VERSION_PATTERN,
+    _normalize_for_matching,
+    _extract_query_fault_tokens,
+)
+
+logger = logging.getLogger(__name__)
+
+# Structured index of fault-code table rows ("| UV1 | Subtensão | ... |"), filled
+# per page at ingest. Exact code lookups ("erro UV1 OVF20") are answered from it
+# with one indexed query instead of embeddings + vector search + rerank.
+
+SEPARATOR_ROW = re.compile(r"^\|?\s*[:\-]{2,}(\s*\|\s*[:\-]{2,})+\|?$")
+CODE_CELL = re.compile(r"^(?:[A-Z]{1,5}[\s\-.]?)?\d{1,4}[A-Z]?$|^[A-Z]{2,4}$")
+SPLIT_MODEL = re.compile(r"\b([A-Z]{2,6})[\s\-](\d{1,5})\b")
+NUMERIC_QUERY_CODE = re.compile(r"\b(?:erro|falha|c[oó]digo|alarme|fault|error)\s*[:#nº°]*\s*(\d{2,4})\b", re.IGNORECASE)
+FAULT_INTENT = re.compile(r"\b(erro|falha|c[oó]digo|alarme|defeito|fault|error|pisca|display)", re.IGNORECASE)
+# Equipment identifiers (OVF20, LCB2, CFW09, GEN2): never fault codes
+EQUIPMENT_CODE = re.compile(r"^([A-Z]{3,6})\d{1,5}[A-Z]{0,3}$")
+# Headerless tables are fault-code tables only if their rows talk about faults
+FAULT_WORDS = (
+    "falha", "erro", "defeito", "alarme", "fault", "error", "trip", "sobrecorrente", "subtensao",
+    "sobretensao", "sobrecarga", "superaquec", "curto", "bloqueio", "protecao",
+)
+
+# Header words (accent-folded) → field. Checked in this order, so
+# "Descrição da falha" is a description and "Falha" alone is the code column.
+HEADER_FIELDS = [
+    ("cause", ("causa", "cause", "motivo", "origem")),
+    ("action", ("acao", "solucao", "correcao", "procedimento", "verificar", "remedy", "action", "medida", "o que fazer")),
+    ("description", ("descricao", "significado", "description", "mensagem", "defeito", "nome")),
+    ("code", ("codigo", "code", "cod", "falha", "erro", "display", "led", "alarme", "evento")),
+]
+
+MAX_ROWS_PER_CODE = 3
+MAX_MODEL_TOKENS = 20
+
+
+def normalize_code(cell: str) -> str:
+    return re.sub(r"[\s\-.]", "", (cell or "").upper())[:20]
+
+
+def _header_field(cell: str) -> str | None:
+    norm = _normalize_for_matching(cell)
+    if not norm:
+        return None
+    for name, words in HEADER_FIELDS:
+        if any(re.search(rf"\b{w}", norm) for w in words):
+            return name
+    return None
+
+
+def is_equipment_identifier(token: str) -> bool:
+    code = normalize_code(token)
+    match = EQUIPMENT_CODE.match(code)
+    if match and match.group(1) not in FAULT_CODE_HINTS:
+        return True
+    return bool(MODEL_VERSION_PATTERN.fullmatch(code))
+
+
+def _looks_like_fault_code(code: str) -> bool:
+    """UV1, OC, E31, F04: a fault-hint prefix or a single letter + digits."""
+    prefix = re.match(r"^[A-Z]*", code).group(0)
+    return prefix in FAULT_CODE_HINTS or bool(re.fullmatch(r"[A-Z]\d{1,4}", code))
+
+
+def _is_code(cell: str, from_header: bool) -> bool:
+    text = (cell or "").strip().upper()
+    if not CODE_CELL.match(text):
+        return False
+    if not from_header and is_equipment_identifier(text):
+        return False
+    # Without a header naming the column, only accept cells that look like fault codes
+    return from_header or any(ch.isdigit() for ch in text) or text in FAULT_CODE_HINTS
+
+
+def _split_cells(line: str) -> list[str]:
+    return [cell.strip() for cell in line.strip().strip("|").split("|")]
+
+
+def _table_blocks(text: str) -> list[list[str]]:
+    blocks: list[list[str]] = []
+    current: list[str] = []
+    for line in (text or "").splitlines():
+        if "|" in line:
+            current.append(line.strip())
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _column_map(header: list[str]) -> dict[str, list[int]] | None:
+    # A first row holding a code ("| 31 | Falha na porta |") is data, not a header
+    if any(_is_code(cell, False) for cell in header):
+        return None
+    columns: dict[str, list[int]] = {}
+    for idx, cell in enumerate(header):
+        name = _header_field(cell)
+        if name:
+            columns.setdefault(name, []).append(idx)
+    if "code" not in columns or len(columns) < 2:
+        return None
+    return columns
+
+
+def _positional_map(width: int) -> dict[str, list[int]]:
+    if width >= 4:
+        return {"code": [0], "description": [1], "cause": [2], "action": list(range(3, width))}
+    if width == 3:
+        return {"code": [0], "description": [1], "action": [2]}
+    return {"code": [0], "description": [1]}
+
+
+def _parse_block(lines: list[str]) -> list[dict]:
+    rows = [(_split_cells(line), line) for line in lines if not SEPARATOR_ROW.match(line)]
+    rows = [(cells, line) for cells, line in rows if any(cells)]
+    if len(rows) < 2:
+        return []
+
+    columns = _column_map(rows[0][0])
+    from_header = columns is not None
+    if from_header:
+        rows = rows[1:]
+    else:
+        columns = _positional_map(max(len(cells) for cells, _ in rows))
+    code_idx = columns["code"][0]
+
+    def cell(cells: list[str], name: str) -> str:
+        return " ".join(cells[i] for i in columns.get(name, []) if i < len(cells) and cells[i]).strip()
+
+    parsed: list[dict] = []
+    current: dict | None = None
+    for cells, line in rows:
+        code_cell = cells[code_idx] if code_idx < len(cells) else ""
+        if _is_code(code_cell, from_header):
+            current = {
+                "code": normalize_code(code_cell),
+                "description": cell(cells, "description"),
+                "cause": cell(cells, "cause"),
+                "action": cell(cells, "action"),
+                "lines": [line],
+            }
+            parsed.append(current)
+        elif current is not None and not code_cell:
+            # Continuation of the previous logical row (multi-line cells)
+            for name in ("description", "cause", "action"):
+                extra = cell(cells, name)
+                if extra:
+                    current[name] = f"{current[name]} {extra}".strip()
+            current["lines"].append(line)
+        else:
+            current = None
+
+    if not from_header and (len(parsed) < 2 or not _has_fault_evidence(parsed)):
+        # Column 1 of an arbitrary table (specs, part lists) is not a fault code
+        return []
+    return parsed
+
+
+def _has_fault_evidence(parsed: list[dict]) -> bool:
+    if any(_looks_like_fault_code(row["code"]) for row in parsed):
+        return True
+    text = _normalize_for_matching(" ".join(f"{r['description']} {r['cause']} {r['action']}" for r in parsed))
+    return any(re.search(rf"\b{word}", text) for word in FAULT_WORDS)
+
+
+def _model_tokens(text: str) -> list[str]:
+    """Equipment identifiers (OVF20, LCB2, GEN2...) in a text; "OVF 20" is joined."""
+    upper = SPLIT_MODEL.sub(r"\1\2", (text or "").upper())
+    tokens = [t for t in CONTROLLER_CODE_PATTERN.findall(upper) if len(t) >= 3]
+    tokens.extend(re.sub(r"[^A-Z0-9]", "", m.group(0).upper()) for m in MODEL_VERSION_PATTERN.finditer(upper))
+    return [t for t in dict.fromkeys(tokens) if t not in {"HTTP", "HTTPS", "PAGE", "PDF"}]
+
+
+def _page_model_tokens(text: str, doc_filename: str, codes: set[str]) -> str:
+    """Equipment identifiers of the page (filename + text outside tables), minus the table's codes."""
+    outside = "\n".join(line for line in (text or "").splitlines() if "|" not in line)
+    tokens = _model_tokens(doc_filename) + _model_tokens(outside[:6000])
+    tokens = [t for t in dict.fromkeys(tokens) if t not in codes]
+    return " ".join(tokens[:MAX_MODEL_TOKENS])
+
+
+def extract_fault_code_rows(text: str, doc_filename: str = "") -> list[dict]:
+    """
+    Fault-code rows from the markdown tables of a page:
+    [{"code", "description", "cause", "action", "row_text", "model_tokens"}].
+    Columns come from the header when it names them (Código / Descrição / Causa /
+    Ação...), otherwise from position (code, description, [cause], action).
+    """
+    rows: list[dict] = []
+    seen: set[tuple[str, str]] = set()
+    for block in _table_blocks(text):
+        if len(block) < 2:
+            continue
+        for row in _parse_block(block):
+            row_text = "\n".join(row.pop("lines"))
+            key = (row["code"], re.sub(r"\s+", " ", row_text).lower())
+            if key in seen or not (row["description"] or row["cause"] or row["action"]):
+                continue
+            seen.add(key)
+            rows.append({**row, "row_text": row_text})
+
+    if rows:
+        model_tokens = _page_model_tokens(text, doc_filename, {r["code"] for r in rows})
+        for row in rows:
+            row["model_tokens"] = model_tokens
+    return rows
+
+
+async def replace_page_fault_codes(db, brand_id: int, doc_id: int, doc_filename: str, page_number: int, text: str) -> int:
+    """Re-index the fault-code rows of one page (added to the session; caller commits)."""
+    await db.execute(
+        delete(FaultCode).where(FaultCode.document_id == doc_id, FaultCode.page_number == page_number)
+    )
+    rows = extract_fault_code_rows(text, doc_filename)
+    for row in rows:
+        db.add(FaultCode(
+            brand_id=brand_id,
+            document_id=doc_id,
+            page_number=page_number,
+            code=row["code"],
+            model_tokens=row["model_tokens"],
+            description=row["description"] or None,
+            cause=row["cause"] or None,
+            action=row["action"] or None,
+            row_text=row["row_text"],
+        ))
+    return len(rows)
+
+
+def lookup_fault_codes(brand_slug: str, codes: list[str], limit: int = 50) -> list[dict]:
+    """Indexed lookup of fault-code rows of a brand by normalized code."""
+    codes = list(dict.fromkeys(normalize_code(c) for c in codes if c))
+    if not codes:
+        return []
+
+    placeholders = ", ".join("?" * len(codes))
+    try:
+        with pooled_connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT fc.code, fc.model_tokens, fc.description, fc.cause, fc.action,
+                       fc.row_text, fc.document_id, fc.page_number, d.original_filename
+                FROM fault_codes fc
+                JOIN brands b ON b.id = fc.brand_id
+                JOIN documents d ON d.id = fc.document_id
+                WHERE b.slug = ? AND fc.code IN ({placeholders})
+                ORDER BY fc.document_id, fc.page_number
+                LIMIT ?
+                """,
+                (brand_slug, *codes, limit),
+            ).fetchall()
+    except sqlite3.OperationalError as e:
+        # Database created before the fault_codes table (init_db creates it)
+        logger.warning(f"Fault code lookup unavailable: {e}")
+        return []
+
+    return [
+        {
+            "code": row[0],
+            "model_tokens": (row[1] or "").split(),
+            "description": row[2] or "",
+            "cause": row[3] or "",
+            "action": row[4] or "",
+            "row_text": row[5],
+            "doc_id": row[6],
+            "page": row[7],
+            "source": row[8] or "",
+        }
+        for row in rows
+    ]
+
+
+@dataclass
+class FaultLookup:
+    codes: list[str]                      # query codes present in the table
+    models: list[str]                     # other identifiers in the query (equipment)
+    rows: list[dict] = field(default_factory=list)
+    exact: bool = False                   # unambiguous: can answer without vector search
+
+
+def _query_code_candidates(query: str) -> list[str]:
+    candidates = _extract_query_fault_tokens(query or "")
+    candidates.extend(m.group(1) for m in NUMERIC_QUERY_CODE.finditer(query or ""))
+    codes = (normalize_code(c) for c in candidates)
+    return list(dict.fromkeys(c for c in codes if not is_equipment_identifier(c)))
+
+
+def _model_match(row_models: list[str], query_models: list[str]) -> bool:
+    return any(rm.startswith(qm) or qm.startswith(rm) for rm in row_models for qm in query_models)
+
+
+def find_query_fault_codes(brand_slug: str, query: str) -> FaultLookup | None:
+    """
+    Exact fault-code lookup for a chat query. Tokens found as codes in the table
+    are the codes; the query's other identifiers are the equipment (OVF20, GEN2...).
+    The result is exact when the query asks about a fault (erro/falha/código or
+    a fault-code-shaped token) and every code resolves to rows of a single
+    document — the one matching the equipment, or the only one defining the code.
+    """
+    candidates = _query_code_candidates(query)
+    if not candidates:
+        return None
+    rows = lookup_fault_codes(brand_slug, candidates)
+    if not rows:
+        return None
+
+    found = {row["code"] for row in rows}
+    codes = [c for c in candidates if c in found]
+    # "erro 31" is a code, not an "ERRO31" identifier
+    equipment_text = NUMERIC_QUERY_CODE.sub(" ", query or "")
+    models = [token for token in dict.fromkeys([*_model_tokens(equipment_text), *candidates]) if token not in found]
+
+    matched = [row for row in rows if _model_match(row["model_tokens"], models)] if models else []
+    selected = matched or rows
+    # Same code + same page may come from duplicated table rows; keep a few per code
+    per_code: dict[str, int] = {}
+    kept = []
+    for row in selected:
+        if per_code.get(row["code"], 0) < MAX_ROWS_PER_CODE:
+            per_code[row["code"]] = per_code.get(row["code"], 0) + 1
+            kept.append(row)
+
+    single_doc = len({row["doc_id"] for row in kept}) == 1
+    all_codes = {row["code"] for row in kept} == set(codes)
+    fault_intent = bool(FAULT_INTENT.search(query or "")) or any(_looks_like_fault_code(c) for c in codes)
+    exact = fault_intent and single_doc and all_codes and (bool(matched) or not models)
+    return FaultLookup(codes=codes, models=models, rows=kept, exact=exact)
+
+
+def fault_code_chunks(lookup: FaultLookup, brand_slug: str, score: float = 1.0) -> list[dict]:
+    """Fault-code rows in the chunk format returned by search_brand."""
+    chunks = []
+    for row in lookup.rows:
+        parts = [f"Código {row['code']}"]
+        if row["model_tokens"]:
+            parts.append(f"Equipamento: {' '.join(row['model_tokens'][:6])}")
+        chunks.append({
+            "text": f"{' | '.join(parts)}\n{row['row_text']}",
+            "source": row["source"],
+            "page": row["page"],
+            "doc_id": row["doc_id"],
+            "brand_slug": brand_slug,
+            "score": score,
+        })
+    return chunks
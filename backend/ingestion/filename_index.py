@@ -0,0 +1,80 @@
+import threading
+from ingestion.doc_catalog import get_brand_documents, catalog_version
+
+NGRAM_SIZES = (2, 3)
+
+
+def _ngrams(text: str, n: int) -> set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class FilenameIndex:
+    """
+    Inverted indexes over a brand's normalized filenames:
+      tokens – whole normalized tokens → doc_ids (exact token hits)
+      grams  – character bi/trigrams of the "squished" name (no spaces) → doc_ids
+    A query token matches a filename when it is a substring of the squished
+    name; the gram postings narrow that to a few candidates to verify.
+    """
+
+    def __init__(self, docs: dict[int, str], normalize):
+        self.squished: dict[int, str] = {}
+        self.tokens: dict[str, set[int]] = {}
+        self.grams: dict[str, set[int]] = {}
+
+        for doc_id, filename in docs.items():
+            normalized = normalize(filename or "")
+            squished = normalized.replace(" ", "")
+            self.squished[doc_id] = squished
+            for token in normalized.split():
+                self.tokens.setdefault(token, set()).add(doc_id)
+            for n in NGRAM_SIZES:
+                for gram in _ngrams(squished, n):
+                    self.grams.setdefault(gram, set()).add(doc_id)
+
+    def _token_matches(self, token: str) -> set[int]:
+        token = token.replace(" ", "")
+        if not token:
+            return set()
+        exact = self.tokens.get(token, set())
+        if len(token) < 2:
+            return {doc_id for doc_id, name in self.squished.items() if token in name}
+
+        n = 3 if len(token) >= 3 else 2
+        postings = [self.grams.get(gram) for gram in _ngrams(token, n)]
+        if any(p is None for p in postings):
+            return set(exact)
+        postings.sort(key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return exact | {doc_id for doc_id in candidates - exact if token in self.squished[doc_id]}
+
+    def match_counts(self, query_tokens: list[str]) -> dict[int, int]:
+        """doc_id → number of query tokens found in its filename."""
+        counts: dict[int, int] = {}
+        for token in query_tokens:
+            for doc_id in self._token_matches(token):
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+        return counts
+
+
+# Cache: brand_slug → (catalog version, index)
+_indexes: dict[str, tuple[int, FilenameIndex]] = {}
+_lock = threading.Lock()
+
+
+def get_filename_index(brand_slug: str) -> FilenameIndex:
+    """Index for a brand, rebuilt only when its documents changed."""
+    from ingestion.embedder import _normalize_for_matching
+
+    version = catalog_version(brand_slug)
+    cached = _indexes.get(brand_slug)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    with _lock:
+        cached = _indexes.get(brand_slug)
+        if cached and cached[0] == version:
+            return cached[1]
+        index = FilenameIndex(get_brand_documents(brand_slug), _normalize_for_matching)
+        _indexes[brand_slug] = (version, index)
+        return index
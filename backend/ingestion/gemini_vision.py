@@ -4,6 +4,7 @@ from google import genai
 from google.genai import types
 from tenacity import retry, retry_if_not_exception_type, stop_after_attempt, wait_exponential
 from config import get_settings
+from ingestion.llm_usage import record_llm_call
 import logging
 import re
 
@@ -274,6 +275,7 @@ async def rerank_chunks(query: str, chunks: list[dict]) -> list[dict]:
         )
 
         prompt = RERANK_PROMPT.format(query=query, chunks=chunks_text)
+        started = time.perf_counter()
         response = await client.aio.models.generate_content(
             model=VISION_MODEL,
             contents=prompt,
@@ -283,6 +285,7 @@ async def rerank_chunks(query: str, chunks: list[dict]) -> list[dict]:
                 thinking_config=types.ThinkingConfig(include_thoughts=False),
             ),
         )
+        record_llm_call("rerank", started, response)
 
         import json
         import re
@@ -0,0 +1,46 @@
+import time
+import contextvars
+from contextlib import contextmanager
+
+# Per-turn ledger of Gemini calls on the answer path (rerank, answer, rewrite...):
+# wall time and token counts from usage_metadata, so each chat turn logs what
+# its answer cost. Calls made outside llm_usage() are not recorded.
+
+_current: contextvars.ContextVar["list[dict] | None"] = contextvars.ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def llm_usage():
+    """Record the Gemini calls made inside the block (yields the list of calls)."""
+    calls: list[dict] = []
+    token = _current.set(calls)
+    try:
+        yield calls
+    finally:
+        _current.reset(token)
+
+
+def record_llm_call(name: str, started: float, response=None):
+    """Add a call (started = time.perf_counter() before it) to the active ledger, if any."""
+    calls = _current.get()
+    if calls is None:
+        return
+    usage = getattr(response, "usage_metadata", None)
+    calls.append({
+        "name": name,
+        "ms": round((time.perf_counter() - started) * 1000),
+        "prompt_tokens": getattr(usage, "prompt_token_count", None) or 0,
+        "output_tokens": (
+            (getattr(usage, "candidates_token_count", None) or 0)
+            + (getattr(usage, "thoughts_token_count", None) or 0)
+        ),
+    })
+
+
+def summarize_llm_calls(calls: list[dict]) -> str:
+    """One log line: call names, total wall time and tokens."""
+    names = "+".join(call["name"] for call in calls) or "nenhuma"
+    ms = sum(call["ms"] for call in calls)
+    prompt_tokens = sum(call["prompt_tokens"] for call in calls)
+    output_tokens = sum(call["output_tokens"] for call in calls)
+    return f"{len(calls)} LLM calls ({names}), {ms}ms, tokens in={prompt_tokens} out={output_tokens}"
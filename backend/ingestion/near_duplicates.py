@@ -0,0 +1,65 @@
+import re
+import hashlib
+
+# SimHash signatures of chunk texts. Two chunks whose 64-bit signatures differ in
+# at most NEAR_DUPLICATE_MAX_DISTANCE bits are near-duplicates: the same table
+# row or paragraph repeated by overlapping windows, or by another revision of
+# the same manual. They only collapse in search results (0 disables it): chunks
+# that differ in one parameter value or model code can be that close, so ingestion
+# only skips exact repeats (same content_hash).
+SIMHASH_BITS = 64
+NEAR_DUPLICATE_MAX_DISTANCE = 3
+# Features are the distinct overlapping word shingles, so word order matters and
+# phrasing repeated on every line (templated parameter lists) doesn't outweigh
+# the values that differ
+SHINGLE_WORDS = 3
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+_MASK = (1 << SIMHASH_BITS) - 1
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text: str) -> int:
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if not words:
+        return 0
+    if len(words) < SHINGLE_WORDS:
+        features = {" ".join(words)}
+    else:
+        features = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0) & _MASK
+
+
+def content_hash(text: str) -> str:
+    """Hash of the chunk's words (case and spacing ignored): equal only for exact repeats."""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def signature(text: str) -> str:
+    """Payload form of the signature (hex: Qdrant integers are signed 64-bit)."""
+    return f"{simhash(text):016x}"
+
+
+def parse_signature(value) -> int | None:
+    if not value:
+        return None
+    try:
+        return int(value, 16)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_near_duplicate(candidate: int | None, kept: list[int]) -> bool:
+    if candidate is None or not NEAR_DUPLICATE_MAX_DISTANCE:
+        return False
+    return any((candidate ^ other).bit_count() <= NEAR_DUPLICATE_MAX_DISTANCE for other in kept)
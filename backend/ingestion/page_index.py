@@ -0,0 +1,161 @@
+import re
+import queue
+import sqlite3
+import logging
+from contextlib import contextmanager
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# FTS5 index over pages.gemini_text (external content table, kept in sync by triggers).
+# remove_diacritics folds accents so "calibração" matches "calibracao".
+PAGE_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        gemini_text,
+        content='pages',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_ai AFTER INSERT ON pages BEGIN
+        INSERT INTO pages_fts(rowid, gemini_text) VALUES (new.id, new.gemini_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_ad AFTER DELETE ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, gemini_text) VALUES ('delete', old.id, old.gemini_text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pages_fts_au AFTER UPDATE OF gemini_text ON pages BEGIN
+        INSERT INTO pages_fts(pages_fts, rowid, gemini_text) VALUES ('delete', old.id, old.gemini_text);
+        INSERT INTO pages_fts(rowid, gemini_text) VALUES (new.id, new.gemini_text);
+    END
+    """,
+]
+
+POOL_SIZE = 4
+
+
+def sqlite_path_from_url(database_url: str) -> str:
+    """'sqlite:////app/data/andreja.db' (or sqlite+aiosqlite) → '/app/data/andreja.db'."""
+    return re.sub(r"^sqlite(\+\w+)?:///", "", database_url)
+
+
+def create_page_fts(sync_conn) -> None:
+    """
+    Create the FTS table + sync triggers. Run from init_db via conn.run_sync().
+    On first creation, the index is rebuilt from the existing pages.
+    """
+    existed = sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='pages_fts'"
+    ).first()
+    for statement in PAGE_FTS_DDL:
+        sync_conn.exec_driver_sql(statement)
+    if not existed:
+        sync_conn.exec_driver_sql("INSERT INTO pages_fts(pages_fts) VALUES ('rebuild')")
+        logger.info("Built pages_fts index from existing pages")
+
+
+# ---------------------------------------------------------------------------
+# Read connection pool (search_brand is sync and runs per chat turn)
+# ---------------------------------------------------------------------------
+_pool: queue.LifoQueue | None = None
+
+
+def _open_connection() -> sqlite3.Connection:
+    path = sqlite_path_from_url(settings.database_url)
+    conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a read-only sqlite3 connection to the configured database."""
+    global _pool
+    if _pool is None:
+        _pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+
+    broken = False
+    try:
+        yield conn
+    except sqlite3.DatabaseError:
+        broken = True
+        raise
+    finally:
+        if broken:
+            conn.close()
+        else:
+            try:
+                _pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+
+def _fts_phrase(keyword: str) -> str | None:
+    """'C.07.10' → '"c 07 10"*'  (phrase with prefix match on the last token)."""
+    tokens = re.findall(r"\w+", keyword.lower())
+    if not tokens:
+        return None
+    return '"' + " ".join(tokens) + '"*'
+
+
+def build_match_expression(keywords: list[str]) -> str:
+    phrases = [p for p in (_fts_phrase(kw) for kw in keywords) if p]
+    return " OR ".join(dict.fromkeys(phrases))
+
+
+def search_pages(keywords: list[str], brand_slug: str, limit: int = 50) -> list[tuple[int, int, float]]:
+    """
+    Full-text search over page content for a brand, all keywords in one query.
+    Returns ranked (doc_id, page_number, score) hits, best first.
+    """
+    match_expr = build_match_expression(keywords)
+    if not match_expr:
+        return []
+
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT p.document_id, p.page_number, bm25(pages_fts) AS rank
+            FROM pages_fts
+            JOIN pages p ON p.id = pages_fts.rowid
+            JOIN documents d ON d.id = p.document_id
+            JOIN brands b ON b.id = d.brand_id
+            WHERE pages_fts MATCH ? AND b.slug = ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (match_expr, brand_slug, limit),
+        ).fetchall()
+
+    # bm25() is lower-is-better; flip the sign so callers sort descending
+    return [(row[0], row[1], -float(row[2])) for row in rows]
+
+
+def search_filenames(keywords: list[str], brand_slug: str) -> list[int]:
+    """doc_ids whose original filename contains any keyword (documents table is small)."""
+    if not keywords:
+        return []
+
+    clauses = " OR ".join(["d.original_filename LIKE ? COLLATE NOCASE"] * len(keywords))
+    with pooled_connection() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT d.id
+            FROM documents d
+            JOIN brands b ON d.brand_id = b.id
+            WHERE b.slug = ? AND ({clauses})
+            """,
+            (brand_slug, *[f"%{kw}%" for kw in keywords]),
+        ).fetchall()
+    return [row[0] for row in rows]
@@ -14,7 +14,10 @@ from ingestion.gemini_vision import (
     delete_gemini_file,
 )
 from ingestion.open_source_vision import extract_page_open_source
-from ingestion.embedder import upsert_page, ensure_collection
+from ingestion.embedder import upsert_page, ensure_collection, document_content_hashes
+from ingestion.fault_codes import replace_page_fault_codes
+from ingestion.routing_index import replace_page_identifiers
+from ingestion.summary_index import refresh_document_summary
 from config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -142,6 +145,8 @@ async def process_document(
         _job_progress[job_id]["updated_at"] = time.time()
 
         pages_to_process = [p for p in range(1, total + 1) if p not in completed_pages]
+        # Chunks repeating earlier pages (or the resumed run) word for word aren't embedded again
+        doc_content_hashes = document_content_hashes(brand_slug, doc_id) if completed_pages else set()
 
         for page_number in pages_to_process:
             try:
@@ -165,6 +170,7 @@ async def process_document(
                     doc_filename=doc.original_filename,
                     page_number=page_number,
                     text=text,
+                    doc_content_hashes=doc_content_hashes,
                 )
             except GeminiQuotaExceededError as quota_error:
                 await db.rollback()
@@ -204,6 +210,15 @@ async def process_document(
                 db.add(page_obj)
                 existing_pages[page_number] = page_obj
 
+            # Structured fault-code rows for exact lookups (same commit as the page)
+            fault_rows = await replace_page_fault_codes(
+                db, doc.brand_id, doc_id, doc.original_filename, page_number, text
+            )
+            if fault_rows:
+                logger.info(f"Page {page_number}: {fault_rows} fault-code rows indexed")
+            # Equipment identifiers mentioned by the page (search routing)
+            await replace_page_identifiers(db, doc.brand_id, brand_slug, doc_id, page_number, text)
+
             processed += 1
             doc.processed_pages = processed
             await db.commit()
@@ -226,6 +241,13 @@ async def process_document(
                 _job_progress[job_id]["status"] = "processing_pages"
                 _job_progress[job_id]["updated_at"] = time.time()
 
+        if processed:
+            try:
+                # Document summary vector from the page summaries (coarse-to-fine retrieval)
+                refresh_document_summary(brand_slug, doc_id, doc.original_filename)
+            except Exception as e:
+                logger.warning(f"Document summary vector not stored for doc {doc_id}: {e}")
+
         # Final status
         if errors and processed == 0:
             doc.status = "error"
@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from config import get_settings
+from ingestion.chunk_store import delete_collection_chunks
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Process-wide clients (created lazily, closed by the app lifespan)
+_sync_client: QdrantClient | None = None
+_async_client: AsyncQdrantClient | None = None
+_client_lock = threading.Lock()
+
+# Cache: names of existing collections and aliases (None until first listed)
+_collection_registry: set[str] | None = None
+_registry_lock = threading.Lock()
+_registry_refreshed_at = 0.0
+
+# Cache: alias name → physical collection name (collections rebuilt by migrations)
+_alias_targets: dict[str, str] = {}
+
+# Cache: collection name → {"dense": set of vector names, "sparse": set of sparse vector names}
+_collection_meta: dict[str, dict] = {}
+
+# A miss may mean another process created the collection; re-list at most this often.
+REGISTRY_MISS_REFRESH_SECONDS = 30.0
+
+
+def _client_kwargs() -> dict:
+    if settings.qdrant_local_path:
+        # Embedded Qdrant (offline benchmarks): in memory or in a local directory
+        if settings.qdrant_local_path == ":memory:":
+            return {"location": ":memory:"}
+        return {"path": settings.qdrant_local_path}
+    return {
+        "host": settings.qdrant_host,
+        "port": settings.qdrant_port,
+        "grpc_port": settings.qdrant_grpc_port,
+        "prefer_grpc": settings.qdrant_prefer_grpc,
+        "timeout": settings.qdrant_timeout_seconds,
+    }
+
+
+def get_qdrant_client() -> QdrantClient:
+    """Shared sync client. Uses gRPC (port 6334) when QDRANT_PREFER_GRPC is set."""
+    global _sync_client
+    if _sync_client is None:
+        with _client_lock:
+            if _sync_client is None:
+                _sync_client = QdrantClient(**_client_kwargs())
+                logger.info(
+                    f"Qdrant client ready: {settings.qdrant_local_path or settings.qdrant_host} "
+                    f"({'local' if settings.qdrant_local_path else 'grpc' if settings.qdrant_prefer_grpc else 'http'})"
+                )
+    return _sync_client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """Shared async client for code running on the event loop (server mode only)."""
+    global _async_client
+    if settings.qdrant_local_path:
+        # A second embedded client opens its own store (":memory:") or hits the directory lock
+        raise RuntimeError("QDRANT_LOCAL_PATH: use get_qdrant_client()")
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                _async_client = AsyncQdrantClient(**_client_kwargs())
+    return _async_client
+
+
+async def close_qdrant_clients():
+    """Close both shared clients. Called on app shutdown."""
+    global _sync_client, _async_client
+    with _client_lock:
+        sync_client, async_client = _sync_client, _async_client
+        _sync_client = None
+        _async_client = None
+
+    if async_client is not None:
+        try:
+            await async_client.close()
+        except Exception as e:
+            logger.warning(f"Error closing async Qdrant client: {e}")
+    if sync_client is not None:
+        try:
+            sync_client.close()
+        except Exception as e:
+            logger.warning(f"Error closing Qdrant client: {e}")
+
+
+def _set_registry(names: set[str], aliases: dict[str, str]):
+    global _collection_registry, _alias_targets, _registry_refreshed_at
+    with _registry_lock:
+        _collection_registry = names | set(aliases)
+        _alias_targets = aliases
+        _collection_meta.clear()
+        _registry_refreshed_at = time.time()
+
+
+def refresh_collection_registry() -> set[str]:
+    """List collections and aliases from Qdrant and replace the cached registry."""
+    client = get_qdrant_client()
+    names = {c.name for c in client.get_collections().collections}
+    aliases = {a.alias_name: a.collection_name for a in client.get_aliases().aliases}
+    _set_registry(names, aliases)
+    return names | set(aliases)
+
+
+async def refresh_collection_registry_async() -> set[str]:
+    if settings.qdrant_local_path:
+        # Embedded Qdrant is only reachable through the sync client
+        registry = refresh_collection_registry()
+        logger.info(f"Qdrant collection registry loaded: {len(registry)} collections and aliases")
+        return registry
+    client = get_async_qdrant_client()
+    names = {c.name for c in (await client.get_collections()).collections}
+    aliases = {a.alias_name: a.collection_name for a in (await client.get_aliases()).aliases}
+    _set_registry(names, aliases)
+    logger.info(f"Qdrant collection registry loaded: {len(names)} collections, {len(aliases)} aliases")
+    return names | set(aliases)
+
+
+def resolve_collection_name(collection_name: str) -> str:
+    """Physical collection behind a name (aliases are used after a rebuild)."""
+    return _alias_targets.get(collection_name, collection_name)
+
+
+def get_collection_meta(collection_name: str) -> dict:
+    """
+    Vector layout of a collection, fetched once and cached:
+    {"dense": {"", ...}, "sparse": {"lexical", ...}, "sizes": {"": 768, ...}}.
+    The unnamed vector is "".
+    """
+    meta = _collection_meta.get(collection_name)
+    if meta is not None:
+        return meta
+
+    info = get_qdrant_client().get_collection(collection_name=resolve_collection_name(collection_name))
+    params = info.config.params
+    vectors = params.vectors
+    sizes = {name: v.size for name, v in vectors.items()} if isinstance(vectors, dict) else {"": vectors.size}
+    sparse = set((params.sparse_vectors or {}).keys())
+    meta = {"dense": set(sizes), "sparse": sparse, "sizes": sizes}
+    _collection_meta[collection_name] = meta
+    return meta
+
+
+def invalidate_collection_meta(collection_name: str | None = None):
+    """Forget cached vector layout (after a schema migration)."""
+    if collection_name is None:
+        _collection_meta.clear()
+    else:
+        _collection_meta.pop(collection_name, None)
+
+
+def brand_collections() -> list[str]:
+    """Brand collection names as searched (aliases, not the physical collections behind them)."""
+    names = refresh_collection_registry()
+    physical = set(_alias_targets.values())
+    return sorted(n for n in names if n.startswith("brand_") and n not in physical)
+
+
+def collection_exists(collection_name: str) -> bool:
+    """Check the cached registry; only hits Qdrant on first use or a stale miss."""
+    registry = _collection_registry
+    if registry is None:
+        registry = refresh_collection_registry()
+    if collection_name in registry:
+        return True
+    if time.time() - _registry_refreshed_at >= REGISTRY_MISS_REFRESH_SECONDS:
+        return collection_name in refresh_collection_registry()
+    return False
+
+
+def register_collection(collection_name: str, alias_of: str | None = None):
+    """Record a collection (or alias) created by this process."""
+    with _registry_lock:
+        if _collection_registry is not None:
+            _collection_registry.add(collection_name)
+        if alias_of:
+            _alias_targets[collection_name] = alias_of
+        _collection_meta.pop(collection_name, None)
+
+
+def forget_collection(collection_name: str):
+    """Drop a deleted collection from the registry."""
+    with _registry_lock:
+        if _collection_registry is not None:
+            _collection_registry.discard(collection_name)
+        _alias_targets.pop(collection_name, None)
+        _collection_meta.pop(collection_name, None)
+
+
+def delete_collection(collection_name: str):
+    """
+    Delete a collection (and the physical one behind it, for aliases), its chunk
+    store rows, and keep the registry in sync.
+    """
+    refresh_collection_registry()
+    physical_name = resolve_collection_name(collection_name)
+    get_qdrant_client().delete_collection(collection_name=physical_name)
+    delete_collection_chunks(collection_name)
+    forget_collection(physical_name)
+    forget_collection(collection_name)
+    logger.info(f"Deleted Qdrant collection: {collection_name}")
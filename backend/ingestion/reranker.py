@@ -0,0 +1,366 @@
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Awaitable, Callable
+from config import get_settings
+from ingestion.embedder import build_query_features, score_components, _normalize_for_matching
+from ingestion.gemini_vision import rerank_chunks
+from ingestion.search_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Rerank of the answer candidates (the search's top RERANK_CANDIDATES chunks),
+# selected by RERANKER:
+#   gemini: rerank_chunks — one Gemini call scoring 300-char snippets 0-10;
+#   local:  logistic model over the Phase 5 features (raw Qdrant score,
+#           identifier hit, keyword/filename bonuses), trained by
+#           scripts/train_reranker.py from logged Gemini scores. CPU, ~1 ms;
+#   hybrid: local, with Gemini only when there is no trained model yet or a
+#           pass/fail decision is within RERANKER_MIN_MARGIN of the cutoff.
+# Every strategy returns what rerank_chunks returns: the candidates scoring
+# >= RERANK_PASS_SCORE (with "rerank_score"), best first, or the first
+# RERANK_FALLBACK_TOP when none passes. Results are cached per process by
+# (strategy, query hash, chunk ids).
+RERANKER_GEMINI = "gemini"
+RERANKER_LOCAL = "local"
+RERANKER_HYBRID = "hybrid"
+
+RERANK_CANDIDATES = 10
+RERANK_PASS_SCORE = 5
+RERANK_FALLBACK_TOP = 7
+
+FEATURE_NAMES = [
+    "vector_score",
+    "lexical_fault",
+    "filename",
+    "content_keyword",
+    "identifier",
+    "identifier_hit",
+    "keyword_coverage",
+    "rank",
+    "gap_to_top",
+]
+
+_lock = threading.Lock()
+_cache: OrderedDict[tuple, tuple[float, list[tuple[int, float | None]]]] = OrderedDict()
+_stats = {"calls": 0, "cache_hits": 0, "local": 0, "gemini": 0, "gemini_low_margin": 0, "gemini_no_model": 0}
+_model_state: dict = {"path": None, "mtime": None, "model": None}
+
+
+# ── Features ────────────────────────────────────────────────────────────────
+
+def chunk_features(query: str, chunks: list[dict]) -> list[dict[str, float]]:
+    """
+    Reranker features of each candidate, in search order. vector_score is the
+    raw Qdrant score carried by search results (0 for fault-code rows); the
+    signal bonus is left out, results don't carry the payload signals.
+    """
+    qf = build_query_features(query)
+    keywords = [k for k in qf.key_tokens if k]
+    top_score = chunks[0].get("score", 0.0) if chunks else 0.0
+    rows = []
+    for rank, chunk in enumerate(chunks):
+        text = chunk.get("text", "") or ""
+        components, has_identifier_hit = score_components({"text": text, "doc_filename": chunk.get("source", "")}, qf)
+        components.pop("signal", None)
+        normalized = _normalize_for_matching(text)
+        score = chunk.get("score", 0.0)
+        rows.append({
+            "vector_score": chunk.get("vector_score", 0.0),
+            **components,
+            "identifier_hit": 1.0 if has_identifier_hit else 0.0,
+            "keyword_coverage": sum(1 for k in keywords if k in normalized) / len(keywords) if keywords else 0.0,
+            "rank": 1.0 / (1 + rank),
+            "gap_to_top": top_score - score,
+        })
+    return rows
+
+
+# ── Model ───────────────────────────────────────────────────────────────────
+
+@dataclass
+class RerankModel:
+    """Logistic regression over standardized FEATURE_NAMES; probability = relevance."""
+    feature_names: list[str]
+    weights: list[float]
+    bias: float
+    mean: list[float]
+    scale: list[float]
+    samples: int = 0
+    trained_at: str = ""
+
+    def probability(self, features: dict[str, float]) -> float:
+        z = self.bias
+        for name, weight, mean, scale in zip(self.feature_names, self.weights, self.mean, self.scale):
+            z += weight * (features.get(name, 0.0) - mean) / scale
+        return 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+
+
+def train_model(rows: list[tuple[dict[str, float], float]], epochs: int = 400, learning_rate: float = 0.5, l2: float = 1e-3) -> RerankModel:
+    """Fit on (features, target in [0, 1]) pairs by batch gradient descent on the log loss."""
+    n = len(rows)
+    columns = [[features.get(name, 0.0) for features, _ in rows] for name in FEATURE_NAMES]
+    mean = [sum(column) / n for column in columns]
+    scale = [
+        math.sqrt(sum((x - m) ** 2 for x in column) / n) or 1.0
+        for column, m in zip(columns, mean)
+    ]
+    x = [[(column[i] - m) / s for column, m, s in zip(columns, mean, scale)] for i in range(n)]
+    y = [target for _, target in rows]
+
+    weights = [0.0] * len(FEATURE_NAMES)
+    bias = 0.0
+    for _ in range(epochs):
+        grad_w = [0.0] * len(weights)
+        grad_b = 0.0
+        for xi, yi in zip(x, y):
+            z = bias + sum(w * v for w, v in zip(weights, xi))
+            error = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z)))) - yi
+            grad_b += error
+            for j, v in enumerate(xi):
+                grad_w[j] += error * v
+        bias -= learning_rate * grad_b / n
+        weights = [w - learning_rate * (g / n + l2 * w) for w, g in zip(weights, grad_w)]
+
+    return RerankModel(
+        feature_names=list(FEATURE_NAMES),
+        weights=weights,
+        bias=bias,
+        mean=mean,
+        scale=scale,
+        samples=n,
+        trained_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+    )
+
+
+def save_model(model: RerankModel, path: str | None = None):
+    target = Path(path or settings.reranker_model_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(json.dumps(asdict(model), indent=2), encoding="utf-8")
+    tmp.replace(target)
+
+
+def load_model() -> RerankModel | None:
+    """The trained model, reloaded when its file changes (None until one is trained)."""
+    path = Path(settings.reranker_model_path)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    with _lock:
+        if _model_state["path"] == str(path) and _model_state["mtime"] == mtime:
+            return _model_state["model"]
+    try:
+        model = RerankModel(**json.loads(path.read_text(encoding="utf-8")))
+    except Exception as e:
+        logger.warning(f"Reranker model unreadable ({path}): {e}")
+        model = None
+    if model is not None and model.feature_names != FEATURE_NAMES:
+        logger.warning(f"Reranker model {path} was trained on other features, retrain with scripts/train_reranker.py")
+        model = None
+    with _lock:
+        _model_state.update(path=str(path), mtime=mtime, model=model)
+    return model
+
+
+# ── Labels ──────────────────────────────────────────────────────────────────
+
+def log_rerank_labels(query: str, chunks: list[dict], scores: list[float | None], source: str):
+    """Append (features, 0-10 score) of the scored candidates for scripts/train_reranker.py."""
+    if not settings.rerank_labels_path or not any(score is not None for score in scores):
+        return
+    row = {
+        "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+        "query": query,
+        "candidates": [
+            {"features": features, "score": score}
+            for features, score in zip(chunk_features(query, chunks), scores)
+            if score is not None
+        ],
+    }
+    try:
+        path = Path(settings.rerank_labels_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with _lock, path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning(f"Could not log rerank labels: {e}")
+
+
+# ── Strategies ──────────────────────────────────────────────────────────────
+
+def _count(key: str):
+    with _lock:
+        _stats[key] += 1
+
+
+def _select(candidates: list[dict], probabilities: list[float]) -> list[dict]:
+    for chunk, probability in zip(candidates, probabilities):
+        chunk["rerank_score"] = round(10 * probability, 2)
+    passed = [c for c in candidates if c["rerank_score"] >= RERANK_PASS_SCORE]
+    if not passed:
+        return candidates[:RERANK_FALLBACK_TOP]
+    return sorted(passed, key=lambda c: c["rerank_score"], reverse=True)
+
+
+def _local_probabilities(query: str, candidates: list[dict]) -> list[float] | None:
+    model = load_model()
+    if model is None:
+        return None
+    return [model.probability(features) for features in chunk_features(query, candidates)]
+
+
+def rerank_margin(probabilities: list[float]) -> float:
+    """
+    How far the local model is from its closest pass/fail decision among the
+    top RERANK_FALLBACK_TOP (probability units). Negative when nothing passes.
+    """
+    top = sorted(probabilities, reverse=True)[:RERANK_FALLBACK_TOP]
+    if not top or top[0] < 0.5:
+        return (top[0] - 0.5) if top else -0.5
+    return min(abs(p - 0.5) for p in top)
+
+
+async def gemini_rerank(query: str, candidates: list[dict]) -> list[dict]:
+    for chunk in candidates:
+        chunk.pop("rerank_score", None)
+    result = await rerank_chunks(query, candidates)
+    _count("gemini")
+    log_rerank_labels(query, candidates, [c.get("rerank_score") for c in candidates], RERANKER_GEMINI)
+    return result
+
+
+async def local_rerank(query: str, candidates: list[dict]) -> list[dict]:
+    probabilities = _local_probabilities(query, candidates)
+    if probabilities is None:
+        logger.warning("Local reranker: no trained model (scripts/train_reranker.py), keeping search order")
+        return candidates[:RERANK_FALLBACK_TOP]
+    _count("local")
+    return _select(candidates, probabilities)
+
+
+async def hybrid_rerank(query: str, candidates: list[dict]) -> list[dict]:
+    probabilities = _local_probabilities(query, candidates)
+    if probabilities is None:
+        _count("gemini_no_model")
+        return await gemini_rerank(query, candidates)
+    margin = rerank_margin(probabilities)
+    if margin < settings.reranker_min_margin:
+        logger.info(f"Rerank: local margin {margin:.3f} < {settings.reranker_min_margin}, asking Gemini")
+        _count("gemini_low_margin")
+        return await gemini_rerank(query, candidates)
+    _count("local")
+    return _select(candidates, probabilities)
+
+
+RERANKERS: dict[str, Callable[[str, list[dict]], Awaitable[list[dict]]]] = {
+    RERANKER_GEMINI: gemini_rerank,
+    RERANKER_LOCAL: local_rerank,
+    RERANKER_HYBRID: hybrid_rerank,
+}
+
+
+def get_reranker(name: str | None = None) -> Callable[[str, list[dict]], Awaitable[list[dict]]]:
+    name = (name or settings.reranker or RERANKER_GEMINI).strip().lower()
+    reranker = RERANKERS.get(name)
+    if reranker is None:
+        raise RuntimeError(f"RERANKER inválido: {name}. Use {' ou '.join(RERANKERS)}")
+    return reranker
+
+
+# ── Cache + entry point ─────────────────────────────────────────────────────
+
+def _chunk_id(chunk: dict) -> str:
+    key = f"{chunk.get('doc_id')}|{chunk.get('page')}|{chunk.get('text', '')}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _model_version() -> float | None:
+    """Model file mtime: a retrained model gets new cache keys."""
+    try:
+        return Path(settings.reranker_model_path).stat().st_mtime
+    except OSError:
+        return None
+
+
+def _cache_key(strategy: str, query: str, candidates: list[dict]) -> tuple:
+    query_hash = hashlib.blake2b(normalize_query(query).encode("utf-8"), digest_size=12).hexdigest()
+    return (strategy, _model_version(), query_hash, tuple(_chunk_id(c) for c in candidates))
+
+
+def _get_cached(key: tuple) -> list[tuple[int, float | None]] | None:
+    if settings.rerank_cache_max_entries <= 0:
+        return None
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        stored_at, order = entry
+        if time.time() - stored_at > settings.rerank_cache_ttl_seconds:
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        _stats["cache_hits"] += 1
+    return order
+
+
+def _put_cached(key: tuple, order: list[tuple[int, float | None]]):
+    if settings.rerank_cache_max_entries <= 0:
+        return
+    with _lock:
+        _cache[key] = (time.time(), order)
+        _cache.move_to_end(key)
+        while len(_cache) > settings.rerank_cache_max_entries:
+            _cache.popitem(last=False)
+
+
+async def rerank(query: str, chunks: list[dict], strategy: str | None = None) -> list[dict]:
+    """Rerank the answer candidates with the configured strategy (see module comment)."""
+    candidates = chunks[:RERANK_CANDIDATES]
+    if not candidates:
+        return []
+    strategy = (strategy or settings.reranker or RERANKER_GEMINI).strip().lower()
+    _count("calls")
+
+    key = _cache_key(strategy, query, candidates)
+    order = _get_cached(key)
+    if order is not None:
+        result = []
+        for index, score in order:
+            if score is not None:
+                candidates[index]["rerank_score"] = score
+            result.append(candidates[index])
+        return result
+
+    result = await get_reranker(strategy)(query, candidates)
+    if not any(c.get("rerank_score") is not None for c in result):
+        # Fallback order (Gemini error, no trained model): not a ranking worth keeping
+        return result
+    positions = {id(chunk): index for index, chunk in enumerate(candidates)}
+    _put_cached(key, [(positions[id(c)], c.get("rerank_score")) for c in result if id(c) in positions])
+    return result
+
+
+def reranker_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["cache_entries"] = len(_cache)
+    model = load_model()
+    stats["strategy"] = settings.reranker
+    stats["min_margin"] = settings.reranker_min_margin
+    stats["model"] = {"samples": model.samples, "trained_at": model.trained_at} if model else None
+    return stats
+
+
+def clear_rerank_cache():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,169 @@
+import re
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from sqlalchemy import delete
+from models import DocumentIdentifier
+from ingestion.page_index import pooled_connection
+from ingestion.doc_catalog import get_brand_documents, catalog_version
+
+logger = logging.getLogger(__name__)
+
+# Equipment routing: identifier (GECB, LCB2, BAA21000S...) → documents that mention
+# it, with weights. Page-level mentions are stored in doc_identifiers at ingest;
+# the per-brand weighted index is built from them in memory and rebuilt when this
+# process indexes pages, the brand's documents change, or after ROUTING_INDEX_TTL
+# (pages indexed by scripts in another process).
+ROUTING_INDEX_TTL = 300
+# An identifier mentioned by more documents than this isn't selective enough to route
+ROUTE_MAX_TOKEN_DOCS = 12
+ROUTE_MAX_TOKEN_DOC_FRACTION = 0.15
+# Routed documents: score >= ROUTE_MIN_RELATIVE × best, at most ROUTE_MAX_DOCS
+ROUTE_MIN_RELATIVE = 0.35
+ROUTE_MAX_DOCS = 8
+# A filename mention counts like this many page mentions
+FILENAME_MENTION_PAGES = 5
+
+IGNORED_TOKENS = {
+    "HTTP", "HTTPS", "PAGE", "PDF", "NOTA", "AVISO", "PARA", "COM", "DOS", "DAS", "NAO",
+    "SIM", "FIG", "TABELA", "PAG", "OBS", "THE", "AND",
+}
+# Boards and controllers without digits (GECB, GDCB, TCBC...) as written in manuals: all caps
+ACRONYM_PATTERN = re.compile(r"\b[A-Z]{3,6}\b")
+
+_indexes: dict[str, tuple[tuple, float, "RoutingIndex"]] = {}
+_local_versions: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def identifier_counts(text: str) -> Counter:
+    """
+    Identifier mentions in a text: the chunk-signal tokens (controller codes and
+    model/version markers) plus all-caps acronyms.
+    """
+    from ingestion.embedder import CONTROLLER_CODE_PATTERN, MODEL_VERSION_PATTERN
+
+    text = text or ""
+    counts: Counter = Counter(
+        token for token in CONTROLLER_CODE_PATTERN.findall(text.upper())
+        if len(token) >= 3 and token not in IGNORED_TOKENS
+    )
+    counts.update(match.group(0).upper().replace(" ", "") for match in MODEL_VERSION_PATTERN.finditer(text))
+    counts.update(token for token in ACRONYM_PATTERN.findall(text) if token not in IGNORED_TOKENS)
+    return counts
+
+
+async def replace_page_identifiers(db, brand_id: int, brand_slug: str, doc_id: int, page_number: int, text: str) -> int:
+    """Re-index the identifiers of one page (added to the session; caller commits)."""
+    await db.execute(
+        delete(DocumentIdentifier).where(
+            DocumentIdentifier.document_id == doc_id, DocumentIdentifier.page_number == page_number
+        )
+    )
+    counts = identifier_counts(text)
+    for token, count in counts.items():
+        db.add(DocumentIdentifier(
+            brand_id=brand_id,
+            document_id=doc_id,
+            page_number=page_number,
+            token=token[:40],
+            count=count,
+        ))
+    with _lock:
+        _local_versions[brand_slug] = _local_versions.get(brand_slug, 0) + 1
+    return len(counts)
+
+
+class RoutingIndex:
+    """token → {doc_id: weight}; weight = log-scaled mentions × idf across the brand's documents."""
+
+    def __init__(self, page_mentions: dict[str, dict[int, int]], filenames: dict[int, str]):
+        mentions: dict[str, dict[int, float]] = {t: dict(docs) for t, docs in page_mentions.items()}
+        for doc_id, filename in filenames.items():
+            for token in identifier_counts(filename):
+                docs = mentions.setdefault(token, {})
+                docs[doc_id] = docs.get(doc_id, 0) + FILENAME_MENTION_PAGES
+
+        doc_total = max(len(filenames), len({d for docs in mentions.values() for d in docs}), 1)
+        self.doc_total = doc_total
+        self.postings: dict[str, dict[int, float]] = {}
+        for token, docs in mentions.items():
+            idf = math.log(1 + doc_total / len(docs))
+            self.postings[token] = {doc_id: math.log1p(pages) * idf for doc_id, pages in docs.items()}
+
+    def is_selective(self, token: str) -> bool:
+        docs = self.postings.get(token)
+        if not docs:
+            return False
+        return len(docs) <= max(ROUTE_MAX_TOKEN_DOCS, ROUTE_MAX_TOKEN_DOC_FRACTION * self.doc_total)
+
+    def route(self, identifiers: list[str]) -> dict[int, float]:
+        """Likely documents for the query identifiers (empty when none is selective)."""
+        scores: dict[int, float] = {}
+        for token in dict.fromkeys(identifiers):
+            if not self.is_selective(token):
+                continue
+            docs = self.postings[token]
+            best = max(docs.values())
+            # Each identifier contributes at most 1.0, so several identifiers intersect
+            for doc_id, weight in docs.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight / best
+        if not scores:
+            return {}
+        top = max(scores.values())
+        ranked = sorted(
+            ((doc_id, score) for doc_id, score in scores.items() if score >= ROUTE_MIN_RELATIVE * top),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        return dict(ranked[:ROUTE_MAX_DOCS])
+
+
+def _load_page_mentions(brand_slug: str) -> dict[str, dict[int, int]]:
+    try:
+        with pooled_connection() as conn:
+            rows = conn.execute(
+                """
+                SELECT di.token, di.document_id, COUNT(DISTINCT di.page_number)
+                FROM doc_identifiers di
+                JOIN brands b ON b.id = di.brand_id
+                WHERE b.slug = ?
+                GROUP BY di.token, di.document_id
+                """,
+                (brand_slug,),
+            ).fetchall()
+    except sqlite3.OperationalError as e:
+        # Database created before the doc_identifiers table (init_db creates it)
+        logger.warning(f"Routing index unavailable: {e}")
+        return {}
+
+    mentions: dict[str, dict[int, int]] = {}
+    for token, doc_id, pages in rows:
+        mentions.setdefault(token, {})[doc_id] = pages
+    return mentions
+
+
+def get_routing_index(brand_slug: str) -> RoutingIndex:
+    version = (catalog_version(brand_slug), _local_versions.get(brand_slug, 0))
+    cached = _indexes.get(brand_slug)
+    if cached and cached[0] == version and time.time() - cached[1] < ROUTING_INDEX_TTL:
+        return cached[2]
+
+    with _lock:
+        cached = _indexes.get(brand_slug)
+        if cached and cached[0] == version and time.time() - cached[1] < ROUTING_INDEX_TTL:
+            return cached[2]
+        index = RoutingIndex(_load_page_mentions(brand_slug), get_brand_documents(brand_slug))
+        _indexes[brand_slug] = (version, time.time(), index)
+        logger.info(f"Routing index for {brand_slug}: {len(index.postings)} identifiers")
+        return index
+
+
+def route_documents(brand_slug: str, identifiers: list[str]) -> dict[int, float]:
+    """doc_id → routing score for the documents a query's identifiers point to."""
+    if not identifiers:
+        return {}
+    return get_routing_index(brand_slug).route(identifiers)
@@ -0,0 +1,96 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from config import get_settings
+
+settings = get_settings()
+
+# LRU + TTL cache of search_brand() results.
+# Entries are keyed by the collection's data version, so upsert_page /
+# delete_document_vectors (which bump it) make older entries unreachable;
+# they then age out of the LRU. Other processes (scripts) writing to Qdrant
+# don't bump this process's counters — the TTL bounds that staleness.
+_entries: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+_versions: dict[str, int] = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+
+def normalize_query(query: str) -> str:
+    """Whitespace-normalized query. Case is kept: keyword extraction is case-sensitive."""
+    return re.sub(r"\s+", " ", (query or "").strip())
+
+
+def collection_version(collection_name: str) -> int:
+    return _versions.get(collection_name, 0)
+
+
+def bump_collection_version(collection_name: str):
+    """Invalidate cached results for a collection (its points changed)."""
+    with _lock:
+        _versions[collection_name] = _versions.get(collection_name, 0) + 1
+        _stats["invalidations"] += 1
+
+
+def _key(collection_name: str, version: int, query: str, top_k: int) -> tuple:
+    return (collection_name, version, normalize_query(query), top_k)
+
+
+def _copy(chunks: list[dict]) -> list[dict]:
+    # Callers append to and mutate the result list/dicts; chunk values are scalars
+    return [dict(chunk) for chunk in chunks]
+
+
+def get_cached(collection_name: str, query: str, top_k: int) -> list[dict] | None:
+    if settings.search_cache_max_entries <= 0:
+        return None
+
+    key = _key(collection_name, collection_version(collection_name), query, top_k)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        stored_at, chunks = entry
+        if time.time() - stored_at > settings.search_cache_ttl_seconds:
+            del _entries[key]
+            _stats["expired"] += 1
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(key)
+        _stats["hits"] += 1
+    return _copy(chunks)
+
+
+def put_cached(collection_name: str, version: int, query: str, top_k: int, chunks: list[dict]):
+    """
+    Store results under the version read *before* searching, so a write that
+    lands mid-search leaves them under the outdated version.
+    """
+    if settings.search_cache_max_entries <= 0:
+        return
+
+    key = _key(collection_name, version, query, top_k)
+    with _lock:
+        _entries[key] = (time.time(), _copy(chunks))
+        _entries.move_to_end(key)
+        while len(_entries) > settings.search_cache_max_entries:
+            _entries.popitem(last=False)
+            _stats["evictions"] += 1
+
+
+def clear_search_cache():
+    with _lock:
+        _entries.clear()
+
+
+def search_cache_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["max_entries"] = settings.search_cache_max_entries
+    stats["ttl_seconds"] = settings.search_cache_ttl_seconds
+    return stats
@@ -0,0 +1,76 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Per-process counters of what each search phase costs and contributes.
+# "candidates": hits a phase added to the pool (first finder wins);
+# "in_top_k": of those, how many made the returned top-k.
+PHASES = ("routed", "coarse", "dense", "signal", "filename", "keyword_db", "multi_query")
+
+_lock = threading.Lock()
+_searches = {"total": 0, "recall_phases_run": 0, "recall_phases_skipped": 0}
+_phase_stats = {phase: {"candidates": 0, "in_top_k": 0} for phase in PHASES}
+_timings_ms: dict[str, float] = {}
+_reasons: dict[str, int] = {}
+
+
+def record_search(reason: str, ran_recall_phases: bool, candidates: dict[str, int], top_chunks: list[dict], timings: dict[str, float]):
+    """Account one uncached search: planner decision, per-phase yield and timings (seconds)."""
+    in_top_k: dict[str, int] = {}
+    for chunk in top_chunks:
+        phase = chunk.get("phase", "")
+        if phase:
+            in_top_k[phase] = in_top_k.get(phase, 0) + 1
+
+    with _lock:
+        _searches["total"] += 1
+        _searches["recall_phases_run" if ran_recall_phases else "recall_phases_skipped"] += 1
+        reason_key = reason.split(":", 1)[0] if ran_recall_phases else reason
+        _reasons[reason_key] = _reasons.get(reason_key, 0) + 1
+        for phase in set(candidates) | set(in_top_k):
+            stats = _phase_stats.setdefault(phase, {"candidates": 0, "in_top_k": 0})
+            stats["candidates"] += candidates.get(phase, 0)
+            stats["in_top_k"] += in_top_k.get(phase, 0)
+        for step, seconds in timings.items():
+            _timings_ms[step] = _timings_ms.get(step, 0.0) + seconds * 1000
+
+    logger.info(
+        f"Search plan: {'full' if ran_recall_phases else 'phase1_only'} ({reason}) | "
+        f"candidates={candidates} | top_k={in_top_k} | "
+        f"ms={ {step: round(s * 1000, 1) for step, s in timings.items()} }"
+    )
+
+
+def get_search_stats() -> dict:
+    with _lock:
+        total = _searches["total"]
+        phases = {}
+        for phase, stats in _phase_stats.items():
+            phases[phase] = {
+                **stats,
+                "top_k_rate": round(stats["in_top_k"] / stats["candidates"], 3) if stats["candidates"] else 0.0,
+            }
+        return {
+            **_searches,
+            "skip_rate": round(_searches["recall_phases_skipped"] / total, 3) if total else 0.0,
+            "reasons": dict(_reasons),
+            "phases": phases,
+            # Phase 2-4 timings are averaged over the searches that ran them
+            "avg_ms": {
+                step: round(ms / (_searches["recall_phases_run"] if step == "phases2_4" else total), 1)
+                for step, ms in _timings_ms.items()
+                if (_searches["recall_phases_run"] if step == "phases2_4" else total)
+            },
+        }
+
+
+def reset_search_stats():
+    with _lock:
+        for key in _searches:
+            _searches[key] = 0
+        for stats in _phase_stats.values():
+            stats["candidates"] = 0
+            stats["in_top_k"] = 0
+        _timings_ms.clear()
+        _reasons.clear()
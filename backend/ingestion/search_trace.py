@@ -0,0 +1,76 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Explain mode for search_brand: while a trace is active (search_trace()), the
+# pipeline records the wall time of each embedding / Qdrant / SQLite call, and
+# each query's plan and scored candidates. Inactive traces cost one ContextVar
+# lookup per call. Work submitted to thread pools must run in a copy of the
+# caller's context (submit_traced) to be recorded.
+
+_current: contextvars.ContextVar["SearchTrace | None"] = contextvars.ContextVar("search_trace", default=None)
+
+
+class SearchTrace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.calls: list[dict] = []
+        self.queries: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def add_call(self, kind: str, name: str, started: float, seconds: float, **info):
+        with self._lock:
+            self.calls.append({
+                "kind": kind,
+                "name": name,
+                "start_ms": round((started - self.started) * 1000, 1),
+                "ms": round(seconds * 1000, 1),
+                "thread": threading.current_thread().name,
+                **info,
+            })
+
+    def report(self) -> dict:
+        calls = sorted(self.calls, key=lambda call: call["start_ms"])
+        by_kind: dict[str, dict] = {}
+        for call in calls:
+            totals = by_kind.setdefault(call["kind"], {"calls": 0, "ms": 0.0})
+            totals["calls"] += 1
+            totals["ms"] = round(totals["ms"] + call["ms"], 1)
+        return {"calls": calls, "calls_by_kind": by_kind, "queries": self.queries}
+
+
+def current_trace() -> SearchTrace | None:
+    return _current.get()
+
+
+@contextmanager
+def search_trace():
+    """Activate a trace for the searches run inside the block."""
+    trace = SearchTrace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def traced(kind: str, name: str, **info):
+    """Time one external call ("embedding", "qdrant", "sqlite"...) if a trace is active."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_call(kind, name, started, time.perf_counter() - started, **info)
+
+
+def submit_traced(executor, fn, *args):
+    """executor.submit that keeps the active trace (if any) in the worker thread."""
+    if _current.get() is None:
+        return executor.submit(fn, *args)
+    return executor.submit(contextvars.copy_context().run, fn, *args)
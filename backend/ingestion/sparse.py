@@ -0,0 +1,82 @@
+import re
+import math
+import zlib
+import unicodedata
+from collections import Counter
+from qdrant_client.models import SparseVector
+
+# Named sparse vector holding local BM25 term weights. IDF is applied by Qdrant
+# (SparseVectorParams(modifier=Modifier.IDF)), so only the TF part is computed here.
+SPARSE_VECTOR_NAME = "lexical"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical chunk length in tokens; stands in for the corpus average in BM25 length normalization.
+BM25_AVG_DOC_TOKENS = 220
+
+STOPWORDS = {
+    "de", "do", "da", "dos", "das", "um", "uma", "o", "a", "os", "as", "e", "ou",
+    "em", "no", "na", "nos", "nas", "com", "para", "por", "se", "que", "ao", "aos",
+    "the", "of", "and", "el", "la", "los", "las", "y",
+}
+
+
+def _fold(text: str) -> str:
+    t = unicodedata.normalize("NFD", (text or "").lower())
+    return "".join(c for c in t if unicodedata.category(c) != "Mn")
+
+
+def lexical_terms(text: str) -> list[str]:
+    """
+    Tokens for lexical matching (with repetitions, for TF):
+    accent-folded alphanumeric words, plus joined forms of split codes
+    so "XO 508" / "C.07.10" also index "xo508" / "c0710".
+    """
+    raw = re.findall(r"[a-z0-9]+", _fold(text))
+    terms = [t for t in raw if t not in STOPWORDS and (len(t) >= 2 or t.isdigit())]
+
+    # Join runs of short pieces that together form a code (letters + digits)
+    for size in (2, 3):
+        for i in range(len(raw) - size + 1):
+            parts = raw[i:i + size]
+            if any(len(p) > 5 or p in STOPWORDS for p in parts):
+                continue
+            if any(p.isdigit() for p in parts) and any(p.isalpha() for p in parts):
+                terms.append("".join(parts))
+    return terms
+
+
+def term_index(term: str) -> int:
+    """Stable hashed vocabulary: no vocabulary file to keep in sync across processes."""
+    return zlib.crc32(term.encode("utf-8")) & 0x7FFFFFFF
+
+
+def _to_sparse(weights: dict[int, float]) -> SparseVector:
+    indices = sorted(weights)
+    return SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+def document_sparse_vector(text: str) -> SparseVector:
+    """BM25 term-frequency weights for a chunk (IDF is applied server-side)."""
+    terms = lexical_terms(text)
+    if not terms:
+        return SparseVector(indices=[], values=[])
+
+    doc_len = len(terms)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_len / BM25_AVG_DOC_TOKENS)
+    weights: dict[int, float] = {}
+    for term, tf in Counter(terms).items():
+        idx = term_index(term)
+        weight = tf * (BM25_K1 + 1) / (tf + norm)
+        weights[idx] = weights.get(idx, 0.0) + weight
+    return _to_sparse(weights)
+
+
+def query_sparse_vector(query: str) -> SparseVector:
+    """Unit weight per distinct query term; Qdrant multiplies by IDF."""
+    weights = {term_index(term): 1.0 for term in set(lexical_terms(query))}
+    return _to_sparse(weights)
+
+
+def is_empty(vector: SparseVector) -> bool:
+    return not vector.indices or math.isclose(sum(vector.values), 0.0)
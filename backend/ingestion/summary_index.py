@@ -0,0 +1,183 @@
+import math
+import uuid
+import logging
+from qdrant_client.models import (
+    Distance,
+    VectorParams,
+    PointStruct,
+    Filter,
+    FieldCondition,
+    MatchValue,
+    PayloadSchemaType,
+    QueryRequest,
+)
+from config import get_settings
+from ingestion.qdrant_pool import get_qdrant_client, collection_exists, register_collection
+from ingestion.collection_profiles import search_params
+from ingestion.search_cache import bump_collection_version
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Coarse retrieval level: one vector per page (mean of its chunk embeddings) and
+# one per document (mean of its page vectors), in a small per-brand collection
+# next to the chunk collection. Searching it first picks the documents whose
+# chunks the fine search is restricted to.
+SUMMARY_KIND_PAGE = "page"
+SUMMARY_KIND_DOC = "doc"
+# Stable point ids, so re-ingesting a page/document overwrites its summary
+_SUMMARY_NAMESPACE = uuid.UUID("6f1c2a4e-5b7d-4c1e-9a3f-2d8e0b7c4a91")
+
+
+def summary_collection_name(brand_slug: str) -> str:
+    # Not "brand_…": brand_collections() and the chunk migrations must not pick it up
+    return f"summary_{brand_slug}"
+
+
+def _point_id(kind: str, doc_id: int, page_number: int = 0) -> str:
+    return str(uuid.uuid5(_SUMMARY_NAMESPACE, f"{kind}:{doc_id}:{page_number}"))
+
+
+def mean_vector(vectors: list[list[float]]) -> list[float] | None:
+    """Normalized mean of unit vectors (a centroid usable with cosine distance)."""
+    vectors = [v for v in vectors if v]
+    if not vectors:
+        return None
+    size = len(vectors[0])
+    total = [0.0] * size
+    for vector in vectors:
+        for i, value in enumerate(vector):
+            total[i] += value
+    norm = math.sqrt(sum(x * x for x in total)) or 1.0
+    return [x / norm for x in total]
+
+
+def ensure_summary_collection(brand_slug: str) -> str:
+    collection_name = summary_collection_name(brand_slug)
+    if not collection_exists(collection_name):
+        client = get_qdrant_client()
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=settings.embedding_vector_size, distance=Distance.COSINE),
+        )
+        for field_name, schema in (("doc_id", PayloadSchemaType.INTEGER), ("kind", PayloadSchemaType.KEYWORD)):
+            client.create_payload_index(
+                collection_name=collection_name, field_name=field_name, field_schema=schema, wait=True
+            )
+        register_collection(collection_name)
+        logger.info(f"Created Qdrant collection: {collection_name}")
+    return collection_name
+
+
+def upsert_page_summary(brand_slug: str, doc_id: int, doc_filename: str, page_number: int, chunk_vectors: list[list[float]]):
+    """Store the page's summary vector (centroid of its chunk embeddings)."""
+    vector = mean_vector(chunk_vectors)
+    if vector is None:
+        return
+    get_qdrant_client().upsert(
+        collection_name=ensure_summary_collection(brand_slug),
+        points=[PointStruct(
+            id=_point_id(SUMMARY_KIND_PAGE, doc_id, page_number),
+            vector=vector,
+            payload={
+                "kind": SUMMARY_KIND_PAGE,
+                "doc_id": doc_id,
+                "doc_filename": doc_filename,
+                "page_number": page_number,
+            },
+        )],
+    )
+
+
+def refresh_document_summary(brand_slug: str, doc_id: int, doc_filename: str = "") -> int:
+    """Recompute the document vector from its page vectors. Returns the page count."""
+    collection_name = summary_collection_name(brand_slug)
+    if not collection_exists(collection_name):
+        return 0
+    client = get_qdrant_client()
+    page_filter = Filter(must=[
+        FieldCondition(key="doc_id", match=MatchValue(value=doc_id)),
+        FieldCondition(key="kind", match=MatchValue(value=SUMMARY_KIND_PAGE)),
+    ])
+
+    vectors: list[list[float]] = []
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=page_filter,
+            limit=256,
+            offset=next_offset,
+            with_payload=["doc_filename"],
+            with_vectors=True,
+        )
+        for point in points:
+            vectors.append(point.vector)
+            doc_filename = doc_filename or (point.payload or {}).get("doc_filename", "")
+        if not next_offset or not points:
+            break
+
+    vector = mean_vector(vectors)
+    if vector is None:
+        return 0
+    client.upsert(
+        collection_name=collection_name,
+        points=[PointStruct(
+            id=_point_id(SUMMARY_KIND_DOC, doc_id),
+            vector=vector,
+            payload={
+                "kind": SUMMARY_KIND_DOC,
+                "doc_id": doc_id,
+                "doc_filename": doc_filename,
+                "page_count": len(vectors),
+            },
+        )],
+    )
+    bump_collection_version(f"brand_{brand_slug}")
+    return len(vectors)
+
+
+def delete_document_summaries(brand_slug: str, doc_id: int):
+    collection_name = summary_collection_name(brand_slug)
+    if not collection_exists(collection_name):
+        return
+    get_qdrant_client().delete(
+        collection_name=collection_name,
+        points_selector=Filter(must=[FieldCondition(key="doc_id", match=MatchValue(value=doc_id))]),
+    )
+
+
+def coarse_documents(brand_slug: str, query_vector: list[float], top_docs: int) -> dict[int, float]:
+    """
+    Coarse step: the documents whose document or page summaries are closest to the
+    query (one batched Qdrant call). doc_id → best summary score, best first.
+    """
+    collection_name = summary_collection_name(brand_slug)
+    if not collection_exists(collection_name):
+        return {}
+
+    def kind_request(kind: str, limit: int) -> QueryRequest:
+        return QueryRequest(
+            query=query_vector,
+            filter=Filter(must=[FieldCondition(key="kind", match=MatchValue(value=kind))]),
+            limit=limit,
+            with_payload=["doc_id"],
+            params=search_params(),
+        )
+
+    try:
+        doc_hits, page_hits = get_qdrant_client().query_batch_points(
+            collection_name=collection_name,
+            requests=[kind_request(SUMMARY_KIND_DOC, top_docs), kind_request(SUMMARY_KIND_PAGE, top_docs * 3)],
+        )
+    except Exception as e:
+        logger.warning(f"Coarse summary search failed: {e}")
+        return {}
+
+    scores: dict[int, float] = {}
+    for hit in [*doc_hits.points, *page_hits.points]:
+        doc_id = (hit.payload or {}).get("doc_id")
+        if doc_id is not None and hit.score > scores.get(doc_id, -1.0):
+            scores[doc_id] = hit.score
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return dict(ranked[:top_docs])
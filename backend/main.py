@@ -4,6 +4,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from database import init_db
+from ingestion.qdrant_pool import refresh_collection_registry_async, close_qdrant_clients
 from routes.auth_routes import router as auth_router
 from routes.admin_routes import router as admin_router
 from routes.chat_routes import router as chat_router
@@ -20,9 +21,15 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     await init_db()
-    logger.info("Database ready. Server starting.")
+    logger.info("Database ready. Connecting to Qdrant...")
+    try:
+        await refresh_collection_registry_async()
+    except Exception as e:
+        logger.warning(f"Qdrant not reachable at startup, registry will load lazily: {e}")
+    logger.info("Server starting.")
     yield
     logger.info("Server shutting down.")
+    await close_qdrant_clients()
 
 
 app = FastAPI(
@@ -63,6 +63,8 @@ class Document(Base):
 
     brand = relationship("Brand", back_populates="documents")
     pages = relationship("Page", back_populates="document", cascade="all, delete")
+    fault_codes = relationship("FaultCode", back_populates="document", cascade="all, delete")
+    identifiers = relationship("DocumentIdentifier", back_populates="document", cascade="all, delete")
 
 
 class Page(Base):
@@ -79,6 +81,36 @@ class Page(Base):
     document = relationship("Document", back_populates="pages")
 
 
+class FaultCode(Base):
+    __tablename__ = "fault_codes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    page_number = Column(Integer, nullable=False)
+    code = Column(String(20), nullable=False, index=True)  # normalizado: "UV1", "E10", "100"
+    model_tokens = Column(String(500), nullable=True)  # ex: "OVF20 GEN2" (arquivo + página)
+    description = Column(Text, nullable=True)
+    cause = Column(Text, nullable=True)
+    action = Column(Text, nullable=True)
+    row_text = Column(Text, nullable=False)  # linha(s) original(is) da tabela, preenchido na ingestão
+
+    document = relationship("Document", back_populates="fault_codes")
+
+
+class DocumentIdentifier(Base):
+    __tablename__ = "doc_identifiers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    page_number = Column(Integer, nullable=False)
+    token = Column(String(40), nullable=False, index=True)  # ex: "GECB", "LCB2", "BAA21000S"
+    count = Column(Integer, default=1)  # ocorrências na página
+
+    document = relationship("Document", back_populates="identifiers")
+
+
 class Agent(Base):
     __tablename__ = "agents"
 
@@ -17,6 +17,10 @@ from database import get_db
 from models import Brand, Document, Page, User, UserBrandAccess
 from auth import get_current_admin, get_current_user
 from ingestion.processor import process_document, get_job_progress
+from ingestion.search_cache import search_cache_stats, clear_search_cache
+from ingestion.search_stats import get_search_stats, reset_search_stats
+from ingestion.reranker import reranker_stats, clear_rerank_cache
+from agent.clarifier import query_enrichment_stats, reset_query_enrichment_stats
 from config import get_settings
 
 logger = logging.getLogger(__name__)
@@ -376,3 +380,83 @@ async def reprocess_document(
     )
 
     return {"job_id": job_id, "message": "Reprocessamento iniciado"}
+
+
+# ── Search cache ────────────────────────────────────────────────────────────
+
+@router.get("/search-cache", dependencies=[Depends(get_current_admin)])
+async def get_search_cache_stats():
+    """Hit/miss counters of the search result cache (this worker)."""
+    return search_cache_stats()
+
+
+@router.delete("/search-cache", dependencies=[Depends(get_current_admin)])
+async def reset_search_cache():
+    """Drop all cached search results (e.g. after editing vectors from a script)."""
+    clear_search_cache()
+    return {"message": "Cache de busca limpo"}
+
+
+# ── Search phase stats ──────────────────────────────────────────────────────
+
+@router.get("/search-stats", dependencies=[Depends(get_current_admin)])
+async def get_search_phase_stats():
+    """Planner decisions, per-phase candidates / top-k contributions and timings (this worker)."""
+    return get_search_stats()
+
+
+@router.delete("/search-stats", dependencies=[Depends(get_current_admin)])
+async def clear_search_phase_stats():
+    reset_search_stats()
+    return {"message": "Estatísticas de busca zeradas"}
+
+
+# ── Reranker ────────────────────────────────────────────────────────────────
+
+@router.get("/reranker", dependencies=[Depends(get_current_admin)])
+async def get_reranker_stats():
+    """Rerank strategy, local vs Gemini decisions, cache hits and trained model (this worker)."""
+    return reranker_stats()
+
+
+@router.delete("/reranker-cache", dependencies=[Depends(get_current_admin)])
+async def reset_rerank_cache():
+    clear_rerank_cache()
+    return {"message": "Cache de rerank limpo"}
+
+
+# ── Query enrichment ────────────────────────────────────────────────────────
+
+@router.get("/query-enrichment", dependencies=[Depends(get_current_admin)])
+async def get_query_enrichment_stats():
+    """Multi-turn queries built by rules vs Gemini, why Gemini was needed and latency (this worker)."""
+    return query_enrichment_stats()
+
+
+@router.delete("/query-enrichment", dependencies=[Depends(get_current_admin)])
+async def clear_query_enrichment_stats():
+    reset_query_enrichment_stats()
+    return {"message": "Estatísticas de enriquecimento de consulta zeradas"}
+
+
+# ── Search explain ──────────────────────────────────────────────────────────
+
+class SearchExplainRequest(BaseModel):
+    brand_slug: str
+    query: str
+    top_k: int = 7
+
+
+@router.post("/search-explain", dependencies=[Depends(get_current_admin)])
+async def explain_search(body: SearchExplainRequest, db: AsyncSession = Depends(get_db)):
+    """Run one search uncached and return its plan, per-call timings and candidate scoring."""
+    brand_result = await db.execute(select(Brand).where(Brand.slug == body.brand_slug))
+    if not brand_result.scalar_one_or_none():
+        raise HTTPException(status_code=404, detail="Marca não encontrada")
+    if not body.query.strip():
+        raise HTTPException(status_code=400, detail="Consulta vazia")
+
+    from ingestion.embedder import search_brand
+    return await asyncio.to_thread(
+        search_brand, body.brand_slug, body.query, max(1, min(body.top_k, 50)), True
+    )
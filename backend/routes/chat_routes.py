@@ -1,20 +1,38 @@
 import json
 import logging
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from pydantic import BaseModel
 from typing import Optional
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Brand, UserBrandAccess, ChatSession, ChatMessage
 from auth import get_current_user
-from agent.chat import chat
+from agent.chat import chat, chat_stream
+from agent.clarifier import ANSWER_ERROR_TEXT
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# No caching or proxy buffering: tokens must reach the client as they are written
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def sse_events(events):
+    """
+    chat_stream events as SSE lines. The 200 is already sent when the pipeline
+    runs, so a failure ends the stream with an "error" event instead of silence.
+    """
+    try:
+        async for event in events:
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        logger.error(f"Chat stream failed: {e}", exc_info=True)
+        yield f"data: {json.dumps({'type': 'error', 'message': ANSWER_ERROR_TEXT}, ensure_ascii=False)}\n\n"
+
 
 class ChatRequest(BaseModel):
     query: str
@@ -27,15 +45,7 @@ class HistoryResponse(BaseModel):
     sources: list = []
 
 
-@router.post("/{brand_id}")
-async def send_message(
-    brand_id: int,
-    request: ChatRequest,
-    current_user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-):
-    """Send a message to the brand agent."""
-    # Validate brand access
+async def _get_accessible_brand(brand_id: int, current_user, db: AsyncSession) -> Brand:
     brand_result = await db.execute(select(Brand).where(Brand.id == brand_id))
     brand = brand_result.scalar_one_or_none()
     if not brand or not brand.is_active:
@@ -50,6 +60,18 @@ async def send_message(
         )
         if not ba.scalar_one_or_none():
             raise HTTPException(status_code=403, detail="Sem acesso a esta marca")
+    return brand
+
+
+@router.post("/{brand_id}")
+async def send_message(
+    brand_id: int,
+    request: ChatRequest,
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Send a message to the brand agent."""
+    brand = await _get_accessible_brand(brand_id, current_user, db)
 
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Mensagem vazia")
@@ -67,6 +89,38 @@ async def send_message(
     return result
 
 
+@router.post("/{brand_id}/stream")
+async def send_message_stream(
+    brand_id: int,
+    request: ChatRequest,
+    current_user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """SSE variant of send_message: sources first, then the answer as it is written (see chat_stream)."""
+    brand = await _get_accessible_brand(brand_id, current_user, db)
+
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Mensagem vazia")
+
+    user_id, brand_slug, brand_name = current_user.id, brand.slug, brand.name
+
+    async def event_generator():
+        # The request's session is closed once the response starts — use our own
+        async with AsyncSessionLocal() as stream_db:
+            async for event in chat_stream(
+                db=stream_db,
+                user_id=user_id,
+                brand_id=brand_id,
+                brand_slug=brand_slug,
+                brand_name=brand_name,
+                query=request.query.strip(),
+                session_id=request.session_id,
+            ):
+                yield event
+
+    return StreamingResponse(sse_events(event_generator()), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.get("/{brand_id}/sessions")
 async def list_sessions(
     brand_id: int,
@@ -7,15 +7,17 @@ import uuid
 from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from agent.chat import chat
+from agent.chat import chat, chat_stream
 from config import get_settings
 from database import get_db, AsyncSessionLocal
 from ingestion.processor import process_document, get_job_progress
 from models import Agent, Brand, Document, Page, User
+from routes.chat_routes import SSE_HEADERS, sse_events
 
 
 router = APIRouter(prefix="/api", tags=["rag-compat"])
@@ -488,14 +490,8 @@ async def compat_upload_status(job_id: str):
     }
 
 
-@router.post("/query")
-async def rag_query(request: QueryRequest, db: AsyncSession = Depends(get_db)):
-    question = (request.question or "").strip()
-    if not question:
-        raise HTTPException(status_code=400, detail="Pergunta vazia")
-
-    started = time.time()
-
+async def _resolve_query_target(request: QueryRequest, db: AsyncSession) -> tuple[User, Brand, list[dict]]:
+    """(admin user, brand, history in backend format) a compat query runs as."""
     admin_result = await db.execute(
         select(User).where(User.is_admin.is_(True), User.is_active.is_(True)).order_by(User.id)
     )
@@ -547,6 +543,18 @@ async def rag_query(request: QueryRequest, db: AsyncSession = Depends(get_db)):
             if text_raw:
                 ext_history.append({"role": role_mapped, "content": text_raw})
 
+    return admin_user, brand, ext_history
+
+
+@router.post("/query")
+async def rag_query(request: QueryRequest, db: AsyncSession = Depends(get_db)):
+    question = (request.question or "").strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Pergunta vazia")
+
+    started = time.time()
+    admin_user, brand, ext_history = await _resolve_query_target(request, db)
+
     response = await chat(
         db=db,
         user_id=admin_user.id,
@@ -568,3 +576,39 @@ async def rag_query(request: QueryRequest, db: AsyncSession = Depends(get_db)):
         "documentsFound": len(sources),
         "searchTime": elapsed,
     }
+
+
+@router.post("/query/stream")
+async def rag_query_stream(request: QueryRequest, db: AsyncSession = Depends(get_db)):
+    """
+    SSE variant of /query: "meta" (sources, clarification or answer) once
+    retrieval is done, "token" deltas, then "done" with the /query fields
+    ("error" instead if the pipeline fails).
+    """
+    question = (request.question or "").strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Pergunta vazia")
+
+    started = time.time()
+    admin_user, brand, ext_history = await _resolve_query_target(request, db)
+    user_id, brand_id, brand_slug, brand_name = admin_user.id, brand.id, brand.slug, brand.name
+
+    async def event_generator():
+        # The request's session is closed once the response starts — use our own
+        async with AsyncSessionLocal() as stream_db:
+            async for event in chat_stream(
+                db=stream_db,
+                user_id=user_id,
+                brand_id=brand_id,
+                brand_slug=brand_slug,
+                brand_name=brand_name,
+                query=question,
+                session_id=None,
+                external_history=ext_history or None,
+            ):
+                if event["type"] == "done":
+                    event["documentsFound"] = len(event["sources"])
+                    event["searchTime"] = int((time.time() - started) * 1000)
+                yield event
+
+    return StreamingResponse(sse_events(event_generator()), media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,55 @@
+"""
+Apply a collection profile (quantization, on-disk payload/vectors, HNSW) to
+existing brand collections in place. Qdrant re-optimizes segments in the
+background; searches keep working meanwhile.
+Set QDRANT_COLLECTION_PROFILE to the same profile so new collections and
+per-query params match.
+
+Uso: python scripts/apply_collection_profile.py <default|balanced|compact|high_recall> [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.collection_profiles import PROFILES, update_collection_kwargs
+from ingestion.embedder import MINI_VECTOR_NAME
+from ingestion.qdrant_pool import (
+    get_qdrant_client,
+    brand_collections,
+    get_collection_meta,
+    resolve_collection_name,
+    invalidate_collection_meta,
+)
+
+
+def run(profile_name: str, brand_slugs: list[str]):
+    profile = PROFILES.get(profile_name)
+    if profile is None:
+        print(f"Perfil desconhecido: {profile_name}. Opções: {', '.join(PROFILES)}")
+        sys.exit(1)
+
+    client = get_qdrant_client()
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        # The mini first-pass vector always stays in RAM
+        dense_names = get_collection_meta(collection_name)["dense"] - {MINI_VECTOR_NAME}
+        client.update_collection(
+            collection_name=resolve_collection_name(collection_name),
+            **update_collection_kwargs(profile, dense_names),
+        )
+        invalidate_collection_meta(collection_name)
+        print(f"{collection_name}: perfil '{profile.name}' aplicado")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,58 @@
+"""
+Add the SimHash signature ("simhash" payload key, used to collapse near-duplicate
+search results) and the content hash ("content_hash", exact repeats skipped when a
+document's ingestion resumes) to the points of existing brand collections, computed from the
+chunk text in the payload or the chunk store. Points are updated in place; new
+uploads get it during ingestion. Safe to run multiple times.
+
+Uso: python scripts/backfill_chunk_signatures.py [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from qdrant_client.models import SetPayload, SetPayloadOperation
+
+from ingestion.chunk_store import get_chunks
+from ingestion.collection_migrations import iter_points
+from ingestion.near_duplicates import signature, content_hash
+from ingestion.qdrant_pool import get_qdrant_client, brand_collections
+from ingestion.search_cache import bump_collection_version
+
+
+def run(brand_slugs: list[str]):
+    client = get_qdrant_client()
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        updated = 0
+        for points in iter_points(collection_name, with_vectors=False, with_payload=["text", "simhash", "content_hash"]):
+            points = [
+                point for point in points
+                if not ((point.payload or {}).get("simhash") and (point.payload or {}).get("content_hash"))
+            ]
+            stored = get_chunks([point.id for point in points if "text" not in (point.payload or {})])
+            operations = []
+            for point in points:
+                text = (point.payload or {}).get("text") or stored.get(str(point.id), {}).get("text")
+                if not text:
+                    continue
+                operations.append(SetPayloadOperation(
+                    set_payload=SetPayload(payload={"simhash": signature(text), "content_hash": content_hash(text)}, points=[point.id])
+                ))
+            if operations:
+                client.batch_update_points(collection_name=collection_name, update_operations=operations, wait=True)
+                updated += len(operations)
+
+        bump_collection_version(collection_name)
+        print(f"{collection_name}: assinatura SimHash e hash de conteúdo em {updated} chunks")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,49 @@
+"""
+Fill the doc_identifiers table (equipment identifiers per page, used to route
+searches to the documents that mention them) from already processed pages.
+New uploads are indexed during ingestion. Safe to run multiple times.
+
+Uso: python scripts/backfill_doc_identifiers.py [brand_slug ...]
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, init_db
+from models import Brand, Document, Page
+from ingestion.routing_index import replace_page_identifiers, get_routing_index
+
+
+async def run(brand_slugs: list[str]):
+    await init_db()  # creates the doc_identifiers table on older databases
+    async with AsyncSessionLocal() as db:
+        query = select(Brand)
+        if brand_slugs:
+            query = query.where(Brand.slug.in_(brand_slugs))
+        brands = (await db.execute(query)).scalars().all()
+
+        for brand in brands:
+            docs = (await db.execute(select(Document).where(Document.brand_id == brand.id))).scalars().all()
+            if not docs:
+                continue
+            for doc in docs:
+                pages = (await db.execute(
+                    select(Page).where(Page.document_id == doc.id, Page.gemini_text.isnot(None))
+                )).scalars().all()
+                for page in pages:
+                    await replace_page_identifiers(db, brand.id, brand.slug, doc.id, page.page_number, page.gemini_text)
+                await db.commit()
+
+            index = get_routing_index(brand.slug)
+            selective = sum(1 for token in index.postings if index.is_selective(token))
+            print(f"{brand.slug}: {len(index.postings)} identificadores em {len(docs)} documentos ({selective} seletivos)")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(sys.argv[1:]))
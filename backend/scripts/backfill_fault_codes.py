@@ -0,0 +1,52 @@
+"""
+Fill the fault_codes table from the text of already processed pages
+(new uploads are indexed during ingestion). Safe to run multiple times:
+each page's rows are replaced.
+
+Uso: python scripts/backfill_fault_codes.py [brand_slug ...]
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, init_db
+from models import Brand, Document, Page
+from ingestion.fault_codes import replace_page_fault_codes
+
+
+async def run(brand_slugs: list[str]):
+    await init_db()  # creates the fault_codes table on older databases
+    async with AsyncSessionLocal() as db:
+        query = select(Brand)
+        if brand_slugs:
+            query = query.where(Brand.slug.in_(brand_slugs))
+        brands = (await db.execute(query)).scalars().all()
+
+        for brand in brands:
+            docs = (await db.execute(select(Document).where(Document.brand_id == brand.id))).scalars().all()
+            total_rows = 0
+            for doc in docs:
+                pages = (await db.execute(
+                    select(Page).where(Page.document_id == doc.id, Page.gemini_text.isnot(None))
+                )).scalars().all()
+                doc_rows = 0
+                for page in pages:
+                    doc_rows += await replace_page_fault_codes(
+                        db, brand.id, doc.id, doc.original_filename, page.page_number, page.gemini_text
+                    )
+                await db.commit()
+                if doc_rows:
+                    print(f"  {doc.original_filename}: {doc_rows} códigos")
+                total_rows += doc_rows
+            if docs:
+                print(f"{brand.slug}: {total_rows} linhas de códigos de falha em {len(docs)} documentos")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""
+Add the "mini" Matryoshka prefix vector (two-stage dense search) to existing
+brand collections. Each collection is copied into a new one with the extra
+vector and the brand name becomes an alias to it; no embeddings are
+recomputed. Maintenance window only: uploads for the brand must be stopped, and on
+a brand's first rebuild its searches fail until the alias exists, so brands
+that are not aliases yet are skipped without --first-rebuild (see
+rebuild_collection). Safe to run multiple times.
+
+Uso: python scripts/backfill_mini_vectors.py --maintenance [--first-rebuild] [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from qdrant_client.models import VectorParams, Distance
+from ingestion.embedder import ensure_payload_indexes, mini_vector, MINI_VECTOR_NAME, MINI_VECTOR_SIZE
+from ingestion.qdrant_pool import brand_collections, get_collection_meta
+from ingestion.collection_migrations import rebuild_collection, current_create_kwargs, require_maintenance
+
+
+# A collection with an unnamed main vector gets {"": main, "mini": prefix}: the
+# main vector keeps the default name, so searches without `using` are unchanged.
+def _add_mini(point_id, vectors: dict, payload: dict):
+    if "" not in vectors:
+        return None
+    vectors[MINI_VECTOR_NAME] = mini_vector(vectors[""])
+    return vectors, payload
+
+
+def run(brand_slugs: list[str], allow_first_rebuild: bool = False):
+    if not MINI_VECTOR_SIZE:
+        print("EMBEDDING_MINI_VECTOR_SIZE=0: vetor mini desativado")
+        return
+
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        if MINI_VECTOR_NAME in get_collection_meta(collection_name)["dense"]:
+            print(f"{collection_name}: vetor mini já existe")
+            continue
+
+        create_kwargs = current_create_kwargs(collection_name)
+        vectors_config = create_kwargs["vectors_config"]
+        if not isinstance(vectors_config, dict):
+            vectors_config = {"": vectors_config}
+        vectors_config[MINI_VECTOR_NAME] = VectorParams(size=MINI_VECTOR_SIZE, distance=Distance.COSINE)
+        create_kwargs["vectors_config"] = vectors_config
+
+        try:
+            physical = rebuild_collection(
+                collection_name,
+                _add_mini,
+                after_create=ensure_payload_indexes,
+                allow_first_rebuild=allow_first_rebuild,
+                **create_kwargs,
+            )
+        except RuntimeError as e:
+            print(f"{collection_name}: ignorada — {e}")
+            continue
+        print(f"{collection_name}: vetor mini ({MINI_VECTOR_SIZE}d) adicionado ({physical})")
+
+
+if __name__ == "__main__":
+    brand_args, allow_first_rebuild = require_maintenance(sys.argv[1:])
+    run(brand_args, allow_first_rebuild)
@@ -0,0 +1,71 @@
+"""
+Add the sparse lexical vector (BM25 candidates that widen the dense search pool)
+to existing brand collections.
+Each collection is copied into a new one with the sparse vector config and the
+brand name becomes an alias to it. Searches keep working during the copy, but
+on a brand's first rebuild they fail between dropping the collection and creating
+the alias (skipped without --first-rebuild), and uploads made during the copy
+are lost (see rebuild_collection).
+Maintenance window only; safe to run multiple times.
+
+Uso: python scripts/backfill_sparse_vectors.py --maintenance [--first-rebuild] [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.embedder import ensure_payload_indexes, sparse_vectors_config, sparse_text, _chunk_scoring_features
+from ingestion.sparse import SPARSE_VECTOR_NAME, document_sparse_vector
+from ingestion.chunk_store import get_chunks
+from ingestion.qdrant_pool import brand_collections, get_collection_meta
+from ingestion.collection_migrations import rebuild_collection, current_create_kwargs, require_maintenance
+
+
+def _add_sparse(point_id, vectors: dict, payload: dict):
+    if "" not in vectors:
+        return None
+    filename = payload.get("doc_filename", "")
+    if "text" in payload:
+        text = payload["text"]
+        # Points are rewritten anyway: also store the scoring features they may lack
+        payload.setdefault("features", _chunk_scoring_features(text, filename))
+    else:
+        # Text already moved to the chunk store
+        text = get_chunks([point_id]).get(str(point_id), {}).get("text", "")
+    vectors[SPARSE_VECTOR_NAME] = document_sparse_vector(sparse_text(filename, text))
+    return vectors, payload
+
+
+def run(brand_slugs: list[str], allow_first_rebuild: bool = False):
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        if SPARSE_VECTOR_NAME in get_collection_meta(collection_name)["sparse"]:
+            print(f"{collection_name}: vetor esparso já existe")
+            continue
+
+        create_kwargs = current_create_kwargs(collection_name)
+        create_kwargs["sparse_vectors_config"] = sparse_vectors_config()
+        try:
+            physical = rebuild_collection(
+                collection_name,
+                _add_sparse,
+                after_create=ensure_payload_indexes,
+                allow_first_rebuild=allow_first_rebuild,
+                **create_kwargs,
+            )
+        except RuntimeError as e:
+            print(f"{collection_name}: ignorada — {e}")
+            continue
+        print(f"{collection_name}: vetor esparso adicionado ({physical})")
+
+
+if __name__ == "__main__":
+    brand_args, allow_first_rebuild = require_maintenance(sys.argv[1:])
+    run(brand_args, allow_first_rebuild)
@@ -0,0 +1,59 @@
+"""
+Build the document/page summary vectors (coarse-to-fine retrieval) of existing
+brand collections from their stored chunk embeddings; no embeddings are
+recomputed. New uploads get them during ingestion. Safe to run multiple times.
+
+Uso: python scripts/backfill_summary_vectors.py [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.qdrant_pool import brand_collections
+from ingestion.collection_migrations import iter_points
+from ingestion.summary_index import upsert_page_summary, refresh_document_summary
+
+
+def _page_sums(collection_name: str) -> tuple[dict[tuple[int, int], list[float]], dict[int, str]]:
+    """(doc_id, page_number) → sum of the page's chunk embeddings, plus doc filenames."""
+    sums: dict[tuple[int, int], list[float]] = {}
+    filenames: dict[int, str] = {}
+    for points in iter_points(collection_name, with_payload=["doc_id", "doc_filename", "page_number"]):
+        for point in points:
+            payload = point.payload or {}
+            vector = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+            if not vector or payload.get("doc_id") is None:
+                continue
+            key = (payload["doc_id"], payload.get("page_number") or 0)
+            filenames[key[0]] = payload.get("doc_filename", "")
+            total = sums.get(key)
+            if total is None:
+                sums[key] = list(vector)
+            else:
+                for i, value in enumerate(vector):
+                    total[i] += value
+    return sums, filenames
+
+
+def run(brand_slugs: list[str]):
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        brand_slug = collection_name[len("brand_"):]
+        sums, filenames = _page_sums(collection_name)
+        for (doc_id, page_number), total in sums.items():
+            # The page centroid is the normalized sum, so one "vector" is enough
+            upsert_page_summary(brand_slug, doc_id, filenames[doc_id], page_number, [total])
+        for doc_id, filename in filenames.items():
+            refresh_document_summary(brand_slug, doc_id, filename)
+        print(f"{collection_name}: {len(sums)} páginas e {len(filenames)} documentos resumidos")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,286 @@
+"""
+Micro-benchmark of Phase 5 scoring cost per candidate: the per-hit bonus
+functions as they were before precomputed features (frozen copies below,
+re-normalizing query and text for every hit) against score_candidate() with
+precomputed query/payload features. Brand candidates get their text and
+features from the chunk store when the payload doesn't carry them.
+
+Uso: python scripts/benchmark_scoring.py [brand_slug] [n_candidates]
+     Sem brand_slug usa candidatos sintéticos.
+"""
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.embedder import (
+    build_query_features,
+    score_candidate,
+    _chunk_scoring_features,
+    _extract_domain_signals,
+    _extract_key_tokens,
+    _extract_query_fault_tokens,
+    _extract_query_identifiers,
+    _extract_search_keywords,
+    _normalize_for_matching,
+)
+from ingestion.chunk_store import get_chunks
+from ingestion.collection_migrations import iter_points
+
+QUERIES = [
+    "erro UV1 OVF10",
+    "Falhas no XO 508",
+    "diagrama ATC C.07.10",
+    "calibração do OVF10 porta DW",
+    "placa LCB2 GEN2 resgate",
+]
+
+SYNTHETIC_ROWS = [
+    "| UV1 | Subtensão no barramento DC do inversor OVF10 | Verificar alimentação e fusíveis F1/F2 |",
+    "| OV2 | Sobretensão na frenagem | Conferir resistor de frenagem e parâmetro C.07.10 |",
+    "| PUV | Falha de subtensão na placa LCB2 | Medir 24V no conector P6 |",
+    "Procedimento de resgate GEN2: acionar freio manual, verificar contato de porta DW e trinco.",
+    "Ajuste de calibração do XO 508: parâmetros de aceleração, desaceleração e nivelamento.",
+]
+
+
+def _synthetic_payloads(n: int) -> list[dict]:
+    payloads = []
+    for i in range(n):
+        text = "\n".join(SYNTHETIC_ROWS[j % len(SYNTHETIC_ROWS)] for j in range(i, i + 8))
+        filename = ["Calibracao do OVF10.pdf", "ATC 043 ELIMINAR ACP.pdf", "Manual GEN2 Resgate.pdf"][i % 3]
+        payloads.append({
+            "text": text,
+            "doc_filename": filename,
+            "signals": _extract_domain_signals(text),
+        })
+    return payloads
+
+
+def _brand_payloads(brand_slug: str, n: int) -> list[dict]:
+    payloads = []
+    for points in iter_points(f"brand_{brand_slug}", batch_size=min(n, 256), with_vectors=False):
+        stored = get_chunks([p.id for p in points if "text" not in (p.payload or {})])
+        for point in points:
+            payload = point.payload or {}
+            if "text" not in payload and str(point.id) in stored:
+                payload = {**payload, **stored[str(point.id)]}
+            payloads.append(payload)
+        if len(payloads) >= n:
+            break
+    return payloads[:n]
+
+
+# ── Baseline: Phase 5 bonus functions before precomputed features (frozen) ──
+
+def _baseline_signal_match_bonus(signals: dict, query: str) -> float:
+    if not signals or not query:
+        return 0.0
+
+    bonus = 0.0
+    q_norm = _normalize_for_matching(query)
+    q_upper = query.upper()
+
+    for topic in signals.get("topics", []) or []:
+        if topic and topic in q_norm:
+            bonus += 0.04
+
+    for token in signals.get("controller_tokens", []) or []:
+        token = str(token or "").upper().strip()
+        if token and token in q_upper:
+            bonus += 0.07
+
+    for token in signals.get("fault_tokens", []) or []:
+        token = str(token or "").upper().strip()
+        if token and token in q_upper:
+            bonus += 0.06
+
+    return min(bonus, 0.26)
+
+
+def _baseline_identifier_focus_score(payload: dict, query_identifiers: list[str]) -> tuple[float, bool]:
+    """
+    Returns (bonus_or_penalty, has_identifier_hit).
+    Penalizes chunks without identifier match when the query contains explicit identifiers.
+    """
+    if not query_identifiers:
+        return 0.0, False
+
+    text = str(payload.get("text", "") or "")
+    source = str(payload.get("doc_filename", "") or "")
+    combined = f"{text} {source}".upper()
+    compact_combined = re.sub(r"[^A-Z0-9]", "", combined)
+
+    signals = payload.get("signals") or {}
+    signal_tokens = []
+    for key in ("controller_tokens", "fault_tokens", "model_version_tokens"):
+        vals = signals.get(key) or []
+        signal_tokens.extend([re.sub(r"[^A-Z0-9]", "", str(v).upper()) for v in vals])
+
+    signal_set = {token for token in signal_tokens if token}
+
+    hits = 0
+    for identifier in query_identifiers:
+        if identifier in compact_combined or identifier in signal_set:
+            hits += 1
+
+    if hits > 0:
+        return min(0.06 + (hits * 0.03), 0.24), True
+
+    # Query is specific, chunk does not mention those IDs -> mild penalty
+    return -0.10, False
+
+
+def _baseline_lexical_fault_bonus(text: str, tokens: list[str]) -> float:
+    if not text or not tokens:
+        return 0.0
+
+    text_upper = text.upper()
+    bonus = 0.0
+    for token in tokens:
+        if re.search(rf"\b{re.escape(token)}\b", text_upper):
+            bonus += 0.08
+        elif token in text_upper:
+            bonus += 0.04
+    return min(bonus, 0.24)
+
+
+def _baseline_content_keyword_bonus(text: str, keywords: list[str]) -> float:
+    """
+    Bonus when the chunk text literally contains the queried keywords.
+    This is distinct from semantic similarity — it rewards exact matches.
+    """
+    if not text or not keywords:
+        return 0.0
+
+    text_lower = text.lower()
+    bonus = 0.0
+    for kw in keywords:
+        kw_lower = kw.lower()
+        if kw_lower in text_lower:
+            bonus += 0.10  # Strong bonus for exact content match
+        # Also check without spaces/dots (e.g., "C0710" matches "C.07.10")
+        kw_compact = re.sub(r'[.\s\-]', '', kw_lower)
+        text_compact = re.sub(r'[.\s\-]', '', text_lower)
+        if len(kw_compact) >= 3 and kw_compact in text_compact and kw_lower not in text_lower:
+            bonus += 0.06
+
+    return min(bonus, 0.25)
+
+
+def _baseline_filename_match_bonus(filename: str, query: str) -> float:
+    """
+    Bonus when query terms match the document filename.
+    Uses aggressive normalization to handle user typing variations:
+    - "atc c0710" matches "ATC - C.07.10"
+    - "ovf10" matches "Calibração do OVF10.pdf"
+    - "gen2" matches "Manual GEN2 Resgate.pdf"
+    - "calibracao ovf10" matches "Calibração do OVF10.pdf"
+    """
+    if not filename or not query:
+        return 0.0
+
+    # Normalize both for comparison
+    fn_normalized = _normalize_for_matching(filename)
+    query_normalized = _normalize_for_matching(query)
+
+    # Also create "squished" versions (no spaces) for matching things like
+    # "c0710" in "c 07 10" or "ovf10" in "ovf 10"
+    fn_squished = fn_normalized.replace(" ", "")
+    query_squished = query_normalized.replace(" ", "")
+
+    # Extract meaningful tokens from query
+    query_tokens = _extract_key_tokens(query)
+    if not query_tokens:
+        return 0.0
+
+    bonus = 0.0
+    matched_tokens = 0
+
+    for token in query_tokens:
+        # Direct match in normalized filename
+        if token in fn_normalized:
+            bonus += 0.08
+            matched_tokens += 1
+        # Squished match (e.g., "c0710" in "c0710" from "C.07.10")
+        elif token in fn_squished:
+            bonus += 0.08
+            matched_tokens += 1
+        # Try squished token in squished filename (e.g., "ovf10" in "ovf10")
+        elif token.replace(" ", "") in fn_squished:
+            bonus += 0.06
+            matched_tokens += 1
+
+    # Extra bonus if multiple tokens match (more specific = more relevant)
+    if matched_tokens >= 2:
+        bonus += 0.05
+
+    return min(bonus, 0.25)
+
+
+def _baseline_score(payload: dict, query: str, query_parts: dict) -> float:
+    # Query-side extraction happens once per search in both paths
+    text = payload.get("text", "")
+    filename = payload.get("doc_filename", "")
+    identifier_bonus, _ = _baseline_identifier_focus_score(payload, query_parts["identifiers"])
+    return (
+        _baseline_lexical_fault_bonus(text, query_parts["fault_tokens"])
+        + _baseline_filename_match_bonus(filename, query)
+        + _baseline_content_keyword_bonus(text, query_parts["keywords"])
+        + _baseline_signal_match_bonus(payload.get("signals") or {}, query)
+        + identifier_bonus
+    )
+
+
+def run(brand_slug: str | None, n: int):
+    payloads = _brand_payloads(brand_slug, n) if brand_slug else _synthetic_payloads(n)
+    legacy_payloads = [{k: v for k, v in p.items() if k != "features"} for p in payloads]
+    featured_payloads = [
+        p if p.get("features") else {**p, "features": _chunk_scoring_features(p.get("text", ""), p.get("doc_filename", ""))}
+        for p in payloads
+    ]
+    print(f"{len(payloads)} candidatos, {len(QUERIES)} consultas\n")
+
+    total_legacy = 0.0
+    total_features = 0.0
+    for query in QUERIES:
+        query_parts = {
+            "identifiers": _extract_query_identifiers(query),
+            "fault_tokens": _extract_query_fault_tokens(query),
+            "keywords": _extract_search_keywords(query),
+        }
+        start = time.perf_counter()
+        for payload in legacy_payloads:
+            _baseline_score(payload, query, query_parts)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        qf = build_query_features(query)
+        for payload in featured_payloads:
+            score_candidate(payload, qf)
+        featured = time.perf_counter() - start
+
+        total_legacy += legacy
+        total_features += featured
+        print(
+            f"{query:32s} legado {legacy / len(payloads) * 1e6:7.1f} µs/cand | "
+            f"features {featured / len(payloads) * 1e6:7.1f} µs/cand"
+        )
+
+    per_query = len(payloads) * len(QUERIES)
+    print(
+        f"\nMédia: legado {total_legacy / per_query * 1e6:.1f} µs/cand, "
+        f"features {total_features / per_query * 1e6:.1f} µs/cand "
+        f"({total_legacy / max(total_features, 1e-9):.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    brand = args[0] if args and not args[0].isdigit() else None
+    count = int(next((a for a in args if a.isdigit()), "300"))
+    run(brand, count)
@@ -0,0 +1,337 @@
+"""
+Offline retrieval benchmark. Loads a snapshot made by scripts/benchmark_snapshot.py
+into an embedded Qdrant (in memory, or a local directory reused across runs)
+and a scratch SQLite database. It then replays the 300 Otis scenarios against
+search_brand directly, with the result cache off and the query embeddings taken
+from the snapshot. It reports:
+  - document recall (hit@1, hit@5, hit@k) and MRR per category, for the
+    scenarios that name expected documents;
+  - p50/p95 latency;
+  - Qdrant, SQLite and embedding calls per query.
+With --baseline, the run is compared with a stored run and the exit code is 1
+when hit@k or MRR drop by more than --tolerance.
+
+Uso: python scripts/benchmark_search.py <pasta_snapshot> [--top-k 10] [--qdrant-path :memory:|pasta]
+                                        [--work-dir pasta] [--warmup 5] [--embed-missing]
+                                        [--baseline base.json] [--save-baseline base.json]
+                                        [--tolerance 0.02] [--tests caminho/test_otis_300.py]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts.otis_suite import load_tests, expected_doc_rank
+
+LOAD_BATCH = 256
+
+
+def _read_jsonl(path: Path):
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _configure_environment(args) -> Path:
+    """Point settings at the embedded Qdrant and scratch stores (before any app import)."""
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="benchmark_search_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    os.environ["QDRANT_LOCAL_PATH"] = args.qdrant_path
+    os.environ["DATABASE_URL"] = f"sqlite:///{work_dir / 'benchmark.db'}"
+    os.environ["CHUNK_STORE_PATH"] = str(work_dir / "chunks.db")
+    os.environ["SEARCH_CACHE_MAX_ENTRIES"] = "0"
+
+    from config import get_settings
+    if not get_settings().gemini_api_key:
+        # The Gemini client needs a key to be created; offline runs never call it
+        os.environ["GEMINI_API_KEY"] = "offline"
+        get_settings.cache_clear()
+    return work_dir
+
+
+async def _load_database(snapshot: Path, brand_slug: str, brand_name: str) -> bool:
+    """Documents and pages of the snapshot (plus fault-code and routing rows). False if already loaded."""
+    from sqlalchemy import select, func
+    from database import AsyncSessionLocal, init_db
+    from models import Brand, Document, Page
+    from ingestion.fault_codes import replace_page_fault_codes
+    from ingestion.routing_index import replace_page_identifiers
+
+    await init_db()
+    async with AsyncSessionLocal() as db:
+        brand = (await db.execute(select(Brand).where(Brand.slug == brand_slug))).scalar_one_or_none()
+        if brand is None:
+            brand = Brand(slug=brand_slug, name=brand_name)
+            db.add(brand)
+            await db.flush()
+        loaded = (await db.execute(select(func.count(Document.id)).where(Document.brand_id == brand.id))).scalar()
+        if loaded:
+            return False
+
+        filenames = {}
+        for row in _read_jsonl(snapshot / "documents.jsonl"):
+            db.add(Document(brand_id=brand.id, **row))
+            filenames[row["id"]] = row["original_filename"]
+        await db.flush()
+        for row in _read_jsonl(snapshot / "pages.jsonl"):
+            db.add(Page(**row))
+            doc_id, page_number, text = row["document_id"], row["page_number"], row["gemini_text"]
+            await replace_page_fault_codes(db, brand.id, doc_id, filenames.get(doc_id, ""), page_number, text)
+            await replace_page_identifiers(db, brand.id, brand_slug, doc_id, page_number, text)
+        await db.commit()
+    return True
+
+
+def _load_collection(collection_name: str, layout: dict, points_path: Path, chunk_rows=None) -> bool:
+    """Recreate a collection with the snapshot's vector layout. False if already loaded."""
+    from qdrant_client.models import Distance, VectorParams, SparseVectorParams, Modifier, PointStruct, SparseVector
+    from ingestion.qdrant_pool import get_qdrant_client, register_collection, delete_collection
+    from ingestion.chunk_store import put_chunks
+
+    client = get_qdrant_client()
+    if client.collection_exists(collection_name):
+        if client.count(collection_name).count == layout["points"]:
+            return False
+        delete_collection(collection_name)
+
+    dense = {name: VectorParams(size=size, distance=Distance.COSINE) for name, size in layout["dense"].items()}
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=dense if layout["named"] else dense[""],
+        sparse_vectors_config={name: SparseVectorParams(modifier=Modifier.IDF) for name in layout["sparse"]} or None,
+    )
+    register_collection(collection_name)
+
+    def decode(vector):
+        if isinstance(vector, dict):
+            return {
+                name: SparseVector(**v) if isinstance(v, dict) else v
+                for name, v in vector.items()
+            }
+        return vector
+
+    batch = []
+    for row in _read_jsonl(points_path):
+        batch.append(PointStruct(id=row["id"], vector=decode(row["vector"]), payload=row["payload"]))
+        if len(batch) >= LOAD_BATCH:
+            client.upsert(collection_name=collection_name, points=batch)
+            batch = []
+    if batch:
+        client.upsert(collection_name=collection_name, points=batch)
+
+    if chunk_rows is not None:
+        rows = [(r["point_id"], r["doc_id"], r["text"], r["features"]) for r in chunk_rows]
+        for start in range(0, len(rows), LOAD_BATCH):
+            put_chunks(collection_name, rows[start:start + LOAD_BATCH])
+    return True
+
+
+def _install_query_vectors(snapshot: Path, embed_missing: bool):
+    """Serve query embeddings from the snapshot instead of the embedding API."""
+    import ingestion.embedder as embedder
+
+    vectors = {row["text"]: row["vector"] for row in _read_jsonl(snapshot / "query_vectors.jsonl")}
+    live_batch = embedder.get_query_embeddings_batch
+
+    def snapshot_embeddings(texts: list[str]) -> list[list[float]]:
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            if not embed_missing:
+                raise RuntimeError(
+                    f"Snapshot sem vetor de consulta para {missing[:3]} "
+                    f"(refaça o snapshot ou use --embed-missing)"
+                )
+            vectors.update(zip(missing, live_batch(missing)))
+        return [vectors[text] for text in texts]
+
+    embedder.get_query_embeddings_batch = snapshot_embeddings
+    embedder.get_query_embedding = lambda text: snapshot_embeddings([text])[0]
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _recall_metrics(rows: list[dict], top_k: int) -> dict:
+    scored = [row for row in rows if row["expected_docs"]]
+    latencies = [row["ms"] for row in rows]
+    metrics = {"n": len(rows), "with_docs": len(scored), "p50_ms": round(_percentile(latencies, 0.5), 1)}
+    if scored:
+        ranks = [row["rank"] for row in scored]
+        metrics.update({
+            "hit@1": round(sum(1 for r in ranks if r == 1) / len(ranks), 4),
+            "hit@5": round(sum(1 for r in ranks if r and r <= 5) / len(ranks), 4),
+            f"hit@{top_k}": round(sum(1 for r in ranks if r) / len(ranks), 4),
+            "mrr": round(sum(1.0 / r for r in ranks if r) / len(ranks), 4),
+        })
+    return metrics
+
+
+def run_benchmark(tests: list[dict], brand_slug: str, top_k: int, warmup: int) -> dict:
+    from ingestion.embedder import search_brand
+
+    for test in tests[:warmup]:
+        search_brand(brand_slug, test["question"], top_k)
+
+    rows = []
+    for test in tests:
+        started = time.perf_counter()
+        report = search_brand(brand_slug, test["question"], top_k, explain=True)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        calls = report.get("calls_by_kind", {})
+        filenames = [chunk.get("source", "") for chunk in report.get("results", [])]
+        rows.append({
+            "id": test["id"],
+            "category": test["category"],
+            "expected_docs": test.get("expected_docs") or [],
+            "rank": expected_doc_rank(filenames, test["expected_docs"]) if test.get("expected_docs") else None,
+            "ms": round(elapsed_ms, 1),
+            "qdrant_calls": calls.get("qdrant", {}).get("calls", 0),
+            "sqlite_calls": calls.get("sqlite", {}).get("calls", 0) + calls.get("routing", {}).get("calls", 0),
+            "embedding_calls": calls.get("embedding", {}).get("calls", 0),
+            "ran_recall_phases": report.get("plan", {}).get("ran_recall_phases"),
+        })
+
+    latencies = [row["ms"] for row in rows]
+    summary = {
+        **_recall_metrics(rows, top_k),
+        "p95_ms": round(_percentile(latencies, 0.95), 1),
+        "mean_ms": round(statistics.mean(latencies), 1) if latencies else 0.0,
+        "qdrant_calls_per_query": round(statistics.mean(r["qdrant_calls"] for r in rows), 2) if rows else 0.0,
+        "sqlite_calls_per_query": round(statistics.mean(r["sqlite_calls"] for r in rows), 2) if rows else 0.0,
+        "embedding_calls_per_query": round(statistics.mean(r["embedding_calls"] for r in rows), 2) if rows else 0.0,
+        "recall_phase_rate": round(sum(1 for r in rows if r["ran_recall_phases"]) / len(rows), 3) if rows else 0.0,
+    }
+    categories = sorted({row["category"] for row in rows})
+    return {
+        "top_k": top_k,
+        "summary": summary,
+        "categories": {c: _recall_metrics([r for r in rows if r["category"] == c], top_k) for c in categories},
+        "tests": {str(row["id"]): row for row in rows},
+    }
+
+
+def _print_results(result: dict):
+    top_k = result["top_k"]
+    s = result["summary"]
+    print(
+        f"\n{s['n']} cenários ({s['with_docs']} com documentos esperados) | "
+        f"p50={s['p50_ms']}ms p95={s['p95_ms']}ms média={s['mean_ms']}ms | "
+        f"qdrant/consulta={s['qdrant_calls_per_query']} sqlite/consulta={s['sqlite_calls_per_query']} "
+        f"embedding/consulta={s['embedding_calls_per_query']} | fases 2-4 em {s['recall_phase_rate']:.0%}"
+    )
+    print(f"{'cat':<5} {'n':>4} {'docs':>5} {'hit@1':>7} {'hit@5':>7} {f'hit@{top_k}':>7} {'mrr':>7} {'p50 ms':>8}")
+    for category, m in [*result["categories"].items(), ("todas", s)]:
+        if not m.get("with_docs"):
+            print(f"{category:<5} {m['n']:>4} {0:>5} {'-':>7} {'-':>7} {'-':>7} {'-':>7} {m['p50_ms']:>8}")
+            continue
+        print(
+            f"{category:<5} {m['n']:>4} {m['with_docs']:>5} {m['hit@1']:>7.3f} {m['hit@5']:>7.3f} "
+            f"{m[f'hit@{top_k}']:>7.3f} {m['mrr']:>7.3f} {m['p50_ms']:>8}"
+        )
+
+
+def compare_with_baseline(result: dict, baseline: dict, tolerance: float) -> bool:
+    """Print deltas against the baseline. False when recall regressed beyond the tolerance."""
+    top_k = result["top_k"]
+    if baseline.get("top_k") != top_k:
+        print(f"\nAviso: baseline com top_k={baseline.get('top_k')}, execução com top_k={top_k}")
+
+    print("\nComparação com a baseline")
+    keys = ["hit@1", "hit@5", f"hit@{top_k}", "mrr", "p50_ms", "p95_ms", "qdrant_calls_per_query", "embedding_calls_per_query"]
+    for key in keys:
+        before, after = baseline["summary"].get(key), result["summary"].get(key)
+        if before is None or after is None:
+            continue
+        print(f"  {key:<26} {before:>9} → {after:<9} ({after - before:+.4g})")
+
+    regressed, improved = [], []
+    for test_id, row in result["tests"].items():
+        old = baseline.get("tests", {}).get(test_id)
+        if not old or not row["expected_docs"]:
+            continue
+        before, after = old.get("rank") or 10 ** 6, row["rank"] or 10 ** 6
+        if after > before:
+            regressed.append((test_id, old.get("rank"), row["rank"]))
+        elif after < before:
+            improved.append((test_id, old.get("rank"), row["rank"]))
+    print(f"  {len(improved)} cenários melhoraram, {len(regressed)} pioraram")
+    for test_id, before, after in regressed[:20]:
+        print(f"    #{test_id}: posição {before} → {after}")
+
+    ok = True
+    for key in (f"hit@{top_k}", "mrr"):
+        before, after = baseline["summary"].get(key), result["summary"].get(key)
+        if before is not None and after is not None and before - after > tolerance:
+            print(f"  REGRESSÃO: {key} caiu {before - after:.4f} (tolerância {tolerance})")
+            ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline de recuperação (cenários Otis)")
+    parser.add_argument("snapshot")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--qdrant-path", default=":memory:")
+    parser.add_argument("--work-dir", default="")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--embed-missing", action="store_true")
+    parser.add_argument("--baseline", default="")
+    parser.add_argument("--save-baseline", default="")
+    parser.add_argument("--tolerance", type=float, default=0.02)
+    parser.add_argument("--tests", default="")
+    args = parser.parse_args()
+
+    snapshot = Path(args.snapshot)
+    manifest = json.loads((snapshot / "manifest.json").read_text(encoding="utf-8"))
+    brand_slug = manifest["brand_slug"]
+    work_dir = _configure_environment(args)
+    print(f"Snapshot {snapshot} ({brand_slug}, {manifest['created_at']}) | Qdrant {args.qdrant_path} | {work_dir}")
+
+    started = time.perf_counter()
+    if asyncio.run(_load_database(snapshot, brand_slug, manifest.get("brand_name", brand_slug))):
+        print(f"Banco carregado: {manifest['documents']} documentos, {manifest['pages']} páginas")
+    collections = manifest.get("collections", {})
+    if "brand" in collections:
+        chunk_rows = list(_read_jsonl(snapshot / "chunks.jsonl"))
+        if _load_collection(f"brand_{brand_slug}", collections["brand"], snapshot / "points_brand.jsonl", chunk_rows):
+            print(f"brand_{brand_slug}: {collections['brand']['points']} pontos carregados")
+    if "summary" in collections:
+        from ingestion.summary_index import summary_collection_name
+        if _load_collection(summary_collection_name(brand_slug), collections["summary"], snapshot / "points_summary.jsonl"):
+            print(f"{summary_collection_name(brand_slug)}: {collections['summary']['points']} pontos carregados")
+    print(f"Carga em {time.perf_counter() - started:.1f}s")
+
+    _install_query_vectors(snapshot, args.embed_missing)
+    tests = load_tests(Path(args.tests)) if args.tests else load_tests()
+    result = run_benchmark(tests, brand_slug, args.top_k, args.warmup)
+    result["snapshot"] = {"path": str(snapshot), "created_at": manifest["created_at"]}
+    result["created_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    _print_results(result)
+
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nBaseline salva em {args.save_baseline}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if not compare_with_baseline(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Freeze a brand for the offline retrieval benchmark (scripts/benchmark_search.py):
+its documents and page texts, every point of its chunk and summary collections
+(vectors + payload), the chunk store rows, and the query embeddings of the
+300 Otis scenarios (question + Phase 4 keyword terms), so the benchmark runs
+without the embedding API. Needs the live database, Qdrant and embedding API.
+
+Uso: python scripts/benchmark_snapshot.py <pasta_destino> [brand_slug] [--tests caminho/test_otis_300.py]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from models import Brand, Document, Page
+from ingestion.chunk_store import get_chunks
+from ingestion.collection_migrations import iter_points
+from ingestion.embedder import build_query_features, get_query_embeddings_batch, _multi_query_terms
+from ingestion.qdrant_pool import get_qdrant_client, collection_exists, resolve_collection_name
+from ingestion.summary_index import summary_collection_name
+from scripts.otis_suite import DEFAULT_TESTS, load_tests
+
+EMBED_BATCH = 100
+
+
+def _write_jsonl(path: Path, rows) -> int:
+    count = 0
+    with path.open("w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def _vector_json(vector):
+    if isinstance(vector, dict):
+        return {
+            name: {"indices": list(v.indices), "values": list(v.values)} if hasattr(v, "indices") else v
+            for name, v in vector.items()
+        }
+    return vector
+
+
+def _collection_layout(collection_name: str) -> dict:
+    params = get_qdrant_client().get_collection(resolve_collection_name(collection_name)).config.params
+    vectors = params.vectors
+    dense = {name: v.size for name, v in vectors.items()} if isinstance(vectors, dict) else {"": vectors.size}
+    return {"dense": dense, "named": isinstance(vectors, dict), "sparse": sorted((params.sparse_vectors or {}).keys())}
+
+
+def _export_points(collection_name: str, path: Path, chunk_rows: list | None = None) -> int:
+    def rows():
+        for points in iter_points(collection_name):
+            if chunk_rows is not None:
+                stored = get_chunks([p.id for p in points if "text" not in (p.payload or {})])
+                for point in points:
+                    chunk = stored.get(str(point.id))
+                    if chunk:
+                        chunk_rows.append({"point_id": str(point.id), "doc_id": (point.payload or {}).get("doc_id", 0), **chunk})
+            for point in points:
+                yield {"id": point.id, "vector": _vector_json(point.vector), "payload": point.payload}
+    return _write_jsonl(path, rows())
+
+
+async def _export_pages(brand_slug: str, out: Path) -> dict | None:
+    async with AsyncSessionLocal() as db:
+        brand = (await db.execute(select(Brand).where(Brand.slug == brand_slug))).scalar_one_or_none()
+        if not brand:
+            return None
+        docs = (await db.execute(select(Document).where(Document.brand_id == brand.id))).scalars().all()
+        pages = (await db.execute(
+            select(Page).join(Document, Page.document_id == Document.id)
+            .where(Document.brand_id == brand.id, Page.gemini_text.isnot(None))
+        )).scalars().all()
+        _write_jsonl(out / "documents.jsonl", (
+            {
+                "id": d.id,
+                "filename": d.filename,
+                "original_filename": d.original_filename,
+                "status": d.status,
+                "total_pages": d.total_pages,
+                "processed_pages": d.processed_pages,
+            }
+            for d in docs
+        ))
+        _write_jsonl(out / "pages.jsonl", (
+            {
+                "document_id": p.document_id,
+                "page_number": p.page_number,
+                "gemini_text": p.gemini_text,
+                "embedding_id": p.embedding_id,
+                "quality_score": p.quality_score,
+            }
+            for p in pages
+        ))
+        return {"name": brand.name, "documents": len(docs), "pages": len(pages)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta um snapshot para o benchmark offline")
+    parser.add_argument("out_dir")
+    parser.add_argument("brand_slug", nargs="?", default="otis")
+    parser.add_argument("--tests", default=str(DEFAULT_TESTS))
+    args = parser.parse_args()
+
+    out = Path(args.out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    brand = asyncio.run(_export_pages(args.brand_slug, out))
+    if brand is None:
+        print(f"Marca não encontrada: {args.brand_slug}")
+        return
+    print(f"{brand['documents']} documentos, {brand['pages']} páginas")
+
+    collections = {}
+    chunk_rows: list[dict] = []
+    brand_collection = f"brand_{args.brand_slug}"
+    if collection_exists(brand_collection):
+        count = _export_points(brand_collection, out / "points_brand.jsonl", chunk_rows)
+        collections["brand"] = {**_collection_layout(brand_collection), "points": count}
+        _write_jsonl(out / "chunks.jsonl", chunk_rows)
+        print(f"{brand_collection}: {count} pontos, {len(chunk_rows)} textos do chunk store")
+    summary_collection = summary_collection_name(args.brand_slug)
+    if collection_exists(summary_collection):
+        count = _export_points(summary_collection, out / "points_summary.jsonl")
+        collections["summary"] = {**_collection_layout(summary_collection), "points": count}
+        print(f"{summary_collection}: {count} pontos")
+
+    # Every text the search pipeline embeds for the scenarios
+    tests = load_tests(Path(args.tests))
+    texts = list(dict.fromkeys(
+        text
+        for test in tests
+        for text in [test["question"], *_multi_query_terms(build_query_features(test["question"]))]
+    ))
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH):
+        vectors.extend(get_query_embeddings_batch(texts[start:start + EMBED_BATCH]))
+    _write_jsonl(out / "query_vectors.jsonl", ({"text": t, "vector": v} for t, v in zip(texts, vectors)))
+    print(f"{len(texts)} vetores de consulta ({len(tests)} cenários)")
+
+    manifest = {
+        "brand_slug": args.brand_slug,
+        "brand_name": brand["name"],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "documents": brand["documents"],
+        "pages": brand["pages"],
+        "collections": collections,
+        "tests": str(args.tests),
+    }
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Snapshot salvo em {out}")
+
+
+if __name__ == "__main__":
+    main()
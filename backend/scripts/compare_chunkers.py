@@ -0,0 +1,185 @@
+"""
+Compare page chunking strategies (ingestion/chunking.py) on a brand's processed
+pages: vectors per page, embedded tokens (embedding cost), page coverage and
+projected Qdrant vector memory. With --recall, each strategy's chunks are
+embedded into a scratch collection (chunkcmp_<brand>_<strategy>, removed at
+the end unless --keep) and the questions of scripts/test_otis_300.py that name
+expected documents are replayed as plain dense searches: document hit@5,
+hit@k and MRR per category. --recall calls the embedding API for every chunk.
+
+Uso: python scripts/compare_chunkers.py [brand_slug] [--recall] [--top-k N] [--keep]
+                                        [--strategies contextual,token_budget]
+                                        [--tests caminho/test_otis_300.py]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import select
+from qdrant_client.models import Distance, VectorParams, PointStruct
+
+from config import get_settings
+from database import AsyncSessionLocal
+from models import Brand, Document, Page
+from ingestion.chunking import CHUNKERS, build_chunks, estimate_tokens
+from ingestion.embedder import get_embeddings_batch, get_query_embeddings_batch, MINI_VECTOR_SIZE
+from ingestion.qdrant_pool import get_qdrant_client, delete_collection
+from scripts.otis_suite import DEFAULT_TESTS, load_tests, expected_doc_rank
+
+settings = get_settings()
+QUERY_BATCH = 50
+
+
+async def load_pages(brand_slug: str) -> list[tuple[int, str, int, str]]:
+    """(doc_id, filename, page_number, text) of every processed page of the brand."""
+    async with AsyncSessionLocal() as db:
+        brand = (await db.execute(select(Brand).where(Brand.slug == brand_slug))).scalar_one_or_none()
+        if not brand:
+            return []
+        rows = (await db.execute(
+            select(Document.id, Document.original_filename, Page.page_number, Page.gemini_text)
+            .join(Page, Page.document_id == Document.id)
+            .where(Document.brand_id == brand.id, Page.gemini_text.isnot(None))
+            .order_by(Document.id, Page.page_number)
+        )).all()
+    return [tuple(row) for row in rows]
+
+
+def _coverage(page_text: str, chunks: list[str]) -> float:
+    """Fraction of the page's non-empty lines present in some chunk."""
+    lines = {line.strip() for line in page_text.splitlines() if line.strip()}
+    if not lines:
+        return 1.0
+    covered = {line.strip() for chunk in chunks for line in chunk.splitlines()}
+    return len(lines & covered) / len(lines)
+
+
+def chunk_stats(pages, strategy: str) -> dict:
+    per_page, tokens, page_tokens, coverage = [], 0, 0, []
+    for _doc_id, _filename, _page_number, text in pages:
+        chunks = build_chunks(text, strategy) or [text]
+        per_page.append(len(chunks))
+        tokens += sum(estimate_tokens(chunk) for chunk in chunks)
+        page_tokens += estimate_tokens(text)
+        coverage.append(_coverage(text, chunks))
+    vectors = sum(per_page)
+    bytes_per_vector = 4 * (settings.embedding_vector_size + MINI_VECTOR_SIZE)
+    return {
+        "vectors": vectors,
+        "avg_per_page": statistics.mean(per_page) if per_page else 0.0,
+        "p95_per_page": sorted(per_page)[int(0.95 * (len(per_page) - 1))] if per_page else 0,
+        "embedded_tokens": tokens,
+        "redundancy": tokens / page_tokens if page_tokens else 0.0,
+        "coverage": statistics.mean(coverage) if coverage else 0.0,
+        "vector_mb": vectors * bytes_per_vector / 1e6,
+    }
+
+
+def build_scratch_collection(brand_slug: str, strategy: str, pages) -> tuple[str, int, float]:
+    """Embed every page with the strategy into a scratch collection. Returns (name, calls, seconds)."""
+    client = get_qdrant_client()
+    collection_name = f"chunkcmp_{brand_slug}_{strategy}"
+    if client.collection_exists(collection_name):
+        delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=settings.embedding_vector_size, distance=Distance.COSINE),
+    )
+    calls = 0
+    started = time.time()
+    point_id = 0
+    for doc_id, filename, page_number, text in pages:
+        chunks = build_chunks(text, strategy) or [text]
+        embeddings = get_embeddings_batch(chunks)
+        calls += 1
+        points = []
+        for embedding in embeddings:
+            point_id += 1
+            points.append(PointStruct(
+                id=point_id,
+                vector=embedding,
+                payload={"doc_id": doc_id, "doc_filename": filename, "page_number": page_number},
+            ))
+        client.upsert(collection_name=collection_name, points=points)
+    return collection_name, calls, time.time() - started
+
+
+def replay(collection_name: str, tests: list[dict], vectors: list[list[float]], top_k: int) -> dict[str, dict]:
+    """Document-level hit@5 / hit@k / MRR per category (and "all")."""
+    client = get_qdrant_client()
+    per_category: dict[str, list[tuple[bool, bool, float]]] = {}
+    for test, vector in zip(tests, vectors):
+        hits = client.query_points(
+            collection_name=collection_name, query=vector, limit=top_k, with_payload=["doc_filename"]
+        ).points
+        rank = expected_doc_rank([(hit.payload or {}).get("doc_filename", "") for hit in hits], test["expected_docs"])
+        outcome = (rank is not None and rank <= 5, rank is not None, 1.0 / rank if rank else 0.0)
+        per_category.setdefault(test["category"], []).append(outcome)
+        per_category.setdefault("all", []).append(outcome)
+
+    return {
+        category: {
+            "n": len(outcomes),
+            "hit@5": sum(o[0] for o in outcomes) / len(outcomes),
+            f"hit@{top_k}": sum(o[1] for o in outcomes) / len(outcomes),
+            "mrr": sum(o[2] for o in outcomes) / len(outcomes),
+        }
+        for category, outcomes in sorted(per_category.items())
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara estratégias de chunking")
+    parser.add_argument("brand_slug", nargs="?", default="otis")
+    parser.add_argument("--strategies", default=",".join(CHUNKERS))
+    parser.add_argument("--recall", action="store_true")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true")
+    parser.add_argument("--tests", default=str(DEFAULT_TESTS))
+    args = parser.parse_args()
+
+    strategies = [s.strip() for s in args.strategies.split(",") if s.strip()]
+    pages = asyncio.run(load_pages(args.brand_slug))
+    if not pages:
+        print(f"Nenhuma página processada para {args.brand_slug}")
+        return
+    print(f"{args.brand_slug}: {len(pages)} páginas, {len({p[0] for p in pages})} documentos\n")
+
+    print(f"{'estratégia':<14} {'vetores':>8} {'média/pág':>10} {'p95/pág':>8} {'tokens':>10} {'redund.':>8} {'cobertura':>10} {'MB vetores':>11}")
+    for strategy in strategies:
+        s = chunk_stats(pages, strategy)
+        print(
+            f"{strategy:<14} {s['vectors']:>8} {s['avg_per_page']:>10.2f} {s['p95_per_page']:>8} "
+            f"{s['embedded_tokens']:>10} {s['redundancy']:>8.2f} {s['coverage']:>10.1%} {s['vector_mb']:>11.1f}"
+        )
+
+    if not args.recall:
+        return
+
+    tests = [t for t in load_tests(Path(args.tests)) if t.get("expected_docs")]
+    print(f"\n{len(tests)} perguntas com documentos esperados ({args.tests})")
+    vectors: list[list[float]] = []
+    for start in range(0, len(tests), QUERY_BATCH):
+        vectors.extend(get_query_embeddings_batch([t["question"] for t in tests[start:start + QUERY_BATCH]]))
+
+    for strategy in strategies:
+        collection_name, calls, seconds = build_scratch_collection(args.brand_slug, strategy, pages)
+        print(f"\n{strategy}: {calls} chamadas de embedding em {seconds:.0f}s ({collection_name})")
+        for category, m in replay(collection_name, tests, vectors, args.top_k).items():
+            print(
+                f"  {category:<4} n={m['n']:<4} hit@5={m['hit@5']:.3f} "
+                f"hit@{args.top_k}={m[f'hit@{args.top_k}']:.3f} mrr={m['mrr']:.3f}"
+            )
+        if not args.keep:
+            delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Create the payload indexes used by filtered searches on every existing
+brand collection (doc_id, page_number, brand_slug, signals tokens).
+Safe to run multiple times.
+
+Uso: python scripts/create_payload_indexes.py [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.embedder import ensure_payload_indexes
+from ingestion.qdrant_pool import brand_collections
+
+
+def run(brand_slugs: list[str]):
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        created = ensure_payload_indexes(collection_name)
+        if created:
+            print(f"{collection_name}: criados {', '.join(created)}")
+        else:
+            print(f"{collection_name}: índices já existentes")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
@@ -0,0 +1,96 @@
+"""
+Offline recall benchmark of two-stage (mini prefix → full rescoring) search.
+
+Loads a brand's full vectors into an in-memory Qdrant, adds truncated
+prefixes of several sizes, and for a sample of stored vectors used as
+queries compares the two-stage top-k against the exact full-vector top-k.
+Nothing is written to the server and no Gemini calls are made.
+
+Uso: python scripts/mini_vector_recall.py <brand_slug> [n_queries] [top_k]
+"""
+import sys
+import time
+import random
+import statistics
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, VectorParams, Distance, Prefetch, SearchParams
+from ingestion.embedder import mini_vector, MINI_CANDIDATE_FACTOR, VECTOR_SIZE
+from ingestion.collection_migrations import iter_points
+from ingestion.qdrant_pool import resolve_collection_name, refresh_collection_registry
+
+MINI_SIZES = (128, 256, 384)
+CANDIDATE_FACTORS = (2, MINI_CANDIDATE_FACTOR, 8)
+
+
+def run(brand_slug: str, n_queries: int, top_k: int):
+    refresh_collection_registry()
+    source = resolve_collection_name(f"brand_{brand_slug}")
+    vectors: dict = {}
+    for batch in iter_points(source, with_payload=False):
+        for p in batch:
+            vector = p.vector.get("") if isinstance(p.vector, dict) else p.vector
+            if vector:
+                vectors[p.id] = vector
+    if not vectors:
+        print(f"Coleção {source} vazia")
+        return
+
+    local = QdrantClient(":memory:")
+    config = {"": VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE)}
+    config.update({f"m{size}": VectorParams(size=size, distance=Distance.COSINE) for size in MINI_SIZES})
+    local.create_collection("bench", vectors_config=config)
+    ids = list(vectors)
+    for i in range(0, len(ids), 512):
+        local.upsert("bench", points=[
+            PointStruct(
+                id=pid,
+                vector={"": vectors[pid], **{f"m{size}": mini_vector(vectors[pid], size) for size in MINI_SIZES}},
+            )
+            for pid in ids[i:i + 512]
+        ])
+
+    random.seed(42)
+    queries = [vectors[pid] for pid in random.sample(ids, min(n_queries, len(ids)))]
+    truth = [
+        {h.id for h in local.query_points("bench", query=q, limit=top_k, search_params=SearchParams(exact=True)).points}
+        for q in queries
+    ]
+    print(f"{source}: {len(ids)} pontos, {len(queries)} consultas, top_k={top_k}\n")
+    print(f"{'mini':>5s} {'fator':>6s} {'recall só mini':>15s} {'recall 2 etapas':>16s} {'ms/consulta':>12s}")
+
+    for size in MINI_SIZES:
+        using = f"m{size}"
+        mini_only = statistics.mean(
+            len({h.id for h in local.query_points("bench", query=mini_vector(q, size), using=using, limit=top_k).points} & t) / top_k
+            for q, t in zip(queries, truth)
+        )
+        for factor in CANDIDATE_FACTORS:
+            recalls = []
+            start = time.perf_counter()
+            for q, t in zip(queries, truth):
+                hits = local.query_points(
+                    "bench",
+                    prefetch=Prefetch(query=mini_vector(q, size), using=using, limit=top_k * factor),
+                    query=q,
+                    limit=top_k,
+                ).points
+                recalls.append(len({h.id for h in hits} & t) / top_k)
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+            print(f"{size:5d} {factor:6d} {mini_only:15.3f} {statistics.mean(recalls):16.3f} {elapsed:12.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20,
+    )
@@ -0,0 +1,69 @@
+"""
+Move chunk text (and scoring features) out of the Qdrant payload of existing
+brand collections into the chunk store (CHUNK_STORE_PATH), then drop those
+payload keys. Points are updated in place; search keeps working throughout
+(points still carrying text are scored from their payload).
+Safe to run multiple times.
+
+Uso: python scripts/move_chunk_text_to_store.py [brand_slug ...]
+"""
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from ingestion.embedder import _chunk_scoring_features
+from ingestion.chunk_store import put_chunks, chunk_store_stats
+from ingestion.collection_migrations import iter_points
+from ingestion.qdrant_pool import get_qdrant_client, brand_collections
+from ingestion.search_cache import bump_collection_version
+
+
+def run(brand_slugs: list[str]):
+    client = get_qdrant_client()
+    collections = brand_collections()
+    if brand_slugs:
+        wanted = {f"brand_{slug}" for slug in brand_slugs}
+        collections = [name for name in collections if name in wanted]
+
+    for collection_name in collections:
+        moved = 0
+        moved_bytes = 0
+        for points in iter_points(
+            collection_name,
+            with_vectors=False,
+            with_payload=["doc_id", "doc_filename", "text", "features"],
+        ):
+            rows = []
+            for point in points:
+                payload = point.payload or {}
+                if "text" not in payload:
+                    continue
+                text = payload.get("text") or ""
+                features = payload.get("features") or _chunk_scoring_features(text, payload.get("doc_filename", ""))
+                rows.append((point.id, payload.get("doc_id", 0), text, features))
+                moved_bytes += len(text.encode("utf-8")) + len(features.get("compact", "")) + sum(
+                    len(w) + 1 for w in features.get("words", [])
+                )
+            if not rows:
+                continue
+            put_chunks(collection_name, rows)
+            client.delete_payload(
+                collection_name=collection_name,
+                keys=["text", "features"],
+                points=[row[0] for row in rows],
+                wait=True,
+            )
+            moved += len(rows)
+
+        bump_collection_version(collection_name)
+        print(f"{collection_name}: {moved} chunks movidos (~{moved_bytes / 1e6:.1f} MB a menos no payload)")
+
+    stats = chunk_store_stats()
+    print(f"Chunk store: {stats['chunks']} chunks, {stats['text_bytes'] / 1e6:.1f} MB de texto")
+
+
+if __name__ == "__main__":
+    run(sys.argv[1:])
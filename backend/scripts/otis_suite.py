@@ -0,0 +1,27 @@
+"""
+The 300 Otis scenarios of scripts/test_otis_300.py (repository root) as data,
+for the offline tools (compare_chunkers.py, benchmark_search.py). The suite is
+read with ast, without importing it (it calls the production API).
+"""
+import ast
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_TESTS = ROOT_DIR.parent / "scripts" / "test_otis_300.py"
+
+
+def load_tests(path: Path = DEFAULT_TESTS) -> list[dict]:
+    tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", "") == "TESTS" for t in node.targets):
+            return ast.literal_eval(node.value)
+    return []
+
+
+def expected_doc_rank(filenames: list[str], expected_docs: list[str]) -> int | None:
+    """1-based rank of the first result whose filename contains an expected name (as the suite matches)."""
+    expected = [name.lower() for name in expected_docs]
+    for rank, filename in enumerate(filenames, 1):
+        if any(name in (filename or "").lower() for name in expected):
+            return rank
+    return None
@@ -0,0 +1,116 @@
+"""
+Recall/latency report of the collection profiles on a brand's real vectors.
+
+Copies the brand's points (vectors + doc_id) into one scratch collection per
+profile, uses a sample of stored vectors as queries, and compares each
+profile's top-k against an exact search on the float32 original.
+Scratch collections are deleted at the end. No Gemini calls.
+
+Uso: python scripts/profile_report.py <brand_slug> [n_queries] [top_k]
+"""
+import sys
+import time
+import random
+import statistics
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from qdrant_client.models import PointStruct, VectorParams, Distance, SearchParams
+from ingestion.collection_profiles import PROFILES, create_collection_kwargs, search_params
+from ingestion.collection_migrations import iter_points
+from ingestion.qdrant_pool import get_qdrant_client, resolve_collection_name, refresh_collection_registry, delete_collection
+from ingestion.embedder import VECTOR_SIZE
+
+BYTES_PER_DIM = {"none": 4, "int8": 1, "binary": 1 / 8}
+
+
+def _dense(vector):
+    return vector.get("") if isinstance(vector, dict) else vector
+
+
+def _wait_indexed(client, collection_name: str, timeout: float = 600):
+    start = time.time()
+    while time.time() - start < timeout:
+        info = client.get_collection(collection_name=collection_name)
+        if str(info.status).lower().endswith("green"):
+            return
+        time.sleep(2)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run(brand_slug: str, n_queries: int, top_k: int):
+    client = get_qdrant_client()
+    refresh_collection_registry()
+    source = resolve_collection_name(f"brand_{brand_slug}")
+
+    points: list[PointStruct] = []
+    for batch in iter_points(source, with_payload=["doc_id"]):
+        for p in batch:
+            vector = _dense(p.vector)
+            if vector:
+                points.append(PointStruct(id=p.id, vector=vector, payload=p.payload or {}))
+    if not points:
+        print(f"Coleção {source} vazia")
+        return
+
+    random.seed(42)
+    queries = [p.vector for p in random.sample(points, min(n_queries, len(points)))]
+    print(f"{source}: {len(points)} pontos, {len(queries)} consultas, top_k={top_k}\n")
+
+    truth = [
+        {hit.id for hit in client.search(
+            collection_name=source, query_vector=q, limit=top_k,
+            search_params=SearchParams(exact=True),
+        )}
+        for q in queries
+    ]
+
+    print(f"{'perfil':12s} {'recall@k':>9s} {'p50 ms':>8s} {'p95 ms':>8s} {'vetores RAM':>12s}")
+    for profile in PROFILES.values():
+        scratch = f"{source}__profile_{profile.name}"
+        try:
+            client.create_collection(
+                collection_name=scratch,
+                vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE, on_disk=profile.on_disk_vectors),
+                **create_collection_kwargs(profile),
+            )
+            for i in range(0, len(points), 256):
+                client.upsert(collection_name=scratch, points=points[i:i + 256], wait=True)
+            _wait_indexed(client, scratch)
+
+            params = search_params(profile)
+            recalls, latencies = [], []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                hits = client.search(collection_name=scratch, query_vector=q, limit=top_k, search_params=params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({h.id for h in hits} & expected) / max(len(expected), 1))
+
+            ram_mb = len(points) * VECTOR_SIZE * BYTES_PER_DIM[profile.quantization] / 1e6
+            if not profile.on_disk_vectors and profile.quantization != "none":
+                ram_mb += len(points) * VECTOR_SIZE * 4 / 1e6
+            print(
+                f"{profile.name:12s} {statistics.mean(recalls):9.3f} "
+                f"{_percentile(latencies, 0.5):8.2f} {_percentile(latencies, 0.95):8.2f} "
+                f"{ram_mb:10.1f}MB"
+            )
+        finally:
+            delete_collection(scratch)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    run(
+        sys.argv[1],
+        int(sys.argv[2]) if len(sys.argv) > 2 else 200,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 20,
+    )
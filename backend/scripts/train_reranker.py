@@ -0,0 +1,132 @@
+"""
+Train the local reranker (ingestion/reranker.py) from the logged rerank labels
+(RERANK_LABELS_PATH): Gemini rerank scores and single-pass passage selections.
+Queries are split into train/holdout. The holdout report shows how often the
+model agrees with the labels and, for several RERANKER_MIN_MARGIN values, how
+many turns hybrid would still send to Gemini and the agreement on the rest.
+The model is written to RERANKER_MODEL_PATH (picked up without restarting).
+
+Uso: python scripts/train_reranker.py [--labels rerank_labels.jsonl] [--out reranker_model.json]
+                                      [--sources gemini,single_pass] [--holdout 0.2] [--epochs 400]
+                                      [--min-samples 200] [--dry-run]
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import get_settings
+from ingestion.reranker import FEATURE_NAMES, RERANK_PASS_SCORE, train_model, save_model, rerank_margin
+
+settings = get_settings()
+MARGINS = [0.0, 0.05, 0.1, 0.15, 0.2, 0.3]
+
+
+def load_turns(path: Path, sources: set[str]) -> list[dict]:
+    """Logged turns from the given sources; turns logged with another feature set are skipped."""
+    turns = []
+    outdated = 0
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("source") not in sources or not row.get("candidates"):
+                continue
+            if set(row["candidates"][0]["features"]) != set(FEATURE_NAMES):
+                outdated += 1
+                continue
+            turns.append(row)
+    if outdated:
+        print(f"{outdated} turnos ignorados (rótulos de outra versão das features)")
+    return turns
+
+
+def _in_holdout(query: str, fraction: float) -> bool:
+    digest = hashlib.blake2b(query.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 2 ** 32 < fraction
+
+
+def evaluate(model, turns: list[dict]) -> dict:
+    pairs = [
+        (model.probability(c["features"]), c["score"] >= RERANK_PASS_SCORE, min(1.0, c["score"] / 10))
+        for turn in turns for c in turn["candidates"]
+    ]
+    if not pairs:
+        return {}
+    log_loss = -sum(
+        t * math.log(max(p, 1e-9)) + (1 - t) * math.log(max(1 - p, 1e-9)) for p, _, t in pairs
+    ) / len(pairs)
+    agreement = sum(1 for p, passed, _ in pairs if (p >= 0.5) == passed) / len(pairs)
+
+    # Per turn: does the local top candidate pass by the labels; which turns go to Gemini
+    by_margin = {}
+    for margin in MARGINS:
+        local_turns, agreed = 0, 0
+        for turn in turns:
+            probabilities = [model.probability(c["features"]) for c in turn["candidates"]]
+            if rerank_margin(probabilities) < margin:
+                continue
+            local_turns += 1
+            agreed += all((p >= 0.5) == (c["score"] >= RERANK_PASS_SCORE) for p, c in zip(probabilities, turn["candidates"]))
+        by_margin[margin] = {
+            "gemini_share": 1 - local_turns / len(turns),
+            "turn_agreement": agreed / local_turns if local_turns else None,
+        }
+    return {"pairs": len(pairs), "log_loss": log_loss, "agreement": agreement, "by_margin": by_margin}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o reranker local")
+    parser.add_argument("--labels", default=settings.rerank_labels_path)
+    parser.add_argument("--out", default=settings.reranker_model_path)
+    parser.add_argument("--sources", default="gemini,single_pass")
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--epochs", type=int, default=400)
+    parser.add_argument("--min-samples", type=int, default=200)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    labels = Path(args.labels)
+    if not labels.exists():
+        print(f"Arquivo de rótulos não encontrado: {labels}")
+        return
+    turns = load_turns(labels, {s.strip() for s in args.sources.split(",") if s.strip()})
+    train = [t for t in turns if not _in_holdout(t["query"], args.holdout)]
+    holdout = [t for t in turns if _in_holdout(t["query"], args.holdout)]
+    rows = [(c["features"], min(1.0, c["score"] / 10)) for t in train for c in t["candidates"]]
+    positives = sum(1 for _, target in rows if target >= RERANK_PASS_SCORE / 10)
+    print(f"{len(turns)} turnos ({len(train)} treino, {len(holdout)} validação) | {len(rows)} pares, {positives} relevantes")
+    if len(rows) < args.min_samples:
+        print(f"Poucos pares para treinar (mínimo {args.min_samples})")
+        return
+
+    model = train_model(rows, epochs=args.epochs)
+    print("\nPesos (features padronizadas):")
+    for name, weight in sorted(zip(model.feature_names, model.weights), key=lambda item: -abs(item[1])):
+        print(f"  {name:<18} {weight:+.3f}")
+
+    for label, subset in (("treino", train), ("validação", holdout)):
+        report = evaluate(model, subset)
+        if not report:
+            continue
+        print(f"\n{label}: {report['pairs']} pares | log loss={report['log_loss']:.3f} | acordo passa/não passa={report['agreement']:.1%}")
+        print(f"  {'margem':>7} {'Gemini':>8} {'acordo turno (local)':>21}")
+        for margin, m in report["by_margin"].items():
+            turn_agreement = f"{m['turn_agreement']:.1%}" if m["turn_agreement"] is not None else "-"
+            print(f"  {margin:>7.2f} {m['gemini_share']:>8.1%} {turn_agreement:>21}")
+
+    if args.dry_run:
+        return
+    save_model(model, args.out)
+    print(f"\nModelo salvo em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import {
   Download, Eraser
 } from 'lucide-react';
 import ReactMarkdown from 'react-markdown';
-import { queryRAG } from '../services/geminiService';
+import { queryRAG, queryRAGStream } from '../services/geminiService';
 import { ChatSession, Message, Agent } from '../types';
 import * as Storage from '../services/storage';
 
@@ -337,11 +337,22 @@ const ChatSessionView: React.FC<ChatSessionProps> = ({
       parts: [{ text: m.text }]
     }));
 
-    const ragResponse = await queryRAG(
+    // A resposta aparece enquanto é escrita (mensagem parcial, não salva)
+    const modelMessageId = (Date.now() + 1).toString();
+    const ragResponse = await queryRAGStream(
       composedQuestion,
       agent.systemInstruction,
       agent.brandName,
-      history
+      history,
+      (partialAnswer) => setSession({
+        ...updatedSession,
+        messages: [...updatedSession.messages, {
+          id: modelMessageId,
+          role: 'model',
+          text: partialAnswer,
+          timestamp: new Date().toISOString()
+        }],
+      })
     );
 
     const responseTextRaw = (ragResponse && ragResponse.answer)
@@ -351,7 +362,7 @@ const ChatSessionView: React.FC<ChatSessionProps> = ({
     const responseText = normalizeAssistantReply(responseTextRaw, agent?.brandName);
 
     const modelMessage: Message = {
-      id: (Date.now() + 1).toString(),
+      id: modelMessageId,
       role: 'model',
       text: responseText,
       timestamp: new Date().toISOString()
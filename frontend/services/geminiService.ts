@@ -49,6 +49,83 @@ export const queryRAG = async (
   }
 };
 
+/**
+ * Mesma consulta via /api/query/stream (SSE): onText recebe o texto parcial
+ * conforme a resposta é escrita. Retorna a resposta final (texto já
+ * normalizado pelo servidor). Se o streaming não estiver disponível, ou falhar
+ * antes do primeiro trecho de texto, usa queryRAG.
+ */
+export const queryRAGStream = async (
+  question: string,
+  systemInstruction: string | undefined,
+  brandFilter: string | undefined,
+  conversationHistory: { role: string; parts: { text: string }[] }[] | undefined,
+  onText: (partialAnswer: string) => void
+): Promise<RAGResponse | null> => {
+  let response: Response;
+  try {
+    response = await fetch(`${RAG_SERVER_URL}/api/query/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...ragHeaders() },
+      body: JSON.stringify({
+        question,
+        systemInstruction,
+        topK: 10,
+        brandFilter: brandFilter || null,
+        conversationHistory: conversationHistory || []
+      })
+    });
+  } catch (error) {
+    console.warn('Erro ao consultar RAG (stream):', error);
+    return queryRAG(question, systemInstruction, brandFilter, conversationHistory);
+  }
+
+  if (!response.ok || !response.body) {
+    return queryRAG(question, systemInstruction, brandFilter, conversationHistory);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let partial = '';
+  try {
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop() || '';
+      for (const raw of events) {
+        if (!raw.startsWith('data: ')) continue;
+        const event = JSON.parse(raw.slice(6));
+        if (event.type === 'token') {
+          partial += event.text;
+          onText(partial);
+        } else if (event.type === 'error') {
+          console.warn('Erro no streaming do RAG:', event.message);
+          if (!partial) {
+            return queryRAG(question, systemInstruction, brandFilter, conversationHistory);
+          }
+          return { answer: partial, sources: [], searchTime: 0, documentsFound: 0 };
+        } else if (event.type === 'done') {
+          return {
+            answer: event.answer,
+            sources: event.sources,
+            searchTime: event.searchTime,
+            documentsFound: event.documentsFound,
+          };
+        }
+      }
+    }
+  } catch (error) {
+    console.warn('Streaming do RAG interrompido:', error);
+  }
+  if (!partial) {
+    return queryRAG(question, systemInstruction, brandFilter, conversationHistory);
+  }
+  return { answer: partial, sources: [], searchTime: 0, documentsFound: 0 };
+};
+
 /**
  * Verifica se o servidor RAG está disponível e retorna status de carregamento
  */
@@ -5,6 +5,8 @@ from typing import Any
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
 from ingestion.embedder import get_qdrant_client, _extract_domain_signals  # type: ignore
+from ingestion.chunk_store import get_chunks  # type: ignore
+from ingestion.search_cache import bump_collection_version  # type: ignore
 
 
 def _iter_brand_collections(client):
@@ -45,10 +47,16 @@ def main():
             if not points:
                 break
 
+            # Text lives in the chunk store for points ingested with chunk_text_in_store
+            stored = get_chunks([p.id for p in points if 'text' not in (p.payload or {})])
+
             update_ops = []
             for point in points:
                 payload = point.payload or {}
-                text = str(payload.get('text') or '').strip()
+                text = payload.get('text')
+                if text is None:
+                    text = stored.get(str(point.id), {}).get('text')
+                text = str(text or '').strip()
                 if not text:
                     continue
 
@@ -57,9 +65,7 @@ def main():
                     continue
 
                 signals = _extract_domain_signals(text)
-                new_payload = dict(payload)
-                new_payload['signals'] = signals
-                update_ops.append((point.id, new_payload))
+                update_ops.append((point.id, {'signals': signals}))
 
             for point_id, new_payload in update_ops:
                 client.set_payload(
@@ -72,6 +78,8 @@ def main():
             if not next_offset:
                 break
 
+        if collection_updated:
+            bump_collection_version(collection_name)
         total_seen += collection_seen
         total_updated += collection_updated
         print(f'Points lidos: {collection_seen}')
@@ -16,13 +16,10 @@ import sys, os
 sys.path.insert(0, "/app")
 os.environ.setdefault("DATABASE_URL", "sqlite:////app/data/andreja.db")
 
-from qdrant_client.models import Filter, FieldCondition, MatchValue, PointStruct
-from ingestion.embedder import (
-    get_qdrant_client, _build_contextual_chunks,
-    get_embeddings_batch
-)
+from qdrant_client.models import Filter, FieldCondition, MatchValue
+from ingestion.embedder import get_qdrant_client, upsert_page
+from ingestion.chunk_store import delete_point_chunks
 from sqlalchemy import create_engine, text
-import uuid
 
 COLLECTION = "brand_otis"
 BRAND_SLUG = "otis"
@@ -64,38 +61,25 @@ for page in pages:
     
     print(f"\n{filename} page {page_num}: {len(page_text)} chars, {chunk_count} chunks -> needs re-index")
     
-    # Delete old chunks
+    # Delete old chunks (points and their chunk store rows)
     old_ids = [p.id for p in current[0]]
     client.delete(collection_name=COLLECTION, points_selector=old_ids)
+    delete_point_chunks([str(i) for i in old_ids])
     
-    # Build new chunks (should be single chunk for <=2000 chars)
-    chunks = _build_contextual_chunks(page_text)
-    if not chunks:
-        chunks = [page_text]
-    
-    print(f"  New: {len(chunks)} chunk(s)")
-    
-    # Embed and upsert
-    embeddings = get_embeddings_batch(chunks)
-    points = []
-    for index, (chunk_text, embedding) in enumerate(zip(chunks, embeddings)):
-        points.append(PointStruct(
-            id=str(uuid.uuid4()),
-            vector=embedding,
-            payload={
-                "brand_slug": BRAND_SLUG,
-                "doc_id": doc_id,
-                "doc_filename": filename,
-                "page_number": page_num,
-                "text": chunk_text,
-                "chunk_index": index,
-                "chunk_total": len(chunks),
-            },
-        ))
-    
-    client.upsert(collection_name=COLLECTION, points=points)
+    # Re-embed through the regular ingestion path (payload/chunk store split,
+    # signals, extra vectors); a page <=2000 chars becomes a single chunk
+    upsert_page(BRAND_SLUG, doc_id, filename, page_num, page_text)
+    new_count = client.count(
+        collection_name=COLLECTION,
+        count_filter=Filter(
+            must=[
+                FieldCondition(key="doc_id", match=MatchValue(value=doc_id)),
+                FieldCondition(key="page_number", match=MatchValue(value=page_num)),
+            ]
+        ),
+    ).count
     reindexed += 1
-    print(f"  Done: {chunk_count} -> {len(chunks)} chunks")
+    print(f"  Done: {chunk_count} -> {new_count} chunks")
 
 print(f"\nRe-indexed {reindexed} pages")
 